@@ -8,6 +8,10 @@ from app.config import settings
 from app.database import Base
 from app.models.user import User
 from app.models.analysis import Analysis
+from app.models.analysis_payload import AnalysisPayload
+from app.models.analysis_cache import AnalysisCacheEntry
+from app.models.analysis_job import AnalysisJob
+from app.models.user_analysis_stats import UserAnalysisStats
 
 # this is the Alembic Config object, which provides
 # access to the values within the .ini file in use.
@@ -0,0 +1,59 @@
+"""Add user_analysis_stats rollup table
+
+Revision ID: 5b0e7c3f9a21
+Revises: 352d6c807540
+Create Date: 2026-10-18 16:05:12.318004
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '5b0e7c3f9a21'
+down_revision: Union[str, Sequence[str], None] = '352d6c807540'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('user_analysis_stats',
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.Column('total_analyses', sa.Integer(), nullable=False),
+    sa.Column('low_count', sa.Integer(), nullable=False),
+    sa.Column('medium_count', sa.Integer(), nullable=False),
+    sa.Column('high_count', sa.Integer(), nullable=False),
+    sa.Column('score_sum', sa.BigInteger(), nullable=False),
+    sa.Column('score_count', sa.Integer(), nullable=False),
+    sa.Column('updated_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=True),
+    sa.ForeignKeyConstraint(['user_id'], ['users.id'], ),
+    sa.PrimaryKeyConstraint('user_id')
+    )
+
+    # Backfill from existing history in one set-based statement
+    analyses = sa.table('analyses', sa.column('user_id', sa.Integer), sa.column('result', sa.JSON))
+    stats = sa.table('user_analysis_stats', *(sa.column(name) for name in (
+        'user_id', 'total_analyses', 'low_count', 'medium_count', 'high_count', 'score_sum', 'score_count',
+    )))
+    risk = analyses.c.result['overall_risk_level'].as_string()
+    score = analyses.c.result['summary_score'].as_integer()
+    op.execute(stats.insert().from_select(
+        ['user_id', 'total_analyses', 'low_count', 'medium_count', 'high_count', 'score_sum', 'score_count'],
+        sa.select(
+            analyses.c.user_id,
+            sa.func.count(),
+            sa.func.coalesce(sa.func.sum(sa.case((risk == 'Low', 1), else_=0)), 0),
+            sa.func.coalesce(sa.func.sum(sa.case((risk == 'Medium', 1), else_=0)), 0),
+            sa.func.coalesce(sa.func.sum(sa.case((risk == 'High', 1), else_=0)), 0),
+            sa.func.coalesce(sa.func.sum(score), 0),
+            sa.func.count(score),
+        ).group_by(analyses.c.user_id),
+    ))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table('user_analysis_stats')
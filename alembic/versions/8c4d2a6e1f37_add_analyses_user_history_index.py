@@ -0,0 +1,36 @@
+"""Add (user_id, created_at DESC, id DESC) index on analyses
+
+Revision ID: 8c4d2a6e1f37
+Revises: 5b0e7c3f9a21
+Create Date: 2026-10-18 17:22:48.904117
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '8c4d2a6e1f37'
+down_revision: Union[str, Sequence[str], None] = '5b0e7c3f9a21'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # CONCURRENTLY so a large analyses table stays writable during the build;
+    # it cannot run inside a transaction
+    with op.get_context().autocommit_block():
+        op.create_index(
+            'ix_analyses_user_created_id', 'analyses',
+            ['user_id', sa.text('created_at DESC'), sa.text('id DESC')],
+            unique=False, postgresql_concurrently=True,
+        )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.get_context().autocommit_block():
+        op.drop_index('ix_analyses_user_created_id', table_name='analyses', postgresql_concurrently=True)
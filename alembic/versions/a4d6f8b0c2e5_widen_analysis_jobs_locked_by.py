@@ -0,0 +1,34 @@
+"""Widen analysis_jobs.locked_by for long worker hostnames
+
+Revision ID: a4d6f8b0c2e5
+Revises: d2f4c6a8b013
+Create Date: 2026-10-19 11:03:27.519846
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a4d6f8b0c2e5'
+down_revision: Union[str, Sequence[str], None] = 'd2f4c6a8b013'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Increasing a varchar limit is catalog-only in Postgres (no rewrite)
+    op.alter_column('analysis_jobs', 'locked_by',
+                    existing_type=sa.String(length=64), type_=sa.String(length=255),
+                    existing_nullable=True)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.execute("UPDATE analysis_jobs SET locked_by = right(locked_by, 64) WHERE length(locked_by) > 64")
+    op.alter_column('analysis_jobs', 'locked_by',
+                    existing_type=sa.String(length=255), type_=sa.String(length=64),
+                    existing_nullable=True)
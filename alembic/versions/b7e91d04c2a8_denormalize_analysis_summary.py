@@ -0,0 +1,77 @@
+"""Denormalize summary fields of analyses.result into columns
+
+Revision ID: b7e91d04c2a8
+Revises: 8c4d2a6e1f37
+Create Date: 2026-10-18 18:10:33.571826
+
+"""
+from typing import Sequence, Union
+
+from alembic import context, op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b7e91d04c2a8'
+down_revision: Union[str, Sequence[str], None] = '8c4d2a6e1f37'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+BATCH_SIZE = 5000
+
+# claim_count is always set by the backfill and by the application, so
+# "claim_count IS NULL" marks rows still to do and makes reruns resumable
+BACKFILL = r"""
+UPDATE analyses SET
+    summary_score = CASE WHEN (result->>'summary_score') ~ '^-?[0-9]+(\.[0-9]+)?$'
+        THEN round((result->>'summary_score')::numeric)::int END,
+    overall_risk_level = left(result->>'overall_risk_level', 16),
+    emotional_tone = left(result->>'emotional_tone', 32),
+    manipulation_score = CASE WHEN (result->>'manipulation_score') ~ '^-?[0-9]+(\.[0-9]+)?$'
+        THEN round((result->>'manipulation_score')::numeric)::int END,
+    claim_count = CASE WHEN json_typeof(result->'claims') = 'array'
+        THEN json_array_length(result->'claims') ELSE 0 END
+WHERE claim_count IS NULL
+"""
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Nullable columns without defaults: metadata-only, no table rewrite
+    op.add_column('analyses', sa.Column('summary_score', sa.Integer(), nullable=True))
+    op.add_column('analyses', sa.Column('overall_risk_level', sa.String(length=16), nullable=True))
+    op.add_column('analyses', sa.Column('emotional_tone', sa.String(length=32), nullable=True))
+    op.add_column('analyses', sa.Column('manipulation_score', sa.Integer(), nullable=True))
+    op.add_column('analyses', sa.Column('claim_count', sa.Integer(), nullable=True))
+
+    with op.get_context().autocommit_block():
+        if context.is_offline_mode():
+            op.execute(BACKFILL)
+        else:
+            # One short transaction per id range so the table is never locked for long
+            bind = op.get_bind()
+            low, high = bind.execute(sa.text("SELECT min(id), max(id) FROM analyses")).first()
+            if low is not None:
+                batch = sa.text(BACKFILL + " AND id >= :low AND id < :high")
+                for start in range(low, high + 1, BATCH_SIZE):
+                    bind.execute(batch, {"low": start, "high": start + BATCH_SIZE})
+            # Rows written by the previous release while the backfill ran
+            bind.execute(sa.text(BACKFILL))
+
+        op.create_index('ix_analyses_user_risk_created_id', 'analyses',
+                        ['user_id', 'overall_risk_level', sa.text('created_at DESC'), sa.text('id DESC')],
+                        unique=False, postgresql_concurrently=True)
+        op.create_index('ix_analyses_user_summary_score', 'analyses', ['user_id', 'summary_score'],
+                        unique=False, postgresql_concurrently=True)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.get_context().autocommit_block():
+        op.drop_index('ix_analyses_user_summary_score', table_name='analyses', postgresql_concurrently=True)
+        op.drop_index('ix_analyses_user_risk_created_id', table_name='analyses', postgresql_concurrently=True)
+    op.drop_column('analyses', 'claim_count')
+    op.drop_column('analyses', 'manipulation_score')
+    op.drop_column('analyses', 'emotional_tone')
+    op.drop_column('analyses', 'overall_risk_level')
+    op.drop_column('analyses', 'summary_score')
@@ -0,0 +1,91 @@
+"""Add full-text search vector on analyses
+
+Revision ID: d2f4c6a8b013
+Revises: b7e91d04c2a8
+Create Date: 2026-10-18 19:02:17.240519
+
+"""
+from typing import Sequence, Union
+
+from alembic import context, op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd2f4c6a8b013'
+down_revision: Union[str, Sequence[str], None] = 'b7e91d04c2a8'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+BATCH_SIZE = 5000
+
+# Claim texts (weight A) rank above matches elsewhere in the text (weight B).
+# Must stay in sync with SEARCH_CONFIG in app/services/search_service.py.
+SEARCH_VECTOR_FUNCTION = """
+CREATE OR REPLACE FUNCTION analyses_search_vector(original_text text, result json)
+RETURNS tsvector LANGUAGE sql IMMUTABLE PARALLEL SAFE AS $$
+    SELECT setweight(to_tsvector('english', coalesce((
+               SELECT string_agg(claim->>'claim', ' ')
+               FROM json_array_elements(CASE WHEN json_typeof(result->'claims') = 'array'
+                                             THEN result->'claims' ELSE '[]'::json END) AS claim
+           ), '')), 'A')
+        || setweight(to_tsvector('english', coalesce(original_text, '')), 'B')
+$$
+"""
+
+TRIGGER_FUNCTION = """
+CREATE OR REPLACE FUNCTION analyses_search_vector_trigger() RETURNS trigger LANGUAGE plpgsql AS $$
+BEGIN
+    NEW.search_vector := analyses_search_vector(NEW.original_text, NEW.result);
+    RETURN NEW;
+END
+$$
+"""
+
+# Every write path (ORM, bulk inserts, write-behind flushes, jobs) goes through the trigger
+TRIGGER = """
+CREATE TRIGGER analyses_search_vector_update
+BEFORE INSERT OR UPDATE OF original_text, result ON analyses
+FOR EACH ROW EXECUTE FUNCTION analyses_search_vector_trigger()
+"""
+
+BACKFILL = """
+UPDATE analyses SET search_vector = analyses_search_vector(original_text, result)
+WHERE search_vector IS NULL
+"""
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Lets the GIN index lead with the plain integer user_id
+    op.execute("CREATE EXTENSION IF NOT EXISTS btree_gin")
+    op.add_column('analyses', sa.Column('search_vector', postgresql.TSVECTOR(), nullable=True))
+    op.execute(SEARCH_VECTOR_FUNCTION)
+    op.execute(TRIGGER_FUNCTION)
+    op.execute(TRIGGER)
+
+    with op.get_context().autocommit_block():
+        if context.is_offline_mode():
+            op.execute(BACKFILL)
+        else:
+            # New rows are covered by the trigger; old ones in short per-range transactions
+            bind = op.get_bind()
+            low, high = bind.execute(sa.text("SELECT min(id), max(id) FROM analyses")).first()
+            if low is not None:
+                batch = sa.text(BACKFILL + " AND id >= :low AND id < :high")
+                for start in range(low, high + 1, BATCH_SIZE):
+                    bind.execute(batch, {"low": start, "high": start + BATCH_SIZE})
+
+        op.create_index('ix_analyses_user_search', 'analyses', ['user_id', 'search_vector'],
+                        unique=False, postgresql_using='gin', postgresql_concurrently=True)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.get_context().autocommit_block():
+        op.drop_index('ix_analyses_user_search', table_name='analyses', postgresql_concurrently=True)
+    op.execute("DROP TRIGGER IF EXISTS analyses_search_vector_update ON analyses")
+    op.execute("DROP FUNCTION IF EXISTS analyses_search_vector_trigger()")
+    op.execute("DROP FUNCTION IF EXISTS analyses_search_vector(text, json)")
+    op.drop_column('analyses', 'search_vector')
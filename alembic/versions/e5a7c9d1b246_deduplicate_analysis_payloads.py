@@ -0,0 +1,128 @@
+"""Add content-addressed analysis_payloads and backfill analyses.payload_hash (expand)
+
+Revision ID: e5a7c9d1b246
+Revises: a4d6f8b0c2e5
+Create Date: 2026-10-18 19:48:05.613902
+
+"""
+from typing import Sequence, Union
+
+from alembic import context, op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e5a7c9d1b246'
+down_revision: Union[str, Sequence[str], None] = 'a4d6f8b0c2e5'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+BATCH_SIZE = 5000
+
+# Same key as AnalysisPayload.hash_for(): the JSON column returns its text
+# exactly as the application serialized it. Duplicates inside a batch become
+# one payload row carrying their combined refcount.
+BACKFILL = """
+WITH batch AS (
+    SELECT id, original_text, result,
+           encode(sha256(convert_to(length(original_text) || ':' || original_text || result::text, 'UTF8')), 'hex') AS hash
+    FROM analyses
+    WHERE payload_hash IS NULL{range}
+), payloads AS (
+    INSERT INTO analysis_payloads (hash, original_text, result, refcount)
+    SELECT DISTINCT ON (hash) hash, original_text, result, count(*) OVER (PARTITION BY hash)
+    FROM batch
+    ORDER BY hash
+    ON CONFLICT (hash) DO UPDATE SET refcount = analysis_payloads.refcount + excluded.refcount
+)
+UPDATE analyses SET payload_hash = batch.hash FROM batch WHERE analyses.id = batch.id
+"""
+
+# Keeps both representations in step while the previous release (writes
+# original_text/result only) and this one (writes payload_hash only) run
+# side by side: each INSERT gets whichever half it is missing. Named to sort
+# before analyses_search_vector_update, so that trigger sees original_text.
+# Dropped by the contract revision (f3b8d2e6a417).
+PAYLOAD_SYNC_FUNCTION = """
+CREATE OR REPLACE FUNCTION analyses_payload_sync() RETURNS trigger LANGUAGE plpgsql AS $$
+BEGIN
+    IF NEW.payload_hash IS NULL THEN
+        NEW.payload_hash := encode(sha256(convert_to(
+            length(NEW.original_text) || ':' || NEW.original_text || NEW.result::text, 'UTF8')), 'hex');
+        INSERT INTO analysis_payloads (hash, original_text, result, refcount)
+        VALUES (NEW.payload_hash, NEW.original_text, NEW.result, 1)
+        ON CONFLICT (hash) DO UPDATE SET refcount = analysis_payloads.refcount + 1;
+    ELSIF NEW.original_text IS NULL THEN
+        SELECT p.original_text, p.result INTO NEW.original_text, NEW.result
+        FROM analysis_payloads p WHERE p.hash = NEW.payload_hash;
+    END IF;
+    RETURN NEW;
+END
+$$
+"""
+
+PAYLOAD_SYNC_TRIGGER = """
+CREATE TRIGGER analyses_payload_sync
+BEFORE INSERT ON analyses
+FOR EACH ROW EXECUTE FUNCTION analyses_payload_sync()
+"""
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        'analysis_payloads',
+        sa.Column('hash', sa.String(length=64), nullable=False),
+        sa.Column('original_text', sa.Text(), nullable=False),
+        sa.Column('result', sa.JSON(), nullable=False),
+        sa.Column('refcount', sa.Integer(), server_default='0', nullable=False),
+        sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=True),
+        sa.PrimaryKeyConstraint('hash'),
+    )
+    # Expand only: the inline columns stay (and stay filled) until the
+    # contract revision, so the previous release keeps reading and writing
+    op.add_column('analyses', sa.Column('payload_hash', sa.String(length=64), nullable=True))
+    op.execute(PAYLOAD_SYNC_FUNCTION)
+    op.execute(PAYLOAD_SYNC_TRIGGER)
+
+    with op.get_context().autocommit_block():
+        if context.is_offline_mode():
+            op.execute(BACKFILL.format(range=""))
+        else:
+            # Rows inserted from here on are hashed by the trigger; older
+            # ones in short per-range transactions
+            bind = op.get_bind()
+            low, high = bind.execute(sa.text("SELECT min(id), max(id) FROM analyses")).first()
+            if low is not None:
+                batch = sa.text(BACKFILL.format(range=" AND id >= :low AND id < :high"))
+                for start in range(low, high + 1, BATCH_SIZE):
+                    bind.execute(batch, {"low": start, "high": start + BATCH_SIZE})
+
+    # Added NOT VALID (brief lock, no scan) and validated below under SHARE
+    # UPDATE EXCLUSIVE, which lets reads and writes continue. The validated
+    # check lets the contract revision SET NOT NULL without a table scan.
+    op.execute(
+        "ALTER TABLE analyses ADD CONSTRAINT analyses_payload_hash_fkey "
+        "FOREIGN KEY (payload_hash) REFERENCES analysis_payloads (hash) NOT VALID"
+    )
+    op.execute(
+        "ALTER TABLE analyses ADD CONSTRAINT analyses_payload_hash_not_null "
+        "CHECK (payload_hash IS NOT NULL) NOT VALID"
+    )
+
+    with op.get_context().autocommit_block():
+        op.execute("ALTER TABLE analyses VALIDATE CONSTRAINT analyses_payload_hash_fkey")
+        op.execute("ALTER TABLE analyses VALIDATE CONSTRAINT analyses_payload_hash_not_null")
+        op.create_index('ix_analyses_payload_hash', 'analyses', ['payload_hash'],
+                        unique=False, postgresql_concurrently=True)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.execute("DROP TRIGGER IF EXISTS analyses_payload_sync ON analyses")
+    op.execute("DROP FUNCTION IF EXISTS analyses_payload_sync()")
+    op.drop_index('ix_analyses_payload_hash', table_name='analyses')
+    op.drop_constraint('analyses_payload_hash_not_null', 'analyses', type_='check')
+    op.drop_constraint('analyses_payload_hash_fkey', 'analyses', type_='foreignkey')
+    op.drop_column('analyses', 'payload_hash')
+    op.drop_table('analysis_payloads')
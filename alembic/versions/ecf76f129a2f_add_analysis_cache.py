@@ -0,0 +1,39 @@
+"""Add analysis_cache table
+
+Revision ID: ecf76f129a2f
+Revises: 1d2f1367ef1e
+Create Date: 2026-10-18 10:12:04.118302
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'ecf76f129a2f'
+down_revision: Union[str, Sequence[str], None] = '1d2f1367ef1e'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('analysis_cache',
+    sa.Column('key', sa.String(length=64), nullable=False),
+    sa.Column('prompt_version', sa.String(length=32), nullable=False),
+    sa.Column('result', sa.JSON(), nullable=False),
+    sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=True),
+    sa.Column('expires_at', sa.DateTime(timezone=True), nullable=False),
+    sa.PrimaryKeyConstraint('key')
+    )
+    op.create_index(op.f('ix_analysis_cache_prompt_version'), 'analysis_cache', ['prompt_version'], unique=False)
+    op.create_index(op.f('ix_analysis_cache_expires_at'), 'analysis_cache', ['expires_at'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index(op.f('ix_analysis_cache_expires_at'), table_name='analysis_cache')
+    op.drop_index(op.f('ix_analysis_cache_prompt_version'), table_name='analysis_cache')
+    op.drop_table('analysis_cache')
@@ -0,0 +1,115 @@
+"""Drop analyses.original_text/result now that payloads live in analysis_payloads (contract)
+
+Only run once every app instance writes payload_hash (the release that
+shipped e5a7c9d1b246); the previous release still reads these columns.
+
+Revision ID: f3b8d2e6a417
+Revises: e5a7c9d1b246
+Create Date: 2026-10-19 10:12:44.208315
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'f3b8d2e6a417'
+down_revision: Union[str, Sequence[str], None] = 'e5a7c9d1b246'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+SEARCH_TRIGGER_FROM_PAYLOAD = """
+CREATE OR REPLACE FUNCTION analyses_search_vector_trigger() RETURNS trigger LANGUAGE plpgsql AS $$
+BEGIN
+    SELECT analyses_search_vector(p.original_text, p.result) INTO NEW.search_vector
+    FROM analysis_payloads p WHERE p.hash = NEW.payload_hash;
+    RETURN NEW;
+END
+$$
+"""
+
+SEARCH_TRIGGER_INLINE = """
+CREATE OR REPLACE FUNCTION analyses_search_vector_trigger() RETURNS trigger LANGUAGE plpgsql AS $$
+BEGIN
+    NEW.search_vector := analyses_search_vector(NEW.original_text, NEW.result);
+    RETURN NEW;
+END
+$$
+"""
+
+# As created by e5a7c9d1b246, for the downgrade
+PAYLOAD_SYNC_FUNCTION = """
+CREATE OR REPLACE FUNCTION analyses_payload_sync() RETURNS trigger LANGUAGE plpgsql AS $$
+BEGIN
+    IF NEW.payload_hash IS NULL THEN
+        NEW.payload_hash := encode(sha256(convert_to(
+            length(NEW.original_text) || ':' || NEW.original_text || NEW.result::text, 'UTF8')), 'hex');
+        INSERT INTO analysis_payloads (hash, original_text, result, refcount)
+        VALUES (NEW.payload_hash, NEW.original_text, NEW.result, 1)
+        ON CONFLICT (hash) DO UPDATE SET refcount = analysis_payloads.refcount + 1;
+    ELSIF NEW.original_text IS NULL THEN
+        SELECT p.original_text, p.result INTO NEW.original_text, NEW.result
+        FROM analysis_payloads p WHERE p.hash = NEW.payload_hash;
+    END IF;
+    RETURN NEW;
+END
+$$
+"""
+
+PAYLOAD_SYNC_TRIGGER = """
+CREATE TRIGGER analyses_payload_sync
+BEFORE INSERT ON analyses
+FOR EACH ROW EXECUTE FUNCTION analyses_payload_sync()
+"""
+
+
+def _create_search_trigger(columns: str) -> None:
+    op.execute("DROP TRIGGER IF EXISTS analyses_search_vector_update ON analyses")
+    op.execute(
+        f"CREATE TRIGGER analyses_search_vector_update BEFORE INSERT OR UPDATE OF {columns} ON analyses "
+        "FOR EACH ROW EXECUTE FUNCTION analyses_search_vector_trigger()"
+    )
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Everything below takes ACCESS EXCLUSIVE on analyses, blocking reads and
+    # writes until commit, but none of it scans or rewrites the table: NOT
+    # NULL is proven by the constraint validated in e5a7c9d1b246 and DROP
+    # COLUMN only marks the columns dropped (space comes back with VACUUM
+    # FULL / pg_repack). The lock timeout keeps the queued lock request from
+    # stalling traffic behind a long-running query; rerun if it fires.
+    op.execute("SET LOCAL lock_timeout = '5s'")
+    op.execute("DROP TRIGGER IF EXISTS analyses_payload_sync ON analyses")
+    op.execute("DROP FUNCTION IF EXISTS analyses_payload_sync()")
+    op.alter_column('analyses', 'payload_hash', nullable=False)
+    op.drop_constraint('analyses_payload_hash_not_null', 'analyses', type_='check')
+    op.execute(SEARCH_TRIGGER_FROM_PAYLOAD)
+    _create_search_trigger("payload_hash")
+    op.drop_column('analyses', 'result')
+    op.drop_column('analyses', 'original_text')
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    # Restores the columns and the expand revision's sync trigger. The copy
+    # back rewrites every row under an exclusive lock.
+    op.add_column('analyses', sa.Column('original_text', sa.Text(), nullable=True))
+    op.add_column('analyses', sa.Column('result', sa.JSON(), nullable=True))
+    op.execute(
+        "UPDATE analyses SET original_text = p.original_text, result = p.result "
+        "FROM analysis_payloads p WHERE p.hash = analyses.payload_hash"
+    )
+    op.alter_column('analyses', 'original_text', nullable=False)
+    op.alter_column('analyses', 'result', nullable=False)
+    op.execute(SEARCH_TRIGGER_INLINE)
+    _create_search_trigger("original_text, result")
+    op.execute(
+        "ALTER TABLE analyses ADD CONSTRAINT analyses_payload_hash_not_null "
+        "CHECK (payload_hash IS NOT NULL)"
+    )
+    op.alter_column('analyses', 'payload_hash', nullable=True)
+    op.execute(PAYLOAD_SYNC_FUNCTION)
+    op.execute(PAYLOAD_SYNC_TRIGGER)
@@ -1,14 +1,37 @@
 from pydantic_settings import BaseSettings
-from pydantic import ConfigDict
+from pydantic import ConfigDict, Field
 
+from pathlib import Path
 from typing import List
 
 class Settings(BaseSettings):
     DATABASE_URL: str
+
+    # Connection pools. The sync engine and the async engine (asyncpg,
+    # used by async routes) each get a pool of this size per worker.
+    DB_POOL_SIZE: int = 5
+    DB_MAX_OVERFLOW: int = 10
+    DB_POOL_TIMEOUT: float = 30.0
+    DB_POOL_RECYCLE_SECONDS: int = 1800
+    DB_POOL_PRE_PING: bool = True
+    # Prepared statements cached per asyncpg connection; 0 behind PgBouncer
+    # in transaction pooling mode
+    DB_STATEMENT_CACHE_SIZE: int = 100
+
     SECRET_KEY: str = "supersecret"
     ALGORITHM: str = "HS256"
     ACCESS_TOKEN_EXPIRE_MINUTES: int = 15
     REFRESH_TOKEN_EXPIRE_DAYS: int = 7
+
+    # Resolved users are cached per worker, keyed by access token, for at
+    # most AUTH_CACHE_TTL_SECONDS and never past the token's exp. Logout
+    # evicts only in the worker that serves it. AUTH_TRUST_TOKEN_CLAIMS lets
+    # read-only routes (history, dashboard) take the user from the signed
+    # token alone, so a deleted user keeps read access until the token expires.
+    AUTH_CACHE_ENABLED: bool = True
+    AUTH_CACHE_TTL_SECONDS: int = 60
+    AUTH_CACHE_MAX_ENTRIES: int = 10_000
+    AUTH_TRUST_TOKEN_CLAIMS: bool = False
     
     # CORS
     BACKEND_CORS_ORIGINS: List[str] = ["http://localhost:3000", "http://localhost:5173"]
@@ -18,6 +41,112 @@ class Settings(BaseSettings):
     ANALYSIS_TIMEOUT: int = 60
     ENABLE_RATE_LIMIT: bool = True
 
+    # Point GEMINI_API_BASE at loadtest/fake_gemini.py for offline testing
+    GEMINI_API_BASE: str = "https://generativelanguage.googleapis.com/v1beta"
+    GEMINI_MODEL: str = "gemini-flash-latest"
+
+    # Upstream (Gemini) HTTP client
+    # ANALYSIS_TIMEOUT is used as the read/write timeout; connecting and
+    # waiting for a free pooled connection have their own, shorter limits.
+    GEMINI_CONNECT_TIMEOUT: float = 5.0
+    GEMINI_POOL_TIMEOUT: float = 5.0
+    GEMINI_MAX_CONNECTIONS: int = 100
+    GEMINI_MAX_KEEPALIVE_CONNECTIONS: int = 20
+    GEMINI_KEEPALIVE_EXPIRY: float = 30.0
+    GEMINI_HTTP2: bool = True
+
+    # AI result cache (in-process LRU in front of the shared analysis_cache table)
+    RESULT_CACHE_ENABLED: bool = True
+    RESULT_CACHE_MAX_ENTRIES: int = 1024
+    RESULT_CACHE_TTL_SECONDS: int = 600
+    RESULT_CACHE_DB_TTL_SECONDS: int = 7 * 24 * 60 * 60
+
+    # Share one in-flight Gemini call between concurrent identical requests
+    ENABLE_REQUEST_COALESCING: bool = True
+
+    # Micro-batching of short texts into one Gemini call (off by default)
+    ENABLE_AI_BATCHING: bool = False
+    AI_BATCH_WINDOW_MS: int = 15
+    AI_BATCH_MAX_SIZE: int = 8
+    AI_BATCH_MAX_TEXT_LENGTH: int = 1000
+
+    # Upstream admission control (per worker): AIMD concurrency limit,
+    # token bucket sized to the Gemini quota (RPM 0 disables it) and a
+    # bounded wait queue
+    GEMINI_CONCURRENCY_INITIAL: int = 8
+    GEMINI_CONCURRENCY_MIN: int = 1
+    GEMINI_CONCURRENCY_MAX: int = 64
+    GEMINI_RATE_LIMIT_RPM: int = 0
+    GEMINI_RATE_LIMIT_BURST: int = 10
+    GEMINI_QUEUE_MAX: int = 200
+    GEMINI_QUEUE_MAX_WAIT: float = 15.0
+
+    # Circuit breaker around Gemini; while open, requests fail fast or are
+    # served by the local heuristic analyzer and marked as degraded
+    CIRCUIT_BREAKER_ENABLED: bool = True
+    CIRCUIT_BREAKER_WINDOW: int = 20
+    CIRCUIT_BREAKER_MIN_CALLS: int = 10
+    CIRCUIT_BREAKER_FAILURE_RATE: float = 0.5
+    CIRCUIT_BREAKER_SLOW_CALL_SECONDS: float = 20.0
+    CIRCUIT_BREAKER_SLOW_CALL_RATE: float = 0.8
+    CIRCUIT_BREAKER_OPEN_SECONDS: float = 30.0
+    CIRCUIT_BREAKER_HALF_OPEN_PROBES: int = 3
+    CIRCUIT_BREAKER_FALLBACK_LOCAL: bool = True
+
+    # Long-document (map-reduce) analysis
+    LONG_DOCUMENT_MAX_CHARS: int = 300_000
+    # Anonymous callers are capped lower and charged one rate-limit request per chunk
+    LONG_DOCUMENT_ANONYMOUS_MAX_CHARS: int = 12_000
+    # Chunks never exceed this (overlap included); each goes through the
+    # 5000-character single-text analysis
+    LONG_DOCUMENT_CHUNK_CHARS: int = Field(4000, gt=0, le=5000)
+    LONG_DOCUMENT_OVERLAP_CHARS: int = 300
+    LONG_DOCUMENT_MAX_CONCURRENCY: int = 8
+    LONG_DOCUMENT_TONE_SHARE: float = 0.25
+
+    # Background analysis jobs (python -m app.worker)
+    JOB_WORKER_CONCURRENCY: int = 4
+    JOB_VISIBILITY_TIMEOUT_SECONDS: int = 300
+    JOB_MAX_ATTEMPTS: int = 3
+    JOB_RETRY_BASE_DELAY_SECONDS: int = 10
+    JOB_POLL_INTERVAL_SECONDS: float = 1.0
+
+    # Batch local analysis (POST /analyze/direct/batch) on a process pool;
+    # 0 workers means one per CPU
+    LOCAL_BATCH_MAX_TEXTS: int = 10_000
+    # Anonymous callers: smaller batches, each text charged to the rate limit
+    LOCAL_BATCH_ANONYMOUS_MAX_TEXTS: int = 5
+    LOCAL_BATCH_WORKERS: int = 0
+    LOCAL_BATCH_CHUNK_SIZE: int = 64
+
+    # Incremental re-analysis of edited drafts: per-sentence results kept
+    # in a bounded in-process LRU (one for local, one for Gemini)
+    INCREMENTAL_CACHE_MAX_SENTENCES: int = 20_000
+
+    # Keyword lexicons for the local analyzer. The file is compiled at startup
+    # and reloaded when it changes on disk or via POST /admin/lexicon/reload.
+    LEXICON_PATH: str = str(Path(__file__).parent / "data" / "lexicon.json")
+    LEXICON_RELOAD_INTERVAL_SECONDS: float = 5.0
+
+    # Write-behind history persistence (off by default): rows are buffered
+    # and inserted in bulk after the response has been sent. Failed flushes
+    # are spilled to NDJSON files in HISTORY_SPILL_DIR and replayed later.
+    HISTORY_WRITE_BEHIND: bool = False
+    HISTORY_FLUSH_MAX_ROWS: int = 500
+    HISTORY_FLUSH_INTERVAL_MS: int = 200
+    HISTORY_BUFFER_MAX_ROWS: int = 10_000
+    HISTORY_SPILL_DIR: str = "history_spill"
+    HISTORY_SPILL_RETRY_SECONDS: float = 5.0
+
+    # GET /history/ page size (default and maximum)
+    HISTORY_PAGE_SIZE: int = 20
+    HISTORY_MAX_PAGE_SIZE: int = 100
+    # Rows fetched per server-side cursor round trip by history exports
+    HISTORY_EXPORT_BATCH_ROWS: int = 1000
+
+    # Users allowed to call /admin endpoints
+    ADMIN_EMAILS: List[str] = []
+
     model_config = ConfigDict(env_file=".env")
 
 settings = Settings()
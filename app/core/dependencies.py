@@ -0,0 +1,164 @@
+"""
+Authentication dependencies shared by every router.
+
+All of them read the ``access_token`` cookie and verify it through
+``decode_token``. The user it names is resolved to a ``CurrentUser`` and
+cached per process, keyed by token, so polling clients don't hit ``users``
+on every request. Entries expire after ``AUTH_CACHE_TTL_SECONDS`` or at the
+token's ``exp``, whichever is first; a token is only decoded on a miss.
+
+``get_current_user_readonly`` serves from the cache (or from the token's
+own claims with ``AUTH_TRUST_TOKEN_CLAIMS``); ``get_current_user_fresh``
+(``/auth/me``, admin routes) always looks the user up and refreshes the
+cached entry. ``invalidate_token`` (logout) and ``invalidate_user`` (user
+deletion) evict in the calling process; other workers drop their entries
+at TTL.
+"""
+
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+
+from fastapi import Depends, HTTPException, Request, status
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from app.config import settings
+from app.core.security import decode_token
+from app.database import get_async_db, get_db
+from app.schemas.user import CurrentUser
+from app.services.auth_service import AuthService
+
+# token -> (expires_at monotonic timestamp, user)
+_cache: "OrderedDict[str, Tuple[float, CurrentUser]]" = OrderedDict()
+_lock = threading.Lock()
+_stats: Dict[str, int] = {"hits": 0, "misses": 0, "trusted": 0}
+
+
+def _credentials_exception() -> HTTPException:
+    return HTTPException(
+        status_code=status.HTTP_401_UNAUTHORIZED,
+        detail="Could not validate credentials",
+    )
+
+
+def _cached(token: str) -> Optional[CurrentUser]:
+    if not settings.AUTH_CACHE_ENABLED:
+        return None
+    with _lock:
+        entry = _cache.get(token)
+        if entry is not None and entry[0] < time.monotonic():
+            del _cache[token]
+            entry = None
+        if entry is None:
+            _stats["misses"] += 1
+            return None
+        _cache.move_to_end(token)
+        _stats["hits"] += 1
+        return entry[1]
+
+
+def _remember(token: str, claims: Dict[str, Any], user) -> CurrentUser:
+    current_user = CurrentUser.model_validate(user)
+    if not settings.AUTH_CACHE_ENABLED:
+        return current_user
+    ttl = min(settings.AUTH_CACHE_TTL_SECONDS, claims["exp"] - time.time())
+    if ttl > 0:
+        with _lock:
+            _cache[token] = (time.monotonic() + ttl, current_user)
+            _cache.move_to_end(token)
+            while len(_cache) > settings.AUTH_CACHE_MAX_ENTRIES:
+                _cache.popitem(last=False)
+    return current_user
+
+
+def invalidate_token(token: Optional[str]) -> None:
+    """Forget a token's cached user (logout)."""
+    if token:
+        with _lock:
+            _cache.pop(token, None)
+
+
+def invalidate_user(user_id: int) -> None:
+    """Forget every cached token of a user; call it wherever a users row is deleted."""
+    with _lock:
+        for token in [token for token, (_, user) in _cache.items() if user.id == user_id]:
+            del _cache[token]
+
+
+def auth_cache_stats() -> Dict[str, int]:
+    with _lock:
+        return {"entries": len(_cache), **_stats}
+
+
+def _resolve(request: Request, db: Session, use_cache: bool) -> CurrentUser:
+    token = request.cookies.get("access_token")
+    if not token:
+        raise _credentials_exception()
+
+    current_user = _cached(token) if use_cache else None
+    if current_user is None:
+        claims = decode_token(token, "access")
+        if claims is None:
+            raise _credentials_exception()
+        user = AuthService.get_user(db, int(claims["sub"]))
+        if user is None:
+            raise _credentials_exception()
+        current_user = _remember(token, claims, user)
+    return current_user
+
+
+def get_current_user_fresh(request: Request, db: Session = Depends(get_db)) -> CurrentUser:
+    """The signed-in user, looked up without the cache, for answers that must reflect the users row now."""
+    return _resolve(request, db, use_cache=False)
+
+
+async def get_current_user_optional(
+    request: Request,
+    db: AsyncSession = Depends(get_async_db)
+) -> Optional[CurrentUser]:
+    """The signed-in user from the cache or a lookup, or None (anonymous) instead of a 401."""
+    token = request.cookies.get("access_token")
+    if not token:
+        return None
+
+    current_user = _cached(token)
+    if current_user is None:
+        claims = decode_token(token, "access")
+        if claims is None:
+            return None
+        user = await AuthService.get_user_async(db, int(claims["sub"]))
+        # Hand the connection back to the pool while the handler waits on Gemini;
+        # the session checks one out again if the result is saved
+        await db.close()
+        if user is None:
+            return None
+        current_user = _remember(token, claims, user)
+    return current_user
+
+
+def get_current_user_readonly(request: Request, db: Session = Depends(get_db)) -> CurrentUser:
+    """
+    The signed-in user, for routes that only read the user's own data.
+
+    With ``AUTH_TRUST_TOKEN_CLAIMS`` the user is built from the verified
+    token's claims, without a lookup; tokens issued before the claims were
+    added fall back to the lookup.
+    """
+    token = request.cookies.get("access_token")
+    if settings.AUTH_TRUST_TOKEN_CLAIMS and token:
+        claims = decode_token(token, "access")
+        if claims is None:
+            raise _credentials_exception()
+        if "name" in claims and "email" in claims:
+            with _lock:
+                _stats["trusted"] += 1
+            return CurrentUser(id=int(claims["sub"]), name=claims["name"], email=claims["email"])
+    return _resolve(request, db, use_cache=True)
+
+
+def get_current_admin(current_user: CurrentUser = Depends(get_current_user_fresh)) -> CurrentUser:
+    if current_user.email not in settings.ADMIN_EMAILS:
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Admin access required")
+    return current_user
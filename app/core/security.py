@@ -1,5 +1,6 @@
 from passlib.context import CryptContext
 from datetime import datetime, timedelta
+from typing import Any, Dict, Optional
 from jose import JWTError, jwt
 from app.config import settings
 
@@ -22,3 +23,13 @@ def create_refresh_token(data: dict):
     expire = datetime.utcnow() + timedelta(days=settings.REFRESH_TOKEN_EXPIRE_DAYS)
     to_encode.update({"exp": expire, "type": "refresh"})
     return jwt.encode(to_encode, settings.SECRET_KEY, algorithm=settings.ALGORITHM)
+
+def decode_token(token: str, token_type: str) -> Optional[Dict[str, Any]]:
+    """Verified claims of a token of the given type ("access"/"refresh"), or None."""
+    try:
+        payload = jwt.decode(token, settings.SECRET_KEY, algorithms=[settings.ALGORITHM])
+    except JWTError:
+        return None
+    if payload.get("sub") is None or payload.get("type") != token_type:
+        return None
+    return payload
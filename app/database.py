@@ -1,14 +1,75 @@
+from typing import Any, AsyncIterator, Dict, Optional
+
 from sqlalchemy import create_engine
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession, async_sessionmaker, create_async_engine
 from sqlalchemy.orm import sessionmaker, declarative_base
 from app.config import settings
 
-engine = create_engine(settings.DATABASE_URL)
+# Async drivers for the sync URLs DATABASE_URL is written with
+_ASYNC_DRIVERS = {"postgresql": "asyncpg", "sqlite": "aiosqlite"}
+
+
+def _pool_options(url) -> Dict[str, Any]:
+    options: Dict[str, Any] = {"pool_pre_ping": settings.DB_POOL_PRE_PING}
+    if url.get_backend_name() != "sqlite":
+        options.update(
+            pool_size=settings.DB_POOL_SIZE,
+            max_overflow=settings.DB_MAX_OVERFLOW,
+            pool_timeout=settings.DB_POOL_TIMEOUT,
+            pool_recycle=settings.DB_POOL_RECYCLE_SECONDS,
+        )
+    return options
+
+
+_url = make_url(settings.DATABASE_URL)
+engine = create_engine(_url, **_pool_options(_url))
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 Base = declarative_base()
 
+# Bound to the async engine on first use, so the async driver is only
+# imported by processes that actually talk to the database asynchronously
+AsyncSessionLocal = async_sessionmaker(autoflush=False, expire_on_commit=False)
+_async_engine: Optional[AsyncEngine] = None
+
+
 def get_db():
     db = SessionLocal()
     try:
         yield db
     finally:
         db.close()
+
+
+def get_async_engine() -> AsyncEngine:
+    global _async_engine
+    if _async_engine is None:
+        backend = _url.get_backend_name()
+        url = _url.set(drivername=f"{backend}+{_ASYNC_DRIVERS.get(backend, _url.get_driver_name())}")
+        connect_args: Dict[str, Any] = {}
+        if url.get_driver_name() == "asyncpg":
+            # Both asyncpg's own and SQLAlchemy's prepared statement caches;
+            # set DB_STATEMENT_CACHE_SIZE=0 behind PgBouncer in transaction mode
+            url = url.update_query_dict({"prepared_statement_cache_size": str(settings.DB_STATEMENT_CACHE_SIZE)})
+            connect_args["statement_cache_size"] = settings.DB_STATEMENT_CACHE_SIZE
+        _async_engine = create_async_engine(url, connect_args=connect_args, **_pool_options(url))
+        AsyncSessionLocal.configure(bind=_async_engine)
+    return _async_engine
+
+
+async def dispose_async_engine() -> None:
+    global _async_engine
+    if _async_engine is not None:
+        await _async_engine.dispose()
+        _async_engine = None
+
+
+def new_async_session() -> AsyncSession:
+    """An AsyncSession for work outside a request (streamed responses, background tasks)."""
+    get_async_engine()
+    return AsyncSessionLocal()
+
+
+async def get_async_db() -> AsyncIterator[AsyncSession]:
+    async with new_async_session() as db:
+        yield db
@@ -0,0 +1,52 @@
+"""
+Archive history exports to files, one per user.
+
+    python -m app.export OUT_DIR [--user-id N] [--format ndjson|csv]
+                         [--since ISO] [--until ISO] [--gzip]
+
+Writes ``history-<user_id>.<format>[.gz]`` for every user with at least
+one analysis (or just ``--user-id``), streamed like ``GET /history/export``.
+Files are written under a temporary name and renamed when complete.
+"""
+
+import argparse
+import os
+import sys
+from datetime import datetime
+from pathlib import Path
+
+from app.database import SessionLocal
+from app.services.export_service import ExportService
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Export analysis history to files.")
+    parser.add_argument("out_dir", type=Path)
+    parser.add_argument("--user-id", type=int, default=None, help="only this user (default: everyone)")
+    parser.add_argument("--format", choices=["ndjson", "csv"], default="ndjson")
+    parser.add_argument("--since", type=datetime.fromisoformat, default=None, help="inclusive")
+    parser.add_argument("--until", type=datetime.fromisoformat, default=None, help="exclusive")
+    parser.add_argument("--gzip", action="store_true")
+    args = parser.parse_args()
+
+    args.out_dir.mkdir(parents=True, exist_ok=True)
+    db = SessionLocal()
+    try:
+        user_ids = [args.user_id] if args.user_id is not None else ExportService.user_ids(db)
+        for user_id in user_ids:
+            path = args.out_dir / ExportService.filename(user_id, args.format, args.gzip)
+            partial = path.with_name(path.name + ".partial")
+            with open(partial, "wb") as f:
+                for chunk in ExportService.iter_export(db, user_id, args.format, args.since, args.until, args.gzip):
+                    f.write(chunk)
+            os.replace(partial, path)
+            # End the read transaction between users instead of holding one
+            # snapshot open for the whole archive
+            db.rollback()
+        print(f"Exported {len(user_ids)} user(s) to {args.out_dir}", file=sys.stderr)
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -1,10 +1,43 @@
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from app.routes import auth, analyze, history
 from app.routes import dashboard
+from app.routes import admin
 from app.config import settings
+from app.services.gemini_client import get_http_client, close_http_client
+from app.services.result_cache import ResultCache
+from app.services.local_pool import shutdown_local_pool
+from app.database import dispose_async_engine
+from app.services.history_writer import history_writer
+from starlette.concurrency import run_in_threadpool
+import logging
 
-app = FastAPI(title="Claim Hunter Backend")
+logger = logging.getLogger(__name__)
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Open the pooled upstream client once per worker and close it on shutdown
+    get_http_client()
+    if settings.RESULT_CACHE_ENABLED:
+        try:
+            purged = await run_in_threadpool(ResultCache.purge_stale)
+            if purged:
+                logger.info(f"Purged {purged} stale result cache entries")
+        except Exception as e:
+            logger.warning(f"Result cache purge skipped: {e}")
+    if settings.HISTORY_WRITE_BEHIND:
+        history_writer.start()
+    yield
+    # Drain buffered history rows while the database engine is still open
+    await history_writer.stop()
+    await close_http_client()
+    await run_in_threadpool(shutdown_local_pool)
+    await dispose_async_engine()
+
+
+app = FastAPI(title="Claim Hunter Backend", lifespan=lifespan)
 
 # CORS Middleware
 app.add_middleware(
@@ -16,6 +49,8 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    # Pagination cursor for GET /history/
+    expose_headers=["X-Next-Cursor"],
 )
 
 # Include Routers
@@ -23,6 +58,7 @@ app.include_router(auth.router, prefix="/auth", tags=["Auth"])
 app.include_router(analyze.router, prefix="/analyze", tags=["Analysis"])
 app.include_router(history.router, prefix="/history", tags=["History"])
 app.include_router(dashboard.router, prefix="/dashboard", tags=["Dashboard"])
+app.include_router(admin.router, prefix="/admin", tags=["Admin"])
 
 @app.get("/")
 def read_root():
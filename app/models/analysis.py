@@ -1,15 +1,64 @@
-from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, Text, JSON
+from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, Text, Index
 from sqlalchemy.sql import func
-from sqlalchemy.orm import relationship
+from sqlalchemy.dialects.postgresql import TSVECTOR
+from sqlalchemy.orm import relationship, deferred
 from app.database import Base
+from app.models.analysis_payload import AnalysisPayload
 
 class Analysis(Base):
     __tablename__ = "analyses"
 
     id = Column(Integer, primary_key=True, index=True)
     user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
-    original_text = Column(Text, nullable=False)
-    result = Column(JSON, nullable=False)
+    # Text and result live in analysis_payloads, shared by identical submissions
+    payload_hash = Column(String(64), ForeignKey("analysis_payloads.hash"), nullable=False, index=True)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
 
+    # Copied out of ``result`` at write time so lists and filters never touch the blob
+    summary_score = Column(Integer, nullable=True)
+    overall_risk_level = Column(String(16), nullable=True)
+    emotional_tone = Column(String(32), nullable=True)
+    manipulation_score = Column(Integer, nullable=True)
+    claim_count = Column(Integer, nullable=True)
+
+    # Full-text index over the text and claim texts; written by the
+    # analyses_search_vector_update trigger (Postgres), never by the app
+    search_vector = deferred(Column(Text().with_variant(TSVECTOR(), "postgresql"), nullable=True))
+
     user = relationship("User", backref="analyses")
+    payload = relationship(AnalysisPayload)
+
+    # created_at comes back from the INSERT (RETURNING) instead of a re-SELECT
+    __mapper_args__ = {"eager_defaults": True}
+
+    __table_args__ = (
+        # Serves per-user history pages newest-first (keyset pagination)
+        Index("ix_analyses_user_created_id", user_id, created_at.desc(), id.desc()),
+        # Risk-filtered history pages ("high risk this week")
+        Index("ix_analyses_user_risk_created_id", user_id, overall_risk_level, created_at.desc(), id.desc()),
+        Index("ix_analyses_user_summary_score", user_id, summary_score),
+        # GET /history/search; btree_gin lets the user_id scope live in the same index
+        Index("ix_analyses_user_search", user_id, search_vector, postgresql_using="gin"),
+    )
+
+    # Read-only views of the payload, so AnalysisResponse keeps its shape;
+    # load it with joinedload(Analysis.payload) to avoid one query per row
+    @property
+    def original_text(self) -> str:
+        return self.payload.original_text
+
+    @property
+    def result(self) -> dict:
+        return self.payload.result
+
+    @staticmethod
+    def summary_columns(result: dict) -> dict:
+        """Denormalized column values for a result dict."""
+        claims = result.get("claims")
+        return {
+            "summary_score": result.get("summary_score"),
+            "overall_risk_level": result.get("overall_risk_level"),
+            "emotional_tone": result.get("emotional_tone"),
+            "manipulation_score": result.get("manipulation_score"),
+            "claim_count": len(claims) if isinstance(claims, list) else 0,
+        }
@@ -0,0 +1,33 @@
+from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, Text, JSON, Index
+from sqlalchemy.sql import func
+from app.database import Base
+
+class AnalysisJob(Base):
+    __tablename__ = "analysis_jobs"
+
+    QUEUED = "queued"
+    RUNNING = "running"
+    SUCCEEDED = "succeeded"
+    FAILED = "failed"
+
+    id = Column(String(36), primary_key=True)
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=True, index=True)
+    text = Column(Text, nullable=False)
+    status = Column(String(16), nullable=False, default=QUEUED)
+    attempts = Column(Integer, nullable=False, default=0)
+    max_attempts = Column(Integer, nullable=False)
+    run_after = Column(DateTime(timezone=True), nullable=False, server_default=func.now())
+    locked_until = Column(DateTime(timezone=True), nullable=True)
+    # "<worker id>/<claim nonce>"; worker ids embed the hostname (pod names, FQDNs)
+    locked_by = Column(String(255), nullable=True)
+    result = Column(JSON, nullable=True)
+    error = Column(Text, nullable=True)
+    analysis_id = Column(Integer, ForeignKey("analyses.id"), nullable=True)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
+
+    __table_args__ = (
+        # Claim queries only ever look at pending or in-flight jobs
+        Index("ix_analysis_jobs_queued", "run_after", postgresql_where=status == QUEUED),
+        Index("ix_analysis_jobs_running", "locked_until", postgresql_where=status == RUNNING),
+    )
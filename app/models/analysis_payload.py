@@ -0,0 +1,35 @@
+import hashlib
+import json
+
+from sqlalchemy import Column, Integer, String, DateTime, Text, JSON
+from sqlalchemy.sql import func
+from app.database import Base
+
+class AnalysisPayload(Base):
+    """
+    Text and result of an analysis, stored once per distinct content and
+    shared by every ``analyses`` row that references it.
+    """
+    __tablename__ = "analysis_payloads"
+
+    hash = Column(String(64), primary_key=True)
+    original_text = Column(Text, nullable=False)
+    result = Column(JSON, nullable=False)
+    # Number of analyses rows pointing here, maintained by PayloadService
+    refcount = Column(Integer, nullable=False, default=0, server_default="0")
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+
+    @staticmethod
+    def hash_for(original_text: str, result: dict) -> str:
+        """
+        Content address of a (text, result) pair.
+
+        The result is part of the key because the same text can get a
+        different result (prompt version, local vs AI, degraded), and every
+        history entry keeps its own. ``result`` is serialized exactly as it
+        is stored in the JSON column, so Postgres can compute the same hash as
+        ``sha256(length(original_text) || ':' || original_text || result::text)``
+        (see the payload migration's backfill).
+        """
+        raw = f"{len(original_text)}:{original_text}{json.dumps(result)}"
+        return hashlib.sha256(raw.encode("utf-8")).hexdigest()
@@ -0,0 +1,17 @@
+from sqlalchemy import Column, Integer, BigInteger, DateTime, ForeignKey
+from sqlalchemy.sql import func
+from app.database import Base
+
+class UserAnalysisStats(Base):
+    """Per-user rollup of ``analyses``, maintained alongside every insert."""
+    __tablename__ = "user_analysis_stats"
+
+    user_id = Column(Integer, ForeignKey("users.id"), primary_key=True)
+    total_analyses = Column(Integer, nullable=False, default=0)
+    low_count = Column(Integer, nullable=False, default=0)
+    medium_count = Column(Integer, nullable=False, default=0)
+    high_count = Column(Integer, nullable=False, default=0)
+    # average_score = score_sum / score_count (rows without a summary_score are skipped)
+    score_sum = Column(BigInteger, nullable=False, default=0)
+    score_count = Column(Integer, nullable=False, default=0)
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
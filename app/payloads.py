@@ -0,0 +1,41 @@
+"""
+Refcount check and repair for the deduplicated analysis payloads.
+
+    python -m app.payloads check
+    python -m app.payloads repair
+
+``check`` exits with status 1 if any payload's refcount differs from the
+number of analyses referencing it; ``repair`` recounts those payloads and
+deletes the ones nothing references.
+"""
+
+import argparse
+import json
+import sys
+
+from app.database import SessionLocal
+from app.services.payload_service import PayloadService
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Check or repair analysis_payloads refcounts.")
+    parser.add_argument("command", choices=["check", "repair"])
+    args = parser.parse_args()
+
+    db = SessionLocal()
+    try:
+        if args.command == "check":
+            mismatches = PayloadService.check(db)
+            for mismatch in mismatches:
+                print(json.dumps(mismatch))
+            print(f"{len(mismatches)} payload(s) out of sync", file=sys.stderr)
+            sys.exit(1 if mismatches else 0)
+
+        fixed, deleted = PayloadService.repair(db)
+        print(f"Recounted {fixed} payload(s), deleted {deleted} unreferenced", file=sys.stderr)
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
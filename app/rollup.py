@@ -0,0 +1,45 @@
+"""
+Consistency check and rebuild for the per-user dashboard rollups.
+
+    python -m app.rollup check [--user-id N]
+    python -m app.rollup rebuild [--user-id N]
+
+``check`` exits with status 1 if any rollup differs from the analyses it
+summarizes; ``rebuild`` recomputes rollups (all users by default) from
+``analyses``.
+"""
+
+import argparse
+import json
+import sys
+
+from app.database import SessionLocal
+from app.models.user import User
+from app.services.stats_service import StatsService
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Check or rebuild user_analysis_stats.")
+    parser.add_argument("command", choices=["check", "rebuild"])
+    parser.add_argument("--user-id", type=int, default=None, help="only this user (default: everyone)")
+    args = parser.parse_args()
+
+    db = SessionLocal()
+    try:
+        if args.command == "check":
+            mismatches = StatsService.check(db, args.user_id)
+            for mismatch in mismatches:
+                print(json.dumps(mismatch))
+            print(f"{len(mismatches)} user(s) out of sync", file=sys.stderr)
+            sys.exit(1 if mismatches else 0)
+
+        user_ids = [args.user_id] if args.user_id is not None else [uid for (uid,) in db.query(User.id).order_by(User.id)]
+        for user_id in user_ids:
+            StatsService.rebuild(db, user_id)
+        print(f"Rebuilt rollups for {len(user_ids)} user(s)", file=sys.stderr)
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,44 @@
+from fastapi import APIRouter, Depends, HTTPException
+from starlette.concurrency import run_in_threadpool
+from app.core.dependencies import get_current_admin
+from app.schemas.user import CurrentUser
+from app.services.lexicon import lexicons, LexiconError
+from app.services.result_cache import ResultCache
+
+router = APIRouter()
+
+
+@router.get("/lexicon")
+def get_lexicon(admin: CurrentUser = Depends(get_current_admin)):
+    """Version, content hash and keyword counts of the active lexicon in this worker."""
+    return lexicons.current().info()
+
+
+@router.post("/lexicon/reload")
+async def reload_lexicon(admin: CurrentUser = Depends(get_current_admin)):
+    """
+    Reload the keyword lexicon from disk in this worker.
+
+    Requests already running finish with the previous lexicon. An invalid
+    file is rejected and the previous lexicon stays active. Other workers
+    (and process-pool workers) pick the change up from the file within
+    ``LEXICON_RELOAD_INTERVAL_SECONDS``.
+    """
+    try:
+        lexicon = await run_in_threadpool(lexicons.reload)
+    except LexiconError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+    return lexicon.info()
+
+
+@router.post("/cache/invalidate")
+async def invalidate_result_cache(admin: CurrentUser = Depends(get_current_admin)):
+    """
+    Drop every cached AI result: this worker's memory tier and the shared
+    ``analysis_cache`` table.
+
+    Other workers keep serving their in-memory copies for at most
+    ``RESULT_CACHE_TTL_SECONDS``.
+    """
+    deleted = await run_in_threadpool(ResultCache.invalidate_all)
+    return {"deleted": deleted}
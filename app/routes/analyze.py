@@ -1,42 +1,48 @@
 from fastapi import APIRouter, Depends, HTTPException, Request, status
+from fastapi.responses import StreamingResponse
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
-from app.database import get_db
-from app.schemas.analysis import AnalysisRequest, AnalysisCreate
-from app.schemas.ai_analysis import AIAnalysisResponse
+from app.database import get_db, get_async_db, new_async_session
+from app.schemas.analysis import AnalysisRequest, AnalysisCreate, BatchAnalysisRequest, BatchAnalysisResponse
+from app.schemas.ai_analysis import AIAnalysisResponse, IncrementalAnalysisResponse
+from app.schemas.job import JobCreateResponse, JobStatusResponse
 from app.services.analysis_service import AnalysisService
 from app.services.local_analyzer import analyze_text_local
-from app.models.user import User
+from app.services.local_pool import analyze_batch_local
+from app.services.result_cache import ResultCache
+from app.services.job_service import JobService
+from app.services.analysis_stream import stream_ai_analysis, sse_event
+from app.services.incremental_analysis import analyze_ai_incremental, analyze_local_incremental, incremental_cache_stats
+from app.services.gemini_client import upstream_limiter, gemini_breaker
+from app.services.history_writer import history_writer
+from app.core.dependencies import get_current_admin, get_current_user_optional, auth_cache_stats
+from app.schemas.user import CurrentUser
 from app.utils.rate_limiter import rate_limit_dependency
-from typing import Optional
+from typing import List, Optional
+import json
+import math
 from app.config import settings
-from jose import JWTError, jwt
 
 router = APIRouter()
 
-async def get_current_user_optional(
-    request: Request,
-    db: Session = Depends(get_db)
-) -> Optional[User]:
-    token = request.cookies.get("access_token")
-    if not token:
-        return None
-    try:
-        payload = jwt.decode(token, settings.SECRET_KEY, algorithms=[settings.ALGORITHM])
-        user_id: str = payload.get("sub")
-        if user_id is None:
-            return None
-    except JWTError:
-        return None
-    
-    return db.query(User).filter(User.id == int(user_id)).first()
+
+async def _limit_anonymous_long_document(request: Request, text: str) -> None:
+    # One long document fans out into a Gemini call per chunk, so each chunk
+    # counts against the anonymous rate limit
+    if len(text) > settings.LONG_DOCUMENT_ANONYMOUS_MAX_CHARS:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail=f"Log in to analyze documents over {settings.LONG_DOCUMENT_ANONYMOUS_MAX_CHARS} characters",
+        )
+    await rate_limit_dependency(request, cost=max(1, math.ceil(len(text) / settings.LONG_DOCUMENT_CHUNK_CHARS)))
 
 
 @router.post("/", response_model=AIAnalysisResponse)
 async def analyze_text(
     request: Request,
     body: AnalysisRequest,
-    current_user: Optional[User] = Depends(get_current_user_optional),
-    db: Session = Depends(get_db)
+    current_user: Optional[CurrentUser] = Depends(get_current_user_optional),
+    db: AsyncSession = Depends(get_async_db)
 ):
     # Check rate limit if anonymous
     if not current_user:
@@ -58,16 +64,174 @@ async def analyze_text(
             original_text=body.text,
             result=ai_result.model_dump()
         )
-        AnalysisService.create_analysis(db, analysis_create, current_user.id)
+        if not history_writer.submit(current_user.id, analysis_create):
+            await AnalysisService.create_analysis_async(db, analysis_create, current_user.id)
     
     # Always return the AI structure directly
     return ai_result
 
 
+@router.post("/long", response_model=AIAnalysisResponse)
+async def analyze_long_text(
+    request: Request,
+    body: AnalysisRequest,
+    current_user: Optional[CurrentUser] = Depends(get_current_user_optional),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """
+    AI analysis for long documents (articles, transcripts).
+
+    The text is split into overlapping chunks that are analyzed concurrently
+    and merged into one AIAnalysisResponse: duplicate claims are removed and
+    summary_score is recomputed with the usual formula.
+    """
+    if not current_user:
+        await _limit_anonymous_long_document(request, body.text)
+
+    ai_result = await AnalysisService.perform_long_ai_analysis(body.text)
+
+    if current_user:
+        analysis_create = AnalysisCreate(
+            original_text=body.text,
+            result=ai_result.model_dump()
+        )
+        if not history_writer.submit(current_user.id, analysis_create):
+            await AnalysisService.create_analysis_async(db, analysis_create, current_user.id)
+
+    return ai_result
+
+
+@router.post("/incremental", response_model=IncrementalAnalysisResponse)
+async def analyze_text_incremental(
+    request: Request,
+    body: AnalysisRequest,
+    current_user: Optional[CurrentUser] = Depends(get_current_user_optional),
+):
+    """
+    AI analysis for drafts that are re-submitted after each edit.
+
+    Sentences analyzed in an earlier submission are reused; only new or
+    edited ones are sent to Gemini. ``sentences_reused`` reports how many
+    were served from cache. Drafts are not saved to history.
+    """
+    if not current_user:
+        await rate_limit_dependency(request)
+
+    if not body.text or not body.text.strip():
+        raise HTTPException(status_code=400, detail="Input text cannot be empty")
+
+    if len(body.text) > 5000:
+        raise HTTPException(status_code=400, detail="Input text exceeds 5000 characters")
+
+    return await analyze_ai_incremental(body.text)
+
+
+@router.post("/jobs", response_model=JobCreateResponse, status_code=status.HTTP_202_ACCEPTED)
+async def create_analysis_job(
+    request: Request,
+    body: AnalysisRequest,
+    current_user: Optional[CurrentUser] = Depends(get_current_user_optional),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """
+    Queue an AI analysis and return immediately with a job id.
+
+    A worker (``python -m app.worker``) picks the job up; poll
+    ``GET /analyze/jobs/{job_id}`` for the result. Completed jobs are saved to
+    history for authenticated users.
+    """
+    if not current_user:
+        # Texts over 5000 characters run as long documents in the worker
+        await _limit_anonymous_long_document(request, body.text)
+
+    if not body.text or not body.text.strip():
+        raise HTTPException(status_code=400, detail="Input text cannot be empty")
+
+    if len(body.text) > settings.LONG_DOCUMENT_MAX_CHARS:
+        raise HTTPException(status_code=400, detail=f"Input text exceeds {settings.LONG_DOCUMENT_MAX_CHARS} characters")
+
+    job = await JobService.enqueue_async(db, body.text, current_user.id if current_user else None)
+    return JobCreateResponse(job_id=job.id, status=job.status)
+
+
+@router.get("/jobs/{job_id}", response_model=JobStatusResponse)
+def get_analysis_job(
+    job_id: str,
+    current_user: Optional[CurrentUser] = Depends(get_current_user_optional),
+    db: Session = Depends(get_db)
+):
+    job = JobService.get_job(db, job_id)
+    # Jobs owned by a user are only visible to that user
+    if not job or (job.user_id is not None and (not current_user or current_user.id != job.user_id)):
+        raise HTTPException(status_code=404, detail="Job not found")
+
+    return JobStatusResponse(
+        job_id=job.id,
+        status=job.status,
+        attempts=job.attempts,
+        result=job.result,
+        error=job.error,
+        analysis_id=job.analysis_id,
+        created_at=job.created_at,
+        updated_at=job.updated_at,
+    )
+
+
+@router.post("/stream")
+async def analyze_text_stream(
+    request: Request,
+    body: AnalysisRequest,
+    current_user: Optional[CurrentUser] = Depends(get_current_user_optional),
+):
+    """
+    Stream an AI analysis as Server-Sent Events.
+
+    Emits a ``claim`` event per ClaimResult as soon as Gemini has generated
+    it, then ``summary`` (summary_score / overall_risk_level) and ``result``
+    (the full, validated AIAnalysisResponse). Failures after the stream has
+    started are reported as an ``error`` event with the usual status/detail.
+    """
+    if not current_user:
+        await rate_limit_dependency(request)
+
+    if not body.text or not body.text.strip():
+        raise HTTPException(status_code=400, detail="Input text cannot be empty")
+
+    if len(body.text) > 5000:
+        raise HTTPException(status_code=400, detail="Input text exceeds 5000 characters")
+
+    text = body.text
+    user_id = current_user.id if current_user else None
+
+    async def event_stream():
+        try:
+            async for event, data in stream_ai_analysis(text):
+                yield sse_event(event, data)
+                if event == "result" and user_id is not None:
+                    await _save_streamed_analysis(text, data, user_id)
+        except HTTPException as e:
+            yield sse_event("error", {"status_code": e.status_code, "detail": e.detail})
+
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+async def _save_streamed_analysis(text: str, result: dict, user_id: int) -> None:
+    analysis_create = AnalysisCreate(original_text=text, result=result)
+    if history_writer.submit(user_id, analysis_create):
+        return
+    # The request-scoped session may already be closed once the body streams
+    async with new_async_session() as db:
+        await AnalysisService.create_analysis_async(db, analysis_create, user_id)
+
+
 @router.post("/direct", response_model=AIAnalysisResponse)
 def analyze_text_direct(
     body: AnalysisRequest,
-    current_user: Optional[User] = Depends(get_current_user_optional),
+    current_user: Optional[CurrentUser] = Depends(get_current_user_optional),
     db: Session = Depends(get_db),
 ):
     """
@@ -95,6 +259,115 @@ def analyze_text_direct(
             original_text=body.text,
             result=result.model_dump(),
         )
-        AnalysisService.create_analysis(db, analysis_create, current_user.id)
+        if not history_writer.submit(current_user.id, analysis_create):
+            AnalysisService.create_analysis(db, analysis_create, current_user.id)
 
     return result
+
+
+@router.post("/direct/incremental", response_model=IncrementalAnalysisResponse)
+def analyze_text_direct_incremental(body: AnalysisRequest):
+    """
+    Local heuristic analysis that re-scores only new or edited sentences.
+
+    Same result as ``POST /analyze/direct``; drafts are not saved to history.
+    """
+    if not body.text or not body.text.strip():
+        raise HTTPException(status_code=400, detail="Input text cannot be empty")
+
+    if len(body.text) > 5000:
+        raise HTTPException(status_code=400, detail="Input text exceeds 5000 characters")
+
+    return analyze_local_incremental(body.text)
+
+
+@router.post("/direct/batch", response_model=BatchAnalysisResponse)
+async def analyze_text_direct_batch(
+    request: Request,
+    body: BatchAnalysisRequest,
+    current_user: Optional[CurrentUser] = Depends(get_current_user_optional),
+):
+    """
+    Local heuristic analysis for many texts at once, spread over CPU cores.
+
+    Results come back in input order. With ``save`` (authenticated users
+    only) they are written to history in a single bulk insert. With
+    ``stream`` the response is NDJSON, one ``{"index", "result"}`` line per
+    text as each chunk finishes, followed by a final ``{"saved"}`` line.
+    """
+    if not body.texts:
+        raise HTTPException(status_code=400, detail="No texts provided")
+
+    if len(body.texts) > settings.LOCAL_BATCH_MAX_TEXTS:
+        raise HTTPException(status_code=400, detail=f"Batch exceeds {settings.LOCAL_BATCH_MAX_TEXTS} texts")
+
+    if not current_user:
+        if len(body.texts) > settings.LOCAL_BATCH_ANONYMOUS_MAX_TEXTS:
+            raise HTTPException(
+                status_code=status.HTTP_401_UNAUTHORIZED,
+                detail=f"Log in to analyze more than {settings.LOCAL_BATCH_ANONYMOUS_MAX_TEXTS} texts at once",
+            )
+        await rate_limit_dependency(request, cost=len(body.texts))
+
+    for i, text in enumerate(body.texts):
+        if not text or not text.strip():
+            raise HTTPException(status_code=400, detail=f"Text {i} cannot be empty")
+        if len(text) > 5000:
+            raise HTTPException(status_code=400, detail=f"Text {i} exceeds 5000 characters")
+
+    texts = body.texts
+    user_id = current_user.id if current_user and body.save else None
+
+    if body.stream:
+        async def ndjson_stream():
+            results = []
+            async for offset, chunk in analyze_batch_local(texts):
+                for i, result in enumerate(chunk):
+                    results.append(result)
+                    yield json.dumps({"index": offset + i, "result": result.model_dump()}) + "\n"
+            saved = 0
+            if user_id is not None:
+                saved = await _save_batch(texts, results, user_id)
+            yield json.dumps({"saved": saved}) + "\n"
+
+        return StreamingResponse(ndjson_stream(), media_type="application/x-ndjson")
+
+    results = []
+    async for _, chunk in analyze_batch_local(texts):
+        results.extend(chunk)
+
+    saved = 0
+    if user_id is not None:
+        saved = await _save_batch(texts, results, user_id)
+
+    return BatchAnalysisResponse(results=results, saved=saved)
+
+
+async def _save_batch(texts: List[str], results: List[AIAnalysisResponse], user_id: int) -> int:
+    async with new_async_session() as db:
+        return await AnalysisService.create_analyses_bulk_async(
+            db,
+            [AnalysisCreate(original_text=t, result=r.model_dump()) for t, r in zip(texts, results)],
+            user_id,
+        )
+
+
+@router.get("/cache/stats")
+def get_cache_stats(admin: CurrentUser = Depends(get_current_admin)):
+    """Hit/miss counters for the AI result cache, the per-sentence caches and the auth cache in this worker."""
+    return {**ResultCache.stats(), "sentences": incremental_cache_stats(), "auth": auth_cache_stats()}
+
+
+@router.get("/history-writer/stats")
+def get_history_writer_stats(admin: CurrentUser = Depends(get_current_admin)):
+    """Backlog, flush latency and spill counters of write-behind history persistence in this worker."""
+    return history_writer.stats()
+
+
+@router.get("/upstream/stats")
+def get_upstream_stats(admin: CurrentUser = Depends(get_current_admin)):
+    """Admission-control gauges and circuit state for Gemini calls in this worker."""
+    return {
+        "limiter": upstream_limiter.stats(),
+        "circuit": gemini_breaker.stats(),
+    }
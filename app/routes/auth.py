@@ -1,41 +1,18 @@
 from fastapi import APIRouter, Depends, HTTPException, status, Response, Request
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
-from app.database import get_db
-from app.schemas.user import UserCreate, UserLogin, UserResponse
+from app.database import get_db, get_async_db
+from app.schemas.user import UserCreate, UserLogin, UserResponse, CurrentUser
 from app.services.auth_service import AuthService
-from app.models.user import User
-from jose import JWTError, jwt
+from app.core.dependencies import get_current_user_fresh, invalidate_token
+from app.core.security import decode_token
 from app.config import settings
 
 router = APIRouter()
 
-# Dependency to get current user from cookie
-def get_current_user(request: Request, db: Session = Depends(get_db)):
-    token = request.cookies.get("access_token")
-    credentials_exception = HTTPException(
-        status_code=status.HTTP_401_UNAUTHORIZED,
-        detail="Could not validate credentials",
-    )
-    if not token:
-        raise credentials_exception
-        
-    try:
-        payload = jwt.decode(token, settings.SECRET_KEY, algorithms=[settings.ALGORITHM])
-        user_id: str = payload.get("sub")
-        token_type: str = payload.get("type")
-        if user_id is None or token_type != "access":
-            raise credentials_exception
-    except JWTError:
-        raise credentials_exception
-    
-    user = db.query(User).filter(User.id == int(user_id)).first()
-    if user is None:
-        raise credentials_exception
-    return user
-
 @router.post("/register", response_model=UserResponse)
-def register(response: Response, user: UserCreate, db: Session = Depends(get_db)):
-    new_user = AuthService.register_user(db, user)
+async def register(response: Response, user: UserCreate, db: AsyncSession = Depends(get_async_db)):
+    new_user = await AuthService.register_user_async(db, user)
     tokens = AuthService.create_tokens(new_user)
     
     # Set cookies
@@ -59,8 +36,8 @@ def register(response: Response, user: UserCreate, db: Session = Depends(get_db)
     return new_user
 
 @router.post("/login")
-def login(response: Response, user: UserLogin, db: Session = Depends(get_db)):
-    db_user = AuthService.authenticate_user(db, user)
+async def login(response: Response, user: UserLogin, db: AsyncSession = Depends(get_async_db)):
+    db_user = await AuthService.authenticate_user_async(db, user)
     if not db_user:
         raise HTTPException(status_code=400, detail="Invalid credentials")
     
@@ -97,45 +74,39 @@ def refresh_token(request: Request, response: Response, db: Session = Depends(ge
     if not refresh_token:
         raise credentials_exception
 
-    try:
-        payload = jwt.decode(refresh_token, settings.SECRET_KEY, algorithms=[settings.ALGORITHM])
-        user_id: str = payload.get("sub")
-        token_type: str = payload.get("type")
-        
-        if user_id is None or token_type != "refresh":
-            raise credentials_exception
-            
-        # Verify user still exists
-        user = db.query(User).filter(User.id == int(user_id)).first()
-        if not user:
-             raise credentials_exception
+    payload = decode_token(refresh_token, "refresh")
+    if payload is None:
+        raise credentials_exception
 
-        # Issue new tokens
-        tokens = AuthService.create_tokens(user)
-        
-        # Update access token cookie
-        response.set_cookie(
-            key="access_token",
-            value=tokens["access_token"],
-            httponly=True,
-            max_age=settings.ACCESS_TOKEN_EXPIRE_MINUTES * 60,
-            samesite="lax",
-            secure=False
-        )
-        
-        # Optionally rotate refresh token here too
-        
-        return {"message": "Token refreshed"}
-        
-    except JWTError:
+    # Verify user still exists
+    user = AuthService.get_user(db, int(payload["sub"]))
+    if not user:
         raise credentials_exception
 
+    # Issue new tokens
+    tokens = AuthService.create_tokens(user)
+
+    # Update access token cookie
+    response.set_cookie(
+        key="access_token",
+        value=tokens["access_token"],
+        httponly=True,
+        max_age=settings.ACCESS_TOKEN_EXPIRE_MINUTES * 60,
+        samesite="lax",
+        secure=False
+    )
+
+    # Optionally rotate refresh token here too
+
+    return {"message": "Token refreshed"}
+
 @router.post("/logout")
-def logout(response: Response):
+def logout(request: Request, response: Response):
+    invalidate_token(request.cookies.get("access_token"))
     response.delete_cookie("access_token")
     response.delete_cookie("refresh_token")
     return {"message": "Logout successful"}
 
 @router.get("/me", response_model=UserResponse)
-def read_users_me(current_user: User = Depends(get_current_user)):
+def read_users_me(current_user: CurrentUser = Depends(get_current_user_fresh)):
     return current_user
@@ -1,46 +1,31 @@
 from fastapi import APIRouter, Depends
 from sqlalchemy.orm import Session
 from app.database import get_db
-from app.routes.auth import get_current_user
-from app.models.user import User
-from app.models.analysis import Analysis
+from app.core.dependencies import get_current_user_readonly
+from app.schemas.user import CurrentUser
 from app.schemas.dashboard import DashboardStats, RiskDistribution, RecentAnalysis
+from app.services.stats_service import StatsService
+from app.services.analysis_service import AnalysisService
 
 router = APIRouter()
 
 
 @router.get("/stats", response_model=DashboardStats)
 def get_dashboard_stats(
-    current_user: User = Depends(get_current_user),
+    current_user: CurrentUser = Depends(get_current_user_readonly),
     db: Session = Depends(get_db),
 ):
-    """Return aggregated analysis statistics for the authenticated user."""
-    analyses = (
-        db.query(Analysis)
-        .filter(Analysis.user_id == current_user.id)
-        .all()
-    )
-
-    risk_counts = {"Low": 0, "Medium": 0, "High": 0}
-    scores = []
+    """
+    Return aggregated analysis statistics for the authenticated user.
 
-    for analysis in analyses:
-        risk = analysis.result.get("overall_risk_level")
-        if risk in risk_counts:
-            risk_counts[risk] += 1
-        score = analysis.result.get("summary_score")
-        if score is not None:
-            scores.append(score)
+    Totals come from the per-user rollup row, so the cost does not grow with
+    the size of the user's history.
+    """
+    stats = StatsService.get(db, current_user.id)
 
-    average_score = round(sum(scores) / len(scores), 2) if scores else 0.0
+    average_score = round(stats.score_sum / stats.score_count, 2) if stats and stats.score_count else 0.0
 
-    recent = (
-        db.query(Analysis)
-        .filter(Analysis.user_id == current_user.id)
-        .order_by(Analysis.created_at.desc())
-        .limit(5)
-        .all()
-    )
+    recent, _ = AnalysisService.get_user_history_page(db, current_user.id, 5, summary=True)
 
     recent_analyses = [
         RecentAnalysis(
@@ -50,19 +35,19 @@ def get_dashboard_stats(
                 if len(a.original_text) > 100
                 else a.original_text
             ),
-            summary_score=a.result.get("summary_score", 0),
-            overall_risk_level=a.result.get("overall_risk_level", "Unknown"),
+            summary_score=a.summary_score if a.summary_score is not None else 0,
+            overall_risk_level=a.overall_risk_level or "Unknown",
             created_at=a.created_at,
         )
         for a in recent
     ]
 
     return DashboardStats(
-        total_analyses=len(analyses),
+        total_analyses=stats.total_analyses if stats else 0,
         risk_distribution=RiskDistribution(
-            low=risk_counts["Low"],
-            medium=risk_counts["Medium"],
-            high=risk_counts["High"],
+            low=stats.low_count if stats else 0,
+            medium=stats.medium_count if stats else 0,
+            high=stats.high_count if stats else 0,
         ),
         recent_analyses=recent_analyses,
         average_score=average_score,
@@ -1,28 +1,131 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Query, Response
+from fastapi.responses import StreamingResponse
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
-from app.database import get_db
-from app.schemas.analysis import AnalysisResponse
+from app.config import settings
+from app.database import get_async_db, get_db
+from app.schemas.analysis import AnalysisResponse, AnalysisSummary, AnalysisSearchResult
 from app.services.analysis_service import AnalysisService
-from app.routes.auth import get_current_user
-from app.models.user import User
-from typing import List
+from app.services.search_service import SearchService
+from app.services.export_service import ExportService, MEDIA_TYPES
+from app.core.dependencies import get_current_user_readonly
+from app.schemas.user import CurrentUser
+from app.utils.pagination import encode_cursor, decode_time_id_cursor, decode_rank_id_cursor
+from datetime import datetime
+from typing import List, Literal, Optional, Union
 
 router = APIRouter()
 
-@router.get("/", response_model=List[AnalysisResponse])
-def get_history(
-    current_user: User = Depends(get_current_user),
+@router.get("/", response_model=Union[List[AnalysisSummary], List[AnalysisResponse]])
+async def get_history(
+    response: Response,
+    limit: int = Query(settings.HISTORY_PAGE_SIZE, ge=1, le=settings.HISTORY_MAX_PAGE_SIZE),
+    cursor: Optional[str] = None,
+    summary: bool = False,
+    risk_level: Optional[Literal["Low", "Medium", "High"]] = None,
+    since: Optional[datetime] = None,
+    current_user: CurrentUser = Depends(get_current_user_readonly),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """
+    The user's analyses, newest first, one page at a time.
+
+    When more results exist, the ``X-Next-Cursor`` response header holds
+    the ``cursor`` value for the next page. ``summary=true`` returns only
+    id, a 100-character preview, the score/risk/tone columns and
+    created_at. ``risk_level`` and ``since`` filter on indexed columns.
+    """
+    after = decode_time_id_cursor(cursor) if cursor else None
+    rows, next_key = await AnalysisService.get_user_history_page_async(
+        db, current_user.id, limit, after, summary, risk_level, since
+    )
+    if next_key is not None:
+        response.headers["X-Next-Cursor"] = encode_cursor(*next_key)
+
+    if summary:
+        return [
+            AnalysisSummary(
+                id=row.id,
+                original_text=row.original_text[:100] + "..." if len(row.original_text) > 100 else row.original_text,
+                summary_score=row.summary_score,
+                overall_risk_level=row.overall_risk_level,
+                emotional_tone=row.emotional_tone,
+                manipulation_score=row.manipulation_score,
+                claim_count=row.claim_count,
+                created_at=row.created_at,
+            )
+            for row in rows
+        ]
+    # Validated up front so the union can't read the rows as summaries
+    return [AnalysisResponse.model_validate(row) for row in rows]
+
+@router.get("/search", response_model=List[AnalysisSearchResult])
+def search_history(
+    response: Response,
+    q: str = Query(..., min_length=1, max_length=200),
+    limit: int = Query(settings.HISTORY_PAGE_SIZE, ge=1, le=settings.HISTORY_MAX_PAGE_SIZE),
+    cursor: Optional[str] = None,
+    current_user: CurrentUser = Depends(get_current_user_readonly),
     db: Session = Depends(get_db)
 ):
-    return AnalysisService.get_user_history(db, current_user.id)
+    """
+    Full-text search over the user's analyses, best match first.
+
+    ``q`` accepts web-search syntax: ``"exact phrase"``, ``or``, ``-word``.
+    Each hit carries a ``rank`` and a ``highlight`` excerpt with matches
+    wrapped in ``<mark>`` tags. Paginated like ``GET /history/`` through
+    the ``X-Next-Cursor`` header.
+    """
+    after = decode_rank_id_cursor(cursor) if cursor else None
+    rows, next_key = SearchService.search_history(db, current_user.id, q, limit, after)
+    if next_key is not None:
+        response.headers["X-Next-Cursor"] = encode_cursor(*next_key)
+
+    return [
+        AnalysisSearchResult(
+            id=row.id,
+            original_text=row.original_text[:100] + "..." if len(row.original_text) > 100 else row.original_text,
+            summary_score=row.summary_score,
+            overall_risk_level=row.overall_risk_level,
+            emotional_tone=row.emotional_tone,
+            manipulation_score=row.manipulation_score,
+            claim_count=row.claim_count,
+            created_at=row.created_at,
+            rank=row.rank,
+            highlight=row.highlight,
+        )
+        for row in rows
+    ]
+
+@router.get("/export")
+def export_history(
+    format: Literal["ndjson", "csv"] = "ndjson",
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None,
+    gzip: bool = False,
+    current_user: CurrentUser = Depends(get_current_user_readonly),
+):
+    """
+    Download the user's whole history, oldest first, as NDJSON or CSV.
+
+    Streamed from a server-side cursor, so it works for any history size.
+    ``since`` (inclusive) and ``until`` (exclusive) limit the date range;
+    ``gzip=true`` compresses the file on the fly.
+    """
+    filename = ExportService.filename(current_user.id, format, gzip)
+    return StreamingResponse(
+        ExportService.stream(current_user.id, format, since, until, gzip),
+        media_type="application/gzip" if gzip else MEDIA_TYPES[format],
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'},
+    )
 
 @router.get("/{id}", response_model=AnalysisResponse)
-def get_analysis(
+async def get_analysis(
     id: int,
-    current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    current_user: CurrentUser = Depends(get_current_user_readonly),
+    db: AsyncSession = Depends(get_async_db)
 ):
-    analysis = AnalysisService.get_analysis_by_id(db, id, current_user.id)
+    analysis = await AnalysisService.get_analysis_by_id_async(db, id, current_user.id)
     if not analysis:
         raise HTTPException(status_code=404, detail="Analysis not found")
     return analysis
@@ -1,5 +1,5 @@
 from pydantic import BaseModel, Field, conint
-from typing import List, Literal
+from typing import List, Literal, Optional
 
 class ClaimResult(BaseModel):
     claim: str
@@ -15,3 +15,12 @@ class AIAnalysisResponse(BaseModel):
     emotional_tone: Literal["Neutral", "Emotional", "Manipulative", "Fear-Based", "Conspiratorial"]
     manipulation_score: conint(ge=0, le=100)
     confidence_overall: conint(ge=0, le=100)
+    # True when the AI service was unavailable and the local heuristic analyzer answered instead
+    degraded: bool = False
+    # Keyword lexicon used by the local heuristic analyzer, if it produced this result
+    lexicon_version: Optional[str] = None
+
+class IncrementalAnalysisResponse(AIAnalysisResponse):
+    # Sentences in the submitted text, and how many were served from the per-sentence cache
+    sentences_total: int
+    sentences_reused: int
@@ -1,10 +1,20 @@
 from pydantic import BaseModel
-from typing import Dict, Any, Optional
+from typing import Dict, Any, List, Optional
 from datetime import datetime
+from app.schemas.ai_analysis import AIAnalysisResponse
 
 class AnalysisRequest(BaseModel):
     text: str
 
+class BatchAnalysisRequest(BaseModel):
+    texts: List[str]
+    save: bool = False    # authenticated users only
+    stream: bool = False  # NDJSON, one line per result as chunks finish
+
+class BatchAnalysisResponse(BaseModel):
+    results: List[AIAnalysisResponse]
+    saved: int = 0
+
 class AnalysisCreate(BaseModel):
     original_text: str
     result: Dict[str, Any]
@@ -18,3 +28,24 @@ class AnalysisResponse(BaseModel):
 
     class Config:
         from_attributes = True
+
+class AnalysisSummary(BaseModel):
+    """History list entry without the full text and result (``GET /history/?summary=true``)."""
+    id: int
+    original_text: str  # first 100 characters
+    summary_score: Optional[int] = None
+    overall_risk_level: Optional[str] = None
+    emotional_tone: Optional[str] = None
+    manipulation_score: Optional[int] = None
+    claim_count: Optional[int] = None
+    created_at: datetime
+
+    class Config:
+        from_attributes = True
+
+class AnalysisSearchResult(AnalysisSummary):
+    """``GET /history/search`` hit: the summary plus relevance and a highlighted excerpt."""
+    rank: float
+    # Excerpts of the raw text with matches wrapped in <mark>...</mark>;
+    # everything else is unescaped user input
+    highlight: str
@@ -0,0 +1,20 @@
+from pydantic import BaseModel
+from typing import Optional
+from datetime import datetime
+from app.schemas.ai_analysis import AIAnalysisResponse
+
+
+class JobCreateResponse(BaseModel):
+    job_id: str
+    status: str
+
+
+class JobStatusResponse(BaseModel):
+    job_id: str
+    status: str
+    attempts: int
+    result: Optional[AIAnalysisResponse] = None
+    error: Optional[str] = None
+    analysis_id: Optional[int] = None
+    created_at: datetime
+    updated_at: Optional[datetime] = None
@@ -20,3 +20,13 @@ class UserResponse(BaseModel):
     class Config:
         from_attributes = True
 
+
+class CurrentUser(BaseModel):
+    """The authenticated user as seen by routes; cached per worker by access token."""
+    id: int
+    name: str
+    email: str
+
+    class Config:
+        from_attributes = True
+        frozen = True
@@ -1,11 +1,91 @@
-from sqlalchemy.orm import Session
+from collections import defaultdict
+from datetime import datetime
+from sqlalchemy import insert, func, select, tuple_
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session, joinedload
 from app.models.analysis import Analysis
+from app.models.analysis_payload import AnalysisPayload
 from app.schemas.analysis import AnalysisCreate
 from app.schemas.ai_analysis import AIAnalysisResponse
-from app.services.gemini_client import GeminiClient
-from typing import List
+from app.services.gemini_batcher import analyze_text_batched
+from app.services.local_analyzer import analyze_text_local
+from app.services.long_document import analyze_long_document
+from app.utils.circuit_breaker import CircuitOpenError
+from app.services.result_cache import ResultCache, cache_key
+from app.services.payload_service import PayloadService
+from app.services.stats_service import StatsService
+from app.utils.single_flight import SingleFlight
+from app.config import settings
+from typing import List, Optional, Tuple
 from fastapi import HTTPException
 
+# Concurrent requests for the same normalized text share one Gemini call
+_gemini_flight = SingleFlight()
+
+
+async def _analyze_and_cache(text: str) -> AIAnalysisResponse:
+    result = await analyze_text_batched(text)
+    await ResultCache.set(text, result)
+    return result
+
+
+def _row(analysis: AnalysisCreate, user_id: int, payload_hash: str) -> dict:
+    return {
+        "user_id": user_id,
+        "payload_hash": payload_hash,
+        **Analysis.summary_columns(analysis.result),
+    }
+
+
+def _history_page_statement(
+    user_id: int,
+    limit: int,
+    after: Optional[Tuple[datetime, int]],
+    summary: bool,
+    risk_level: Optional[str],
+    since: Optional[datetime],
+):
+    if summary:
+        stmt = select(
+            Analysis.id,
+            Analysis.created_at,
+            func.substr(AnalysisPayload.original_text, 1, 101).label("original_text"),
+            Analysis.summary_score,
+            Analysis.overall_risk_level,
+            Analysis.emotional_tone,
+            Analysis.manipulation_score,
+            Analysis.claim_count,
+        ).join(AnalysisPayload, AnalysisPayload.hash == Analysis.payload_hash)
+    else:
+        stmt = select(Analysis).options(joinedload(Analysis.payload, innerjoin=True))
+
+    stmt = stmt.where(Analysis.user_id == user_id)
+    if risk_level is not None:
+        stmt = stmt.where(Analysis.overall_risk_level == risk_level)
+    if since is not None:
+        stmt = stmt.where(Analysis.created_at >= since)
+    if after is not None:
+        stmt = stmt.where(tuple_(Analysis.created_at, Analysis.id) < tuple_(*after))
+    # One extra row tells whether there is a next page
+    return stmt.order_by(Analysis.created_at.desc(), Analysis.id.desc()).limit(limit + 1)
+
+
+def _split_page(rows: list, limit: int) -> Tuple[list, Optional[Tuple[datetime, int]]]:
+    next_key = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_key = (rows[-1].created_at, rows[-1].id)
+    return rows, next_key
+
+
+def _analysis_by_id_statement(analysis_id: int, user_id: int):
+    return (
+        select(Analysis)
+        .options(joinedload(Analysis.payload, innerjoin=True))
+        .where(Analysis.id == analysis_id, Analysis.user_id == user_id)
+    )
+
+
 class AnalysisService:
 
     @staticmethod
@@ -20,25 +100,147 @@ class AnalysisService:
         if len(text) > 5000:
              raise HTTPException(status_code=400, detail="Text inputs must be under 5000 characters")
 
+        cached = await ResultCache.get(text)
+        if cached is not None:
+            return cached
+
         # Delegate purely to Gemini
-        return await GeminiClient.analyze_text(text)
+        try:
+            if not settings.ENABLE_REQUEST_COALESCING:
+                return await _analyze_and_cache(text)
+
+            result = await _gemini_flight.do(cache_key(text), lambda: _analyze_and_cache(text))
+        except CircuitOpenError:
+            if not settings.CIRCUIT_BREAKER_FALLBACK_LOCAL:
+                raise
+            return AnalysisService.perform_degraded_analysis(text)
+
+        # Every coalesced caller gets its own copy of the shared result
+        return result.model_copy(deep=True)
 
     @staticmethod
-    def create_analysis(db: Session, analysis: AnalysisCreate, user_id: int) -> Analysis:
-        new_analysis = Analysis(
-            user_id=user_id,
-            original_text=analysis.original_text,
-            result=analysis.result
-        )
+    async def perform_long_ai_analysis(text: str) -> AIAnalysisResponse:
+        """
+        AI analysis for documents beyond the single-request limit.
+
+        Chunks go through perform_ai_analysis, so they share the result cache,
+        request coalescing and upstream protections.
+        """
+        if not text or not text.strip():
+            raise HTTPException(status_code=400, detail="Input text cannot be empty")
+
+        if len(text) > settings.LONG_DOCUMENT_MAX_CHARS:
+            raise HTTPException(status_code=400, detail=f"Text inputs must be under {settings.LONG_DOCUMENT_MAX_CHARS} characters")
+
+        return await analyze_long_document(text, AnalysisService.perform_ai_analysis)
+
+    @staticmethod
+    def perform_degraded_analysis(text: str) -> AIAnalysisResponse:
+        """Local heuristic answer used while the Gemini circuit is open."""
+        result = analyze_text_local(text)
+        result.degraded = True
+        return result
+
+    @staticmethod
+    def create_analysis(db: Session, analysis: AnalysisCreate, user_id: int, commit: bool = True) -> Analysis:
+        payload_hash, = PayloadService.acquire(db, [analysis])
+        new_analysis = Analysis(user_id=user_id, payload_hash=payload_hash, **Analysis.summary_columns(analysis.result))
         db.add(new_analysis)
+        # Payload refcount and dashboard rollup land in the same transaction as the row
+        StatsService.record(db, user_id, [analysis.result])
+        if not commit:
+            # Caller owns the transaction; flush so the id is available
+            db.flush()
+            return new_analysis
         db.commit()
-        db.refresh(new_analysis)
         return new_analysis
 
+    @staticmethod
+    async def create_analysis_async(db: AsyncSession, analysis: AnalysisCreate, user_id: int, commit: bool = True) -> Analysis:
+        payload_hash, = await PayloadService.acquire_async(db, [analysis])
+        new_analysis = Analysis(user_id=user_id, payload_hash=payload_hash, **Analysis.summary_columns(analysis.result))
+        db.add(new_analysis)
+        await StatsService.record_async(db, user_id, [analysis.result])
+        if not commit:
+            await db.flush()
+            return new_analysis
+        await db.commit()
+        return new_analysis
+
+    @staticmethod
+    async def create_analyses_bulk_async(db: AsyncSession, analyses: List[AnalysisCreate], user_id: int) -> int:
+        """Insert many history rows in one multi-row INSERT; returns the row count."""
+        if not analyses:
+            return 0
+        hashes = await PayloadService.acquire_async(db, analyses)
+        await db.execute(insert(Analysis), [_row(a, user_id, h) for a, h in zip(analyses, hashes)])
+        await StatsService.record_async(db, user_id, [a.result for a in analyses])
+        await db.commit()
+        return len(analyses)
+
+    @staticmethod
+    async def create_analyses_multi_user_async(db: AsyncSession, entries: List[Tuple[int, AnalysisCreate]]) -> int:
+        """Bulk insert of ``(user_id, analysis)`` pairs for several users (write-behind flushes)."""
+        if not entries:
+            return 0
+        hashes = await PayloadService.acquire_async(db, [a for _, a in entries])
+        await db.execute(insert(Analysis), [_row(a, user_id, h) for (user_id, a), h in zip(entries, hashes)])
+        results_by_user = defaultdict(list)
+        for user_id, a in entries:
+            results_by_user[user_id].append(a.result)
+        # Fixed order, so concurrent flushes from several workers can't deadlock on rollup rows
+        for user_id in sorted(results_by_user):
+            await StatsService.record_async(db, user_id, results_by_user[user_id])
+        await db.commit()
+        return len(entries)
+
+    @staticmethod
+    def get_user_history_page(
+        db: Session,
+        user_id: int,
+        limit: int,
+        after: Optional[Tuple[datetime, int]] = None,
+        summary: bool = False,
+        risk_level: Optional[str] = None,
+        since: Optional[datetime] = None,
+    ) -> Tuple[list, Optional[Tuple[datetime, int]]]:
+        """
+        One page of history, newest first, starting after the ``(created_at, id)`` key.
+
+        Served by the (user_id[, overall_risk_level], created_at DESC, id DESC)
+        indexes, so every page is a range scan of ``limit`` rows. With
+        ``summary`` only the denormalized columns and a text preview are
+        selected. Returns the rows and the key to pass for the next page
+        (None on the last page).
+        """
+        stmt = _history_page_statement(user_id, limit, after, summary, risk_level, since)
+        result = db.execute(stmt)
+        return _split_page(result.all() if summary else result.scalars().all(), limit)
+
+    @staticmethod
+    async def get_user_history_page_async(
+        db: AsyncSession,
+        user_id: int,
+        limit: int,
+        after: Optional[Tuple[datetime, int]] = None,
+        summary: bool = False,
+        risk_level: Optional[str] = None,
+        since: Optional[datetime] = None,
+    ) -> Tuple[list, Optional[Tuple[datetime, int]]]:
+        stmt = _history_page_statement(user_id, limit, after, summary, risk_level, since)
+        result = await db.execute(stmt)
+        return _split_page(result.all() if summary else result.scalars().all(), limit)
+
     @staticmethod
     def get_user_history(db: Session, user_id: int) -> List[Analysis]:
-        return db.query(Analysis).filter(Analysis.user_id == user_id).order_by(Analysis.created_at.desc()).all()
+        return (
+            db.query(Analysis)
+            .options(joinedload(Analysis.payload, innerjoin=True))
+            .filter(Analysis.user_id == user_id)
+            .order_by(Analysis.created_at.desc())
+            .all()
+        )
 
     @staticmethod
-    def get_analysis_by_id(db: Session, analysis_id: int, user_id: int) -> Analysis:
-        return db.query(Analysis).filter(Analysis.id == analysis_id, Analysis.user_id == user_id).first()
+    async def get_analysis_by_id_async(db: AsyncSession, analysis_id: int, user_id: int) -> Optional[Analysis]:
+        return (await db.execute(_analysis_by_id_statement(analysis_id, user_id))).scalar_one_or_none()
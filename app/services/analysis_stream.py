@@ -0,0 +1,144 @@
+"""
+Incremental AI analysis over Server-Sent Events.
+
+Gemini streams the analysis JSON in arbitrary text fragments. ``ClaimExtractor``
+watches the ``claims`` array as it grows and hands back each claim object as
+soon as its closing brace arrives, so the client can render claims long
+before the summary fields are generated.
+"""
+
+import json
+import logging
+import re
+from typing import AsyncIterator, List, Optional
+
+from pydantic import ValidationError
+
+from app.schemas.ai_analysis import AIAnalysisResponse, ClaimResult
+from app.config import settings
+from app.services.analysis_service import AnalysisService
+from app.services.gemini_client import GeminiClient, strip_code_fences
+from app.services.result_cache import ResultCache
+from app.utils.circuit_breaker import CircuitOpenError
+
+logger = logging.getLogger(__name__)
+
+_CLAIMS_ARRAY = re.compile(r'"claims"\s*:\s*\[')
+
+
+class ClaimExtractor:
+    """Pulls complete objects out of the top-level ``claims`` array of a partial JSON document."""
+
+    def __init__(self):
+        self.buffer = ""
+        self._pos: Optional[int] = None  # next unscanned index inside the claims array
+        self._depth = 0
+        self._in_string = False
+        self._escape = False
+        self._object_start = 0
+        self._done = False
+
+    def feed(self, fragment: str) -> List[ClaimResult]:
+        self.buffer += fragment
+        if self._done:
+            return []
+
+        if self._pos is None:
+            match = _CLAIMS_ARRAY.search(self.buffer)
+            if not match:
+                return []
+            self._pos = match.end()
+
+        claims = []
+        buffer = self.buffer
+        i = self._pos
+        while i < len(buffer):
+            ch = buffer[i]
+            if self._in_string:
+                if self._escape:
+                    self._escape = False
+                elif ch == "\\":
+                    self._escape = True
+                elif ch == '"':
+                    self._in_string = False
+            elif ch == '"':
+                self._in_string = True
+            elif ch in "{[":
+                if self._depth == 0:
+                    self._object_start = i
+                self._depth += 1
+            elif ch in "}]":
+                if self._depth == 0:
+                    # End of the claims array itself
+                    self._done = True
+                    break
+                self._depth -= 1
+                if self._depth == 0:
+                    claim = self._parse(buffer[self._object_start:i + 1])
+                    if claim is not None:
+                        claims.append(claim)
+            i += 1
+        self._pos = i
+        return claims
+
+    @staticmethod
+    def _parse(raw: str) -> Optional[ClaimResult]:
+        try:
+            return ClaimResult.model_validate_json(raw)
+        except ValidationError as e:
+            # Still reported in the final result if the full response validates
+            logger.warning(f"Skipping unparseable streamed claim: {e}")
+            return None
+
+
+def sse_event(event: str, data) -> str:
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+
+async def stream_ai_analysis(text: str) -> AsyncIterator[tuple]:
+    """
+    Yield ``(event, payload)`` pairs: one ``claim`` per completed ClaimResult,
+    then a ``summary`` and the full validated ``result``.
+
+    Raises HTTPException for upstream or validation failures; the caller
+    decides how to surface it on an already-open stream.
+    """
+    cached = await ResultCache.get(text)
+    if cached is not None:
+        for event in _replay(cached):
+            yield event
+        return
+
+    extractor = ClaimExtractor()
+    try:
+        async for fragment in GeminiClient.stream_text(text):
+            for claim in extractor.feed(fragment):
+                yield "claim", claim.model_dump()
+    except CircuitOpenError:
+        # Raised before any fragment is produced, so nothing has been sent yet
+        if not settings.CIRCUIT_BREAKER_FALLBACK_LOCAL:
+            raise
+        for event in _replay(AnalysisService.perform_degraded_analysis(text)):
+            yield event
+        return
+
+    result = GeminiClient.parse_analysis(strip_code_fences(extractor.buffer))
+    await ResultCache.set(text, result)
+
+    yield "summary", _summary(result)
+    yield "result", result.model_dump()
+
+
+def _replay(result: AIAnalysisResponse):
+    for claim in result.claims:
+        yield "claim", claim.model_dump()
+    yield "summary", _summary(result)
+    yield "result", result.model_dump()
+
+
+def _summary(result: AIAnalysisResponse) -> dict:
+    return {
+        "summary_score": result.summary_score,
+        "overall_risk_level": result.overall_risk_level,
+        "degraded": result.degraded,
+    }
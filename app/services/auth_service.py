@@ -1,38 +1,56 @@
+from typing import Optional
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 from app.models.user import User
 from app.schemas.user import UserCreate, UserLogin
 from app.core.security import hash_password, verify_password, create_access_token, create_refresh_token
 from fastapi import HTTPException, status
+from starlette.concurrency import run_in_threadpool
 
 class AuthService:
     @staticmethod
-    def register_user(db: Session, user: UserCreate):
-        existing_user = db.query(User).filter(User.email == user.email).first()
+    async def register_user_async(db: AsyncSession, user: UserCreate):
+        existing_user = await AuthService.get_user_by_email_async(db, user.email)
         if existing_user:
             raise HTTPException(status_code=400, detail="Email already registered")
 
         new_user = User(
             name=user.name,
             email=user.email,
-            password_hash=hash_password(user.password)
+            # bcrypt is deliberately slow; keep it off the event loop
+            password_hash=await run_in_threadpool(hash_password, user.password)
         )
         db.add(new_user)
-        db.commit()
-        db.refresh(new_user)
+        await db.commit()
+        await db.refresh(new_user)
         return new_user
 
     @staticmethod
-    def authenticate_user(db: Session, user: UserLogin):
-        db_user = db.query(User).filter(User.email == user.email).first()
+    async def authenticate_user_async(db: AsyncSession, user: UserLogin):
+        db_user = await AuthService.get_user_by_email_async(db, user.email)
         if not db_user:
             return None
-        if not verify_password(user.password, db_user.password_hash):
+        if not await run_in_threadpool(verify_password, user.password, db_user.password_hash):
             return None
         return db_user
 
+    @staticmethod
+    def get_user(db: Session, user_id: int) -> Optional[User]:
+        return db.get(User, user_id)
+
+    @staticmethod
+    async def get_user_async(db: AsyncSession, user_id: int) -> Optional[User]:
+        return await db.get(User, user_id)
+
+    @staticmethod
+    async def get_user_by_email_async(db: AsyncSession, email: str) -> Optional[User]:
+        return (await db.execute(select(User).where(User.email == email))).scalars().first()
+
     @staticmethod
     def create_tokens(user: User):
-        access_token = create_access_token({"sub": str(user.id)})
+        # name/email let read-only routes skip the users lookup (AUTH_TRUST_TOKEN_CLAIMS)
+        access_token = create_access_token({"sub": str(user.id), "name": user.name, "email": user.email})
         refresh_token = create_refresh_token({"sub": str(user.id)})
         return {
             "access_token": access_token,
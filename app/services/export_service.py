@@ -0,0 +1,146 @@
+"""
+Streaming export of history (``GET /history/export``, ``python -m app.export``).
+
+Rows are read through a server-side cursor in batches of
+``HISTORY_EXPORT_BATCH_ROWS`` (``yield_per``) and encoded one batch at a
+time, optionally gzipped on the fly, so memory stays flat however many
+rows a user has.
+"""
+
+import csv
+import io
+import json
+import zlib
+from datetime import datetime
+from typing import Iterable, Iterator, List, Optional
+
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from app.config import settings
+from app.database import SessionLocal
+from app.models.analysis import Analysis
+from app.models.analysis_payload import AnalysisPayload
+
+MEDIA_TYPES = {"ndjson": "application/x-ndjson", "csv": "text/csv"}
+
+# CSV flattens the summary columns next to the text; the full result is a JSON cell
+CSV_COLUMNS = [
+    "id", "user_id", "created_at", "original_text",
+    "summary_score", "overall_risk_level", "emotional_tone", "manipulation_score", "claim_count",
+    "result",
+]
+
+
+def _export_statement(user_id: int, since: Optional[datetime], until: Optional[datetime]):
+    stmt = (
+        select(
+            Analysis.id,
+            Analysis.user_id,
+            Analysis.created_at,
+            AnalysisPayload.original_text,
+            AnalysisPayload.result,
+            Analysis.summary_score,
+            Analysis.overall_risk_level,
+            Analysis.emotional_tone,
+            Analysis.manipulation_score,
+            Analysis.claim_count,
+        )
+        .join(AnalysisPayload, AnalysisPayload.hash == Analysis.payload_hash)
+        .where(Analysis.user_id == user_id)
+    )
+    if since is not None:
+        stmt = stmt.where(Analysis.created_at >= since)
+    if until is not None:
+        stmt = stmt.where(Analysis.created_at < until)
+    # Oldest first; ix_analyses_user_created_id read backwards
+    return stmt.order_by(Analysis.created_at, Analysis.id)
+
+
+def _ndjson(batch) -> str:
+    return "".join(
+        json.dumps({
+            "id": row.id,
+            "user_id": row.user_id,
+            "original_text": row.original_text,
+            "result": row.result,
+            "created_at": row.created_at.isoformat() if row.created_at else None,
+        }, ensure_ascii=False) + "\n"
+        for row in batch
+    )
+
+
+def _csv(batch) -> str:
+    out = io.StringIO()
+    writer = csv.writer(out)
+    for row in batch:
+        writer.writerow([
+            row.id, row.user_id, row.created_at.isoformat() if row.created_at else "", row.original_text,
+            row.summary_score, row.overall_risk_level, row.emotional_tone, row.manipulation_score, row.claim_count,
+            json.dumps(row.result, ensure_ascii=False),
+        ])
+    return out.getvalue()
+
+
+def _gzipped(chunks: Iterable[bytes]) -> Iterator[bytes]:
+    compressor = zlib.compressobj(6, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+    for chunk in chunks:
+        data = compressor.compress(chunk)
+        if data:
+            yield data
+    yield compressor.flush()
+
+
+class ExportService:
+
+    @staticmethod
+    def filename(user_id: int, fmt: str, gzip: bool) -> str:
+        return f"history-{user_id}.{fmt}" + (".gz" if gzip else "")
+
+    @staticmethod
+    def iter_export(
+        db: Session,
+        user_id: int,
+        fmt: str,
+        since: Optional[datetime] = None,
+        until: Optional[datetime] = None,
+        gzip: bool = False,
+    ) -> Iterator[bytes]:
+        """Encoded export of one user's history, one chunk per fetched batch."""
+        def chunks() -> Iterator[bytes]:
+            result = db.execute(
+                _export_statement(user_id, since, until).execution_options(yield_per=settings.HISTORY_EXPORT_BATCH_ROWS)
+            )
+            if fmt == "csv":
+                yield (",".join(CSV_COLUMNS) + "\r\n").encode("utf-8")
+            for batch in result.partitions():
+                text = _ndjson(batch) if fmt == "ndjson" else _csv(batch)
+                yield text.encode("utf-8")
+
+        return _gzipped(chunks()) if gzip else chunks()
+
+    @staticmethod
+    def stream(
+        user_id: int,
+        fmt: str,
+        since: Optional[datetime] = None,
+        until: Optional[datetime] = None,
+        gzip: bool = False,
+    ) -> Iterator[bytes]:
+        """
+        ``iter_export`` on a session of its own, for ``StreamingResponse``.
+
+        The stream outlives the route function, so it doesn't borrow the
+        request's session; this one is closed when the stream ends or the
+        client disconnects.
+        """
+        db = SessionLocal()
+        try:
+            yield from ExportService.iter_export(db, user_id, fmt, since, until, gzip)
+        finally:
+            db.close()
+
+    @staticmethod
+    def user_ids(db: Session) -> List[int]:
+        """Users with at least one analysis, for the all-users archive."""
+        return list(db.scalars(select(Analysis.user_id).distinct().order_by(Analysis.user_id)))
@@ -0,0 +1,114 @@
+"""
+Micro-batching scheduler for short Gemini analyses.
+
+Requests are collected for ``AI_BATCH_WINDOW_MS`` (or until
+``AI_BATCH_MAX_SIZE`` is reached) and sent as one multi-document prompt, so
+the instruction block is paid for once per batch instead of once per text.
+Any document the batch response could not cover is re-analyzed on its own.
+"""
+
+import asyncio
+import logging
+from typing import List, Optional, Set, Tuple
+
+from app.config import settings
+from app.schemas.ai_analysis import AIAnalysisResponse
+from app.services.gemini_client import GeminiClient, BatchResponseError
+
+logger = logging.getLogger(__name__)
+
+
+class GeminiBatcher:
+
+    def __init__(self, window_ms: int, max_size: int):
+        self.window = window_ms / 1000
+        self.max_size = max_size
+        self._pending: List[Tuple[str, asyncio.Future]] = []
+        self._timer: Optional[asyncio.TimerHandle] = None
+        self._tasks: Set[asyncio.Task] = set()
+        self.batches_sent = 0
+        self.items_batched = 0
+        self.fallbacks = 0
+
+    async def submit(self, text: str) -> AIAnalysisResponse:
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._pending.append((text, future))
+
+        if len(self._pending) >= self.max_size:
+            self._flush()
+        elif self._timer is None:
+            self._timer = loop.call_later(self.window, self._flush)
+
+        return await future
+
+    def _flush(self) -> None:
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        items, self._pending = self._pending, []
+        if not items:
+            return
+        task = asyncio.ensure_future(self._run(items))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _run(self, items: List[Tuple[str, asyncio.Future]]) -> None:
+        # Callers that gave up while waiting for the window don't need a slot
+        items = [(text, future) for text, future in items if not future.done()]
+        if not items:
+            return
+
+        if len(items) == 1:
+            await self._run_single(*items[0])
+            return
+
+        texts = [text for text, _ in items]
+        try:
+            results = await GeminiClient.analyze_batch(texts)
+            self.batches_sent += 1
+            self.items_batched += len(items)
+        except BatchResponseError as e:
+            logger.warning(f"Malformed batch response, falling back to per-item calls: {e}")
+            results = [None] * len(items)
+        except Exception as e:
+            # Upstream failures (quota, timeouts) apply to every caller alike
+            for _, future in items:
+                if not future.done():
+                    future.set_exception(e)
+            return
+
+        retries = []
+        for (text, future), result in zip(items, results):
+            if result is None:
+                retries.append(self._run_single(text, future))
+            elif not future.done():
+                future.set_result(result)
+
+        if retries:
+            self.fallbacks += len(retries)
+            await asyncio.gather(*retries)
+
+    @staticmethod
+    async def _run_single(text: str, future: asyncio.Future) -> None:
+        try:
+            result = await GeminiClient.analyze_text(text)
+        except Exception as e:
+            if not future.done():
+                future.set_exception(e)
+        else:
+            if not future.done():
+                future.set_result(result)
+
+
+gemini_batcher = GeminiBatcher(
+    window_ms=settings.AI_BATCH_WINDOW_MS,
+    max_size=settings.AI_BATCH_MAX_SIZE,
+)
+
+
+async def analyze_text_batched(text: str) -> AIAnalysisResponse:
+    """Route short texts through the batcher when batching is enabled."""
+    if settings.ENABLE_AI_BATCHING and len(text) <= settings.AI_BATCH_MAX_TEXT_LENGTH:
+        return await gemini_batcher.submit(text)
+    return await GeminiClient.analyze_text(text)
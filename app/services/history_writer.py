@@ -0,0 +1,294 @@
+"""
+Write-behind persistence of history rows.
+
+With ``HISTORY_WRITE_BEHIND`` enabled, handlers hand new analyses to
+``history_writer`` instead of committing them before the response goes
+out. Buffered rows are written with one multi-row INSERT once
+``HISTORY_FLUSH_MAX_ROWS`` are waiting or ``HISTORY_FLUSH_INTERVAL_MS``
+after the first one arrived, and the buffer is drained on shutdown.
+
+If a flush fails (database down), its rows are appended to an NDJSON spill
+file in ``HISTORY_SPILL_DIR`` and replayed once writes succeed again. Rows
+still in memory when the process is killed are lost; everything that
+reached a spill file is not. Rows the database rejects outright (integrity
+or data errors, e.g. a deleted user) are isolated row by row and moved to
+``HISTORY_SPILL_DIR/dead_letter/`` with the error, never retried.
+"""
+
+import asyncio
+import json
+import logging
+import os
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+from sqlalchemy.exc import DataError, IntegrityError
+from starlette.concurrency import run_in_threadpool
+
+from app.config import settings
+from app.database import new_async_session
+from app.schemas.analysis import AnalysisCreate
+from app.services.analysis_service import AnalysisService
+
+logger = logging.getLogger(__name__)
+
+_Entry = Tuple[int, AnalysisCreate]
+
+# Errors caused by the rows themselves; retrying them can never succeed
+_REJECTED = (IntegrityError, DataError)
+
+
+def _pid_alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+class HistoryWriter:
+
+    def __init__(self, max_rows: int, interval_ms: int, max_buffered: int, spill_dir: str, retry_seconds: float):
+        self.max_rows = max_rows
+        self.interval = interval_ms / 1000
+        self.max_buffered = max_buffered
+        self.spill_dir = Path(spill_dir)
+        self.retry_seconds = retry_seconds
+        # submit() is also called from sync routes running in the threadpool
+        self._lock = threading.Lock()
+        self._spill_lock = threading.Lock()
+        self._buffer: List[_Entry] = []
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._wake: Optional[asyncio.Event] = None
+        self._task: Optional[asyncio.Task] = None
+        self._stopping = False
+        self._spill_pending = False
+        self.flushes = 0
+        self.flush_failures = 0
+        self.rows_written = 0
+        self.rows_spilled = 0
+        self.rows_replayed = 0
+        self.rows_dead_lettered = 0
+        self.last_flush_ms = 0.0
+        self.max_flush_ms = 0.0
+        self._flush_ms_total = 0.0
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None
+
+    def start(self) -> None:
+        self._loop = asyncio.get_running_loop()
+        self._wake = asyncio.Event()
+        self._stopping = False
+        self.spill_dir.mkdir(parents=True, exist_ok=True)
+        self._rescue_orphaned_replays()
+        self._spill_pending = any(self.spill_dir.glob("*.ndjson"))
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        """Flush everything buffered (or spill it) and stop the flush loop."""
+        if self._task is None:
+            return
+        self._stopping = True
+        self._wake.set()
+        await self._task
+        self._task = None
+
+    def submit(self, user_id: int, analysis: AnalysisCreate) -> bool:
+        """
+        Queue a history row; returns False when write-behind is not running
+        and the caller should insert the row itself.
+        """
+        if self._task is None or self._stopping:
+            return False
+        with self._lock:
+            overflow = len(self._buffer) >= self.max_buffered
+            if not overflow:
+                self._buffer.append((user_id, analysis))
+                size = len(self._buffer)
+        if overflow:
+            # Flushes can't keep up; keep the row durable instead of growing the buffer
+            self._spill([(user_id, analysis)])
+            return True
+        if size == 1 or size >= self.max_rows:
+            self._loop.call_soon_threadsafe(self._wake.set)
+        return True
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            buffered = len(self._buffer)
+        return {
+            "running": self.running,
+            "buffered": buffered,
+            "spill_files": len(list(self.spill_dir.glob("*.ndjson"))) if self.spill_dir.exists() else 0,
+            "flushes": self.flushes,
+            "flush_failures": self.flush_failures,
+            "rows_written": self.rows_written,
+            "rows_spilled": self.rows_spilled,
+            "rows_replayed": self.rows_replayed,
+            "rows_dead_lettered": self.rows_dead_lettered,
+            "last_flush_ms": round(self.last_flush_ms, 2),
+            "max_flush_ms": round(self.max_flush_ms, 2),
+            "avg_flush_ms": round(self._flush_ms_total / self.flushes, 2) if self.flushes else 0.0,
+        }
+
+    async def _run(self) -> None:
+        while not self._stopping:
+            await self._wait(self.retry_seconds if self._spill_pending else None)
+            if not self._stopping and self._buffered() < self.max_rows:
+                # Give the batch until the interval elapses or it fills up
+                await self._wait(self.interval)
+            await self._flush()
+        # Handlers may have queued rows while the last flush ran
+        await self._flush()
+
+    async def _wait(self, timeout: Optional[float]) -> None:
+        try:
+            await asyncio.wait_for(self._wake.wait(), timeout)
+        except asyncio.TimeoutError:
+            pass
+        self._wake.clear()
+
+    def _buffered(self) -> int:
+        with self._lock:
+            return len(self._buffer)
+
+    async def _flush(self) -> None:
+        with self._lock:
+            batch, self._buffer = self._buffer, []
+        handled, _ = await self._write(batch)
+        if handled < len(batch):
+            await run_in_threadpool(self._spill, batch[handled:])
+            return
+        if self._spill_pending:
+            await self._replay()
+
+    async def _write(self, batch: List[_Entry]) -> Tuple[int, int]:
+        """
+        Insert ``batch`` in chunks. Returns ``(handled, written)``: rows
+        committed or dead-lettered, and rows committed. Rows after the first
+        ``handled`` could not be written (database unavailable).
+        """
+        handled = written = 0
+        started = time.perf_counter()
+        try:
+            while handled < len(batch):
+                chunk = batch[handled:handled + self.max_rows]
+                try:
+                    await self._insert(chunk)
+                    written += len(chunk)
+                    handled += len(chunk)
+                except _REJECTED:
+                    # One bad row fails its whole chunk; find it so the rest get in
+                    for entry in chunk:
+                        try:
+                            await self._insert([entry])
+                            written += 1
+                        except _REJECTED as e:
+                            await run_in_threadpool(self._dead_letter, entry, e)
+                        handled += 1
+        except Exception as e:
+            # Connection refused, timeout, ...: keep the rest for a retry, don't kill the writer
+            self.flush_failures += 1
+            logger.warning(f"History flush of {len(batch) - handled} rows failed: {e!r}")
+        self.rows_written += written
+        if written:
+            elapsed_ms = (time.perf_counter() - started) * 1000
+            self.flushes += 1
+            self.last_flush_ms = elapsed_ms
+            self.max_flush_ms = max(self.max_flush_ms, elapsed_ms)
+            self._flush_ms_total += elapsed_ms
+        return handled, written
+
+    @staticmethod
+    async def _insert(chunk: List[_Entry]) -> None:
+        async with new_async_session() as db:
+            await AnalysisService.create_analyses_multi_user_async(db, chunk)
+
+    def _dead_letter(self, entry: _Entry, error: Exception) -> None:
+        user_id, a = entry
+        line = json.dumps({
+            "user_id": user_id, "original_text": a.original_text, "result": a.result, "error": repr(error),
+        }) + "\n"
+        dead_letter_dir = self.spill_dir / "dead_letter"
+        with self._spill_lock:
+            dead_letter_dir.mkdir(parents=True, exist_ok=True)
+            with open(dead_letter_dir / f"dead-{os.getpid()}.ndjson", "a", encoding="utf-8") as f:
+                f.write(line)
+                f.flush()
+                os.fsync(f.fileno())
+            self.rows_dead_lettered += 1
+        logger.error(f"History row for user {user_id} rejected by the database, moved to {dead_letter_dir}: {error!r}")
+
+    def _spill(self, batch: List[_Entry]) -> None:
+        lines = "".join(
+            json.dumps({"user_id": user_id, "original_text": a.original_text, "result": a.result}) + "\n"
+            for user_id, a in batch
+        )
+        with self._spill_lock:
+            self.spill_dir.mkdir(parents=True, exist_ok=True)
+            # One file per process, so workers never interleave partial lines
+            with open(self.spill_dir / f"spill-{os.getpid()}.ndjson", "a", encoding="utf-8") as f:
+                f.write(lines)
+                f.flush()
+                os.fsync(f.fileno())
+            self.rows_spilled += len(batch)
+            self._spill_pending = True
+        logger.warning(f"Spilled {len(batch)} history rows to {self.spill_dir}")
+
+    async def _replay(self) -> None:
+        for path in sorted(self.spill_dir.glob("*.ndjson")):
+            claimed = path.with_name(f"{path.name}.replay-{os.getpid()}")
+            try:
+                # Atomic claim; another worker may have taken the file first
+                with self._spill_lock:
+                    os.replace(path, claimed)
+            except FileNotFoundError:
+                continue
+
+            entries = await run_in_threadpool(self._read_spill, claimed)
+            handled, written = await self._write(entries)
+            self.rows_replayed += written
+            if handled < len(entries):
+                await run_in_threadpool(self._spill, entries[handled:])
+                claimed.unlink()
+                return
+            claimed.unlink()
+            logger.info(f"Replayed {written} spilled history rows from {path.name}")
+
+        with self._spill_lock:
+            self._spill_pending = any(self.spill_dir.glob("*.ndjson"))
+
+    @staticmethod
+    def _read_spill(path: Path) -> List[_Entry]:
+        entries = []
+        with open(path, encoding="utf-8") as f:
+            for line in f:
+                try:
+                    row = json.loads(line)
+                    entries.append((row["user_id"], AnalysisCreate(original_text=row["original_text"], result=row["result"])))
+                except (ValueError, KeyError):
+                    # A torn last line from a crash mid-write
+                    logger.warning(f"Skipping malformed spill line in {path.name}")
+        return entries
+
+    def _rescue_orphaned_replays(self) -> None:
+        """Return files claimed by a worker that died mid-replay to the spill queue."""
+        for path in self.spill_dir.glob("*.ndjson.replay-*"):
+            pid = path.name.rsplit("-", 1)[-1]
+            if pid.isdigit() and not _pid_alive(int(pid)):
+                os.replace(path, path.with_name(path.name.replace(".ndjson.replay-", "-rescued-") + ".ndjson"))
+
+
+history_writer = HistoryWriter(
+    max_rows=settings.HISTORY_FLUSH_MAX_ROWS,
+    interval_ms=settings.HISTORY_FLUSH_INTERVAL_MS,
+    max_buffered=settings.HISTORY_BUFFER_MAX_ROWS,
+    spill_dir=settings.HISTORY_SPILL_DIR,
+    retry_seconds=settings.HISTORY_SPILL_RETRY_SECONDS,
+)
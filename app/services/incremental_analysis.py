@@ -0,0 +1,78 @@
+"""
+Sentence-level incremental re-analysis for drafts that are re-submitted
+after every edit.
+
+The text is cut into sentences (``split_into_segments``) and each one is
+looked up in a per-process LRU. Only new or edited sentences are analyzed;
+the document-level scores are rebuilt from the cached parts.
+"""
+
+import re
+from typing import List
+
+from app.config import settings
+from app.schemas.ai_analysis import AIAnalysisResponse, ClaimResult, IncrementalAnalysisResponse
+from app.services.analysis_service import AnalysisService
+from app.services.local_analyzer import analyze_text_local_incremental, split_into_segments
+from app.services.long_document import merge_chunk_results
+from app.services.result_cache import cache_key
+from app.utils.lru import BoundedLRU
+
+_WORD = re.compile(r"\w+")
+
+_local_sentences = BoundedLRU(settings.INCREMENTAL_CACHE_MAX_SENTENCES)
+# cache_key(sentence) -> that sentence's share of a Gemini result
+_ai_sentences = BoundedLRU(settings.INCREMENTAL_CACHE_MAX_SENTENCES)
+
+
+def _attribute_claims(claims: List[ClaimResult], sentences: List[str]) -> List[List[ClaimResult]]:
+    """Assign each claim to the sentence sharing most of its words (first one on ties)."""
+    assigned: List[List[ClaimResult]] = [[] for _ in sentences]
+    vocabularies = [set(_WORD.findall(s.lower())) for s in sentences]
+    for claim in claims:
+        words = set(_WORD.findall(claim.claim.lower()))
+        best = max(range(len(sentences)), key=lambda i: (len(words & vocabularies[i]), -i))
+        assigned[best].append(claim)
+    return assigned
+
+
+def analyze_local_incremental(text: str) -> IncrementalAnalysisResponse:
+    result, total, reused = analyze_text_local_incremental(text, _local_sentences)
+    return IncrementalAnalysisResponse(
+        **result.model_dump(), sentences_total=total, sentences_reused=reused
+    )
+
+
+async def analyze_ai_incremental(text: str) -> IncrementalAnalysisResponse:
+    """
+    Gemini analysis that only sends new or edited sentences upstream.
+
+    The changed sentences go out as one request; its claims are attributed
+    back to the sentence they came from, and its tone and manipulation score
+    apply to every sentence in that request. The document result is the
+    length-weighted merge used for long documents. Degraded (local fallback)
+    results are never cached.
+    """
+    sentences = split_into_segments(text)
+    keys = [cache_key(sentence) for sentence in sentences]
+    parts: List[AIAnalysisResponse] = [_ai_sentences.get(key) for key in keys]
+    missing = [i for i, part in enumerate(parts) if part is None]
+
+    if missing:
+        fresh = await AnalysisService.perform_ai_analysis(" ".join(sentences[i] for i in missing))
+        claims = _attribute_claims(fresh.claims, [sentences[i] for i in missing])
+        for i, sentence_claims in zip(missing, claims):
+            parts[i] = fresh.model_copy(update={"claims": sentence_claims})
+            if not fresh.degraded:
+                _ai_sentences.set(keys[i], parts[i])
+
+    merged = merge_chunk_results([(part, len(sentence)) for part, sentence in zip(parts, sentences)])
+    return IncrementalAnalysisResponse(
+        **merged.model_dump(),
+        sentences_total=len(sentences),
+        sentences_reused=len(sentences) - len(missing),
+    )
+
+
+def incremental_cache_stats() -> dict:
+    return {"local": _local_sentences.stats(), "ai": _ai_sentences.stats()}
@@ -0,0 +1,171 @@
+import uuid
+from datetime import datetime, timedelta, timezone
+from typing import Optional
+
+from sqlalchemy import or_, and_
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from app.config import settings
+from app.models.analysis_job import AnalysisJob
+from app.schemas.analysis import AnalysisCreate
+from app.services.analysis_service import AnalysisService
+
+
+def _now() -> datetime:
+    return datetime.now(timezone.utc)
+
+
+def _lease(worker_id: str) -> str:
+    """Claim token, unique per claim; keeps the end of the worker id (pid) if it must be cut to fit."""
+    nonce = uuid.uuid4().hex[:8]
+    room = AnalysisJob.__table__.c.locked_by.type.length - len(nonce) - 1
+    return f"{worker_id[-room:]}/{nonce}"
+
+
+def _new_job(text: str, user_id: Optional[int]) -> AnalysisJob:
+    return AnalysisJob(
+        id=str(uuid.uuid4()),
+        user_id=user_id,
+        text=text,
+        status=AnalysisJob.QUEUED,
+        attempts=0,
+        max_attempts=settings.JOB_MAX_ATTEMPTS,
+        run_after=_now(),
+    )
+
+
+class JobService:
+
+    @staticmethod
+    def enqueue(db: Session, text: str, user_id: Optional[int]) -> AnalysisJob:
+        job = _new_job(text, user_id)
+        db.add(job)
+        db.commit()
+        return job
+
+    @staticmethod
+    async def enqueue_async(db: AsyncSession, text: str, user_id: Optional[int]) -> AnalysisJob:
+        job = _new_job(text, user_id)
+        db.add(job)
+        await db.commit()
+        return job
+
+    @staticmethod
+    def get_job(db: Session, job_id: str) -> Optional[AnalysisJob]:
+        return db.query(AnalysisJob).filter(AnalysisJob.id == job_id).first()
+
+    @staticmethod
+    def claim_next(db: Session, worker_id: str) -> Optional[AnalysisJob]:
+        """
+        Atomically take the oldest runnable job.
+
+        Runnable means queued and due, or running with an expired visibility
+        timeout (its worker died or stalled). SKIP LOCKED lets concurrent
+        workers claim different rows without blocking each other.
+        """
+        now = _now()
+        job = (
+            db.query(AnalysisJob)
+            .filter(or_(
+                and_(AnalysisJob.status == AnalysisJob.QUEUED, AnalysisJob.run_after <= now),
+                and_(AnalysisJob.status == AnalysisJob.RUNNING, AnalysisJob.locked_until < now),
+            ))
+            .order_by(AnalysisJob.run_after)
+            .with_for_update(skip_locked=True)
+            .limit(1)
+            .first()
+        )
+        if job is None:
+            db.rollback()
+            return None
+
+        if job.status == AnalysisJob.RUNNING and job.attempts >= job.max_attempts:
+            # Timed out on its last allowed attempt
+            job.status = AnalysisJob.FAILED
+            job.error = "Job timed out"
+            job.locked_until = None
+            db.commit()
+            return None
+
+        # Compare-and-set on (status, attempts) as a second guard next to the row lock
+        claimed = (
+            db.query(AnalysisJob)
+            .filter(AnalysisJob.id == job.id, AnalysisJob.status == job.status,
+                    AnalysisJob.attempts == job.attempts)
+            .update({
+                AnalysisJob.status: AnalysisJob.RUNNING,
+                AnalysisJob.attempts: job.attempts + 1,
+                # Unique per claim, so a worker whose lease expired can't complete the job
+                AnalysisJob.locked_by: _lease(worker_id),
+                AnalysisJob.locked_until: now + timedelta(seconds=settings.JOB_VISIBILITY_TIMEOUT_SECONDS),
+            }, synchronize_session=False)
+        )
+        db.commit()
+        if not claimed:
+            return None
+        # Load the row so the worker can use it after the session closes
+        db.refresh(job)
+        return job
+
+    @staticmethod
+    def heartbeat(db: Session, job_id: str, lease: str) -> bool:
+        """Extend the visibility timeout; False if the job is no longer ours."""
+        updated = (
+            db.query(AnalysisJob)
+            .filter(AnalysisJob.id == job_id, AnalysisJob.locked_by == lease,
+                    AnalysisJob.status == AnalysisJob.RUNNING)
+            .update(
+                {AnalysisJob.locked_until: _now() + timedelta(seconds=settings.JOB_VISIBILITY_TIMEOUT_SECONDS)},
+                synchronize_session=False,
+            )
+        )
+        db.commit()
+        return bool(updated)
+
+    @staticmethod
+    def mark_succeeded(db: Session, job_id: str, lease: str, result: dict) -> None:
+        job = (
+            db.query(AnalysisJob)
+            .filter(AnalysisJob.id == job_id, AnalysisJob.locked_by == lease)
+            .with_for_update()
+            .first()
+        )
+        if job is None or job.status != AnalysisJob.RUNNING:
+            # Another worker reclaimed it after our visibility timeout
+            db.rollback()
+            return
+
+        # History row and job completion land in the same transaction
+        if job.user_id is not None:
+            analysis = AnalysisService.create_analysis(
+                db, AnalysisCreate(original_text=job.text, result=result), job.user_id, commit=False
+            )
+            job.analysis_id = analysis.id
+        job.status = AnalysisJob.SUCCEEDED
+        job.result = result
+        job.error = None
+        job.locked_until = None
+        db.commit()
+
+    @staticmethod
+    def mark_failed(db: Session, job_id: str, lease: str, error: str, retryable: bool) -> None:
+        job = (
+            db.query(AnalysisJob)
+            .filter(AnalysisJob.id == job_id, AnalysisJob.locked_by == lease)
+            .with_for_update()
+            .first()
+        )
+        if job is None or job.status != AnalysisJob.RUNNING:
+            db.rollback()
+            return
+
+        job.error = error
+        job.locked_until = None
+        if retryable and job.attempts < job.max_attempts:
+            job.status = AnalysisJob.QUEUED
+            delay = settings.JOB_RETRY_BASE_DELAY_SECONDS * (2 ** (job.attempts - 1))
+            job.run_after = _now() + timedelta(seconds=delay)
+        else:
+            job.status = AnalysisJob.FAILED
+        db.commit()
@@ -0,0 +1,124 @@
+"""
+Keyword lexicons for the local analyzer.
+
+Lexicons live in a versioned JSON file (``LEXICON_PATH``):
+
+    {"version": "2026.10.1", "categories": {"fear": ["danger", ...], ...}}
+
+Every process (including process pool workers) compiles the file into its
+own KeywordMatcher at startup.
+
+The active lexicon is an immutable object behind a single reference. A
+reload builds the replacement completely before swapping it in, so
+in-flight analyses finish with the lexicon they started with. Reloads
+happen when the file changes on disk (checked at most every
+``LEXICON_RELOAD_INTERVAL_SECONDS``) or on demand via ``reload()``. A file
+that fails to load is logged and the previous lexicon stays active.
+"""
+
+import hashlib
+import logging
+import os
+import threading
+import time
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+from pydantic import BaseModel, ValidationError
+
+from app.config import settings
+from app.utils.keyword_matcher import KeywordMatcher
+
+logger = logging.getLogger(__name__)
+
+
+class LexiconError(ValueError):
+    pass
+
+
+class _LexiconFile(BaseModel):
+    version: str
+    categories: Dict[str, List[str]]
+
+
+class Lexicon:
+
+    def __init__(self, version: str, sha256: str, categories: Dict[str, int], matcher: KeywordMatcher):
+        self.version = version
+        self.sha256 = sha256
+        # category -> number of keywords, for reporting
+        self.categories = categories
+        self.matcher = matcher
+
+    def info(self) -> dict:
+        return {"version": self.version, "sha256": self.sha256, "categories": self.categories}
+
+
+def load_lexicon(path: str) -> Lexicon:
+    """Read and compile a lexicon file."""
+    try:
+        raw = Path(path).read_bytes()
+        parsed = _LexiconFile.model_validate_json(raw)
+    except OSError as e:
+        raise LexiconError(f"Cannot read lexicon file {path}: {e}")
+    except ValidationError as e:
+        raise LexiconError(f"Invalid lexicon file {path}: {e}")
+
+    categories = {name: len(words) for name, words in parsed.categories.items()}
+    matcher = KeywordMatcher(parsed.categories)
+    return Lexicon(parsed.version, hashlib.sha256(raw).hexdigest(), categories, matcher)
+
+
+class LexiconStore:
+
+    def __init__(self, path: str, check_interval: float):
+        self.path = path
+        self.check_interval = check_interval
+        self._lock = threading.Lock()
+        self._signature = self._stat()
+        self._checked_at = time.monotonic()
+        self._lexicon = load_lexicon(path)
+
+    def _stat(self) -> Optional[Tuple[int, int]]:
+        try:
+            st = os.stat(self.path)
+        except OSError:
+            return None
+        return st.st_mtime_ns, st.st_size
+
+    def current(self) -> Lexicon:
+        """The active lexicon; picks up file changes at most every ``check_interval`` seconds."""
+        if time.monotonic() - self._checked_at >= self.check_interval:
+            # Only one caller checks; the others keep using the current lexicon
+            if self._lock.acquire(blocking=False):
+                try:
+                    self._checked_at = time.monotonic()
+                    signature = self._stat()
+                    if signature is not None and signature != self._signature:
+                        self._signature = signature
+                        self._swap()
+                except LexiconError:
+                    pass  # logged in _swap; keep serving the previous lexicon
+                finally:
+                    self._lock.release()
+        return self._lexicon
+
+    def _swap(self) -> None:
+        try:
+            lexicon = load_lexicon(self.path)
+        except LexiconError as e:
+            logger.error(f"Lexicon reload failed, keeping version {self._lexicon.version}: {e}")
+            raise
+        previous, self._lexicon = self._lexicon, lexicon
+        logger.info(f"Lexicon reloaded: {previous.version} -> {lexicon.version}")
+
+    def reload(self) -> Lexicon:
+        """Reload from disk now; raises LexiconError (and keeps the old lexicon) on a bad file."""
+        with self._lock:
+            self._signature = self._stat()
+            self._checked_at = time.monotonic()
+            self._swap()
+            return self._lexicon
+
+
+lexicons = LexiconStore(settings.LEXICON_PATH, settings.LEXICON_RELOAD_INTERVAL_SECONDS)
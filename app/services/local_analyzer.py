@@ -4,164 +4,336 @@ Local heuristic-based text analyzer for developer mode (no API key required).
 Provides basic claim detection and risk assessment without external AI calls.
 """
 
+import hashlib
 import re
-from typing import List
+from collections import Counter
+from typing import Dict, FrozenSet, Iterable, List, Mapping, NamedTuple, Optional, Pattern, Tuple
+
+import numpy as np
+
 from app.schemas.ai_analysis import AIAnalysisResponse, ClaimResult
+from app.services.scoring import compute_summary_score, risk_level_for
+from app.services.lexicon import lexicons
+from app.utils.lru import BoundedLRU
+
+# Keyword lexicons (manipulative, emotional, fear, conspiratorial) are data:
+# see LEXICON_PATH and app/services/lexicon.py
+
+# Sentence features, one bit each. Bits 0-3 are the claim indicators (linking
+# verbs and modals, attributions, confirmation verbs, statistics), the rest
+# feed the verdict.
+_CLAIM_COLUMNS = 4
+_NUMBERS, _SOURCE, _ABSOLUTE, _HEDGE = range(_CLAIM_COLUMNS, _CLAIM_COLUMNS + 4)
+
+# Whole-word features
+_FEATURE_WORDS = {
+    0: {"is", "are", "was", "were", "has", "have", "had", "will", "would", "can", "could", "should", "must"},
+    2: {"proven", "confirmed", "revealed", "demonstrated", "established", "found"},
+    3: {"statistics", "data", "evidence"},
+    _ABSOLUTE: {"always", "never", "all", "none", "every", "everyone"},
+    _HEDGE: {"might", "may", "could", "possibly", "perhaps", "allegedly"},
+}
+# word -> bits it sets
+_TOKEN_MASKS: Dict[str, int] = {
+    word: sum(1 << column for column, words in _FEATURE_WORDS.items() if word in words)
+    for word in set().union(*_FEATURE_WORDS.values())
+}
+
+
+def _literal(literal: str, mask: int, whole_word: bool) -> Tuple[str, Pattern[str], int]:
+    """
+    (literal, pattern, mask) for a fixed-string feature, optionally matched
+    only as a whole word (the literal must then start and end with a word
+    character).
 
-# Keywords indicating potentially manipulative language
-MANIPULATIVE_KEYWORDS = [
-    "everyone knows", "nobody can deny", "it's obvious", "clearly",
-    "wake up", "they don't want you to know", "secret", "cover-up",
-    "conspiracy", "mainstream media", "fake news", "sheeple",
-    "agenda", "exposed", "the real story",
-]
+    The leading boundary is checked with a lookbehind after the literal, not
+    a leading \\b, so re still scans for the literal as a prefix.
+    """
+    escaped = re.escape(literal)
+    return literal, re.compile(escaped + (r"(?<!\w" + escaped + r")\b" if whole_word else "")), mask
 
-EMOTIONAL_KEYWORDS = [
-    "shocking", "outrageous", "unbelievable", "alarming", "devastating",
-    "terrifying", "horrifying", "disgusting", "shameful", "scandalous",
-    "incredible", "amazing", "miraculous",
-]
 
-FEAR_KEYWORDS = [
-    "danger", "dangerous", "threat", "crisis", "emergency",
-    "catastrophic", "disaster", "deadly", "lethal", "fatal",
-    "urgent", "critical", "severe",
+# Every feature that is a fixed string, with the bits it sets
+_FEATURE_LITERALS: List[Tuple[str, Pattern[str], int]] = [
+    *(_literal(word, mask, True) for word, mask in sorted(_TOKEN_MASKS.items())),
+    *(_literal(phrase, 1 << 1, True)
+      for phrase in ("studies show", "research shows", "scientists say", "experts say", "according to")),
+    *(_literal(source, 1 << _SOURCE, False) for source in ("according to", "study", "research", "expert", "scientist")),
+    _literal("no one", 1 << _ABSOLUTE, True),
 ]
-
-CONSPIRATORIAL_KEYWORDS = [
-    "deep state", "new world order", "illuminati", "false flag",
-    "controlled", "puppets", "elites", "globalist", "planned",
-    "orchestrated",
+# Numbers; followed by one of the suffixes and on word boundaries, they are statistics
+_NUMBER = re.compile(r"\d+")
+_STATISTIC_SUFFIXES = ("%", " percent")
+# Whitespace after sentence-ending punctuation (group 1). Matching the
+# punctuation rather than looking behind for it lets re scan for it directly.
+_SENTENCE_BREAK = re.compile(r"[.!?](\s+)")
+
+_VERDICTS = [
+    ("Likely True", "Claim references specific data or sources which increases verifiability."),
+    ("Likely False", "Claim uses absolute language (always/never/all/none) which is often inaccurate."),
+    ("Uncertain", "Claim uses hedging language suggesting uncertainty or speculation."),
+    ("Uncertain", "Claim could not be definitively assessed without external verification."),
 ]
 
-# Patterns that indicate a sentence contains a factual claim
-_CLAIM_PATTERNS = [
-    re.compile(r"\b(is|are|was|were|has|have|had|will|would|can|could|should|must)\b"),
-    re.compile(r"\b(studies show|research shows|scientists say|experts say|according to)\b"),
-    re.compile(r"\b(proven|confirmed|revealed|demonstrated|established|found)\b"),
-    re.compile(r"\b(\d+%|\d+ percent|statistics|data|evidence)\b"),
-]
+
+def _verdict_index(features: int) -> int:
+    """Index into _VERDICTS for a sentence's feature bits."""
+    has = [bool(features >> column & 1) for column in range(_HEDGE + 1)]
+    if has[_SOURCE] and has[_NUMBERS]:
+        return 0
+    if has[_ABSOLUTE]:
+        return 1
+    if has[_HEDGE]:
+        return 2
+    return 3
+
+
+# Every combination of claim bits and of verdict bits, precomputed, so that
+# scoring all sentences is two array lookups
+_CLAIM_BITS = (1 << _CLAIM_COLUMNS) - 1
+_FACT_CHECK_PROBABILITIES = np.array(
+    [min(90, 20 + bin(bits).count("1") * 20) for bits in range(_CLAIM_BITS + 1)], dtype=np.int64
+)
+_VERDICT_INDEXES = np.array(
+    [_verdict_index(flags << _CLAIM_COLUMNS) for flags in range(1 << (_HEDGE + 1 - _CLAIM_COLUMNS))], dtype=np.int64
+)
+
+# Number of sentences reported as claims; all sentences are scored
+MAX_CLAIMS = 5
 
 
-def _split_into_sentences(text: str) -> List[str]:
-    parts = re.split(r"(?<=[.!?])\s+", text.strip())
-    return [s.strip() for s in parts if len(s.strip()) > 10]
+def _segment_spans(text: str) -> List[Tuple[int, int]]:
+    """(start, end) of every non-empty piece between sentence breaks, whitespace-trimmed."""
+    spans = []
+    start = 0
+    for match in _SENTENCE_BREAK.finditer(text):
+        spans.append((start, match.start(1)))
+        start = match.end(1)
+    spans.append((start, len(text)))
 
+    # A break swallows all the whitespace around it, so only the ends of the
+    # text can leave whitespace to trim
+    first = len(text) - len(text.lstrip())
+    last = len(text.rstrip())
+    return [
+        (max(start, first), min(end, last))
+        for start, end in spans
+        if min(end, last) > max(start, first)
+    ]
 
-def _count_keyword_hits(text_lower: str, keywords: List[str]) -> int:
-    return sum(1 for kw in keywords if kw in text_lower)
 
+def _sentence_spans(text: str) -> List[Tuple[int, int]]:
+    """Segments long enough (over 10 characters) to be scored as claims."""
+    return [(start, end) for start, end in _segment_spans(text) if end - start > 10]
 
-def _compute_manipulation_score(text: str) -> int:
-    text_lower = text.lower()
+
+def split_into_segments(text: str) -> List[str]:
+    """The text cut at sentence breaks; the unit of incremental re-analysis."""
+    return [text[start:end] for start, end in _segment_spans(text)]
+
+
+def _compute_manipulation_score(counts: Mapping[str, int]) -> int:
     score = (
-        _count_keyword_hits(text_lower, MANIPULATIVE_KEYWORDS) * 15
-        + _count_keyword_hits(text_lower, EMOTIONAL_KEYWORDS) * 8
-        + _count_keyword_hits(text_lower, FEAR_KEYWORDS) * 8
-        + _count_keyword_hits(text_lower, CONSPIRATORIAL_KEYWORDS) * 20
+        counts.get("manipulative", 0) * 15
+        + counts.get("emotional", 0) * 8
+        + counts.get("fear", 0) * 8
+        + counts.get("conspiratorial", 0) * 20
     )
     return min(100, score)
 
 
-def _detect_emotional_tone(text: str, manipulation_score: int) -> str:
-    text_lower = text.lower()
-    if _count_keyword_hits(text_lower, CONSPIRATORIAL_KEYWORDS) >= 1:
+def _detect_emotional_tone(counts: Mapping[str, int], manipulation_score: int) -> str:
+    if counts.get("conspiratorial", 0) >= 1:
         return "Conspiratorial"
     if manipulation_score >= 60:
         return "Manipulative"
-    if _count_keyword_hits(text_lower, FEAR_KEYWORDS) >= 2:
+    if counts.get("fear", 0) >= 2:
         return "Fear-Based"
-    if _count_keyword_hits(text_lower, EMOTIONAL_KEYWORDS) >= 1:
+    if counts.get("emotional", 0) >= 1:
         return "Emotional"
     return "Neutral"
 
 
-def _analyze_sentence(sentence: str) -> ClaimResult:
-    """Score a single sentence as a potential factual claim."""
-    sentence_lower = sentence.lower()
+def _keyword_counts(keywords: Iterable[Tuple[str, str]]) -> Dict[str, int]:
+    """Distinct keywords per category from (category, keyword) pairs."""
+    return dict(Counter(category for category, _ in set(keywords)))
 
-    claim_indicator_count = sum(
-        1 for p in _CLAIM_PATTERNS if p.search(sentence_lower)
-    )
-    fact_check_probability = min(90, 20 + claim_indicator_count * 20)
 
-    word_count = len(sentence.split())
-    confidence = max(30, min(80, 30 + word_count * 2))
+def _is_boundary(text: str, pos: int) -> bool:
+    """Same as regex ``\\b`` at ``pos``."""
+    before = pos > 0 and (text[pos - 1].isalnum() or text[pos - 1] == "_")
+    after = pos < len(text) and (text[pos].isalnum() or text[pos] == "_")
+    return before != after
 
-    has_numbers = bool(re.search(r"\d+", sentence))
-    has_source = bool(
-        re.search(r"(according to|study|research|expert|scientist)", sentence_lower)
-    )
-    has_absolute = bool(
-        re.search(r"\b(always|never|all|none|every|no one|everyone)\b", sentence_lower)
-    )
-    has_hedge = bool(
-        re.search(r"\b(might|may|could|possibly|perhaps|allegedly)\b", sentence_lower)
+
+def _sentence_features(text: str, spans: List[Tuple[int, int]]) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Feature bits and word count per sentence.
+
+    Every feature is searched for once over the whole text and the hits are
+    assigned to sentences by offset in one step, instead of searching every
+    sentence separately.
+    """
+    lowered = text.lower()
+    positions: List[int] = []
+    masks: List[int] = []
+
+    for literal, pattern, mask in _FEATURE_LITERALS:
+        # A plain substring test is much cheaper than a regex pass that finds nothing
+        if literal in lowered:
+            for match in pattern.finditer(lowered):
+                positions.append(match.start())
+                masks.append(mask)
+
+    for match in _NUMBER.finditer(lowered):
+        start, end = match.span()
+        positions.append(start)
+        masks.append(1 << _NUMBERS)
+        for suffix in _STATISTIC_SUFFIXES:
+            if lowered.startswith(suffix, end):
+                if _is_boundary(lowered, start) and _is_boundary(lowered, end + len(suffix)):
+                    positions.append(start)
+                    masks.append(1 << 3)
+                break
+
+    features = np.zeros(len(spans), dtype=np.int64)
+    if positions:
+        hits = np.asarray(positions, dtype=np.int64)
+        bounds = np.asarray(spans, dtype=np.int64).reshape(-1, 2)
+        index = np.searchsorted(bounds[:, 0], hits, side="right") - 1
+        inside = (index >= 0) & (hits < bounds[np.maximum(index, 0), 1])
+        np.bitwise_or.at(features, index[inside], np.asarray(masks, dtype=np.int64)[inside])
+
+    word_counts = np.fromiter((len(text[start:end].split()) for start, end in spans), dtype=np.int64, count=len(spans))
+    return features, word_counts
+
+
+def _score_spans(text: str, spans: List[Tuple[int, int]]) -> np.ndarray:
+    """(fact_check_probability, confidence, verdict index) per sentence, as an n x 3 array."""
+    features, word_counts = _sentence_features(text, spans)
+    return np.stack([
+        _FACT_CHECK_PROBABILITIES[features & _CLAIM_BITS],
+        np.minimum(80, 30 + word_counts * 2),
+        _VERDICT_INDEXES[features >> _CLAIM_COLUMNS],
+    ], axis=1)
+
+
+def _top_claims(text: str, spans: List[Tuple[int, int]], scores: np.ndarray, max_claims: int) -> List[ClaimResult]:
+    """Build ClaimResults only for the most claim-like sentences, in document order."""
+    # Ties keep document order
+    top = np.sort(np.argsort(-scores[:, 0], kind="stable")[:max_claims])
+
+    claims = []
+    for i in top.tolist():
+        start, end = spans[i]
+        fact_check_probability, confidence, verdict = scores[i].tolist()
+        label, reasoning = _VERDICTS[verdict]
+        claims.append(ClaimResult(
+            claim=text[start:end][:200],
+            verdict=label,
+            fact_check_probability=fact_check_probability,
+            confidence=confidence,
+            reasoning=reasoning,
+        ))
+    return claims
+
+
+def _build_response(claims: List[ClaimResult], counts: Mapping[str, int], lexicon_version: str) -> AIAnalysisResponse:
+    manipulation_score = _compute_manipulation_score(counts)
+    emotional_tone = _detect_emotional_tone(counts, manipulation_score)
+
+    # Use the same formula as the Gemini prompt for consistency
+    summary_score = compute_summary_score(
+        manipulation_score, (c.fact_check_probability for c in claims)
     )
+    overall_risk_level = risk_level_for(summary_score)
+
+    confidence_overall = round(sum(c.confidence for c in claims) / len(claims))
 
-    if has_source and has_numbers:
-        verdict = "Likely True"
-        reasoning = "Claim references specific data or sources which increases verifiability."
-    elif has_absolute:
-        verdict = "Likely False"
-        reasoning = "Claim uses absolute language (always/never/all/none) which is often inaccurate."
-    elif has_hedge:
-        verdict = "Uncertain"
-        reasoning = "Claim uses hedging language suggesting uncertainty or speculation."
-    else:
-        verdict = "Uncertain"
-        reasoning = "Claim could not be definitively assessed without external verification."
-
-    return ClaimResult(
-        claim=sentence[:200],
-        verdict=verdict,
-        fact_check_probability=fact_check_probability,
-        confidence=confidence,
-        reasoning=reasoning,
+    return AIAnalysisResponse(
+        summary_score=summary_score,
+        overall_risk_level=overall_risk_level,
+        claims=claims,
+        emotional_tone=emotional_tone,
+        manipulation_score=manipulation_score,
+        confidence_overall=confidence_overall,
+        lexicon_version=lexicon_version,
     )
 
 
-def analyze_text_local(text: str) -> AIAnalysisResponse:
+def analyze_text_local(text: str, max_claims: int = MAX_CLAIMS) -> AIAnalysisResponse:
     """
     Perform local heuristic-based text analysis without an external AI API.
 
     Uses keyword detection and sentence-level heuristics to produce an
     AIAnalysisResponse that is schema-compatible with the Gemini-backed endpoint.
     Intended for developer testing when no Google API key is configured.
+    Every sentence is scored; the ``max_claims`` most claim-like ones are
+    reported, in document order.
     """
-    sentences = _split_into_sentences(text)
-    # Limit claim analysis to the first 5 sentences for performance.
-    # Fall back to the raw (possibly very short) text if no sentences were detected.
-    claim_sentences = sentences[:5] if sentences else [text[:200] or "No content"]
+    claim_text = text
+    spans = _sentence_spans(text)
+    if not spans:
+        # Fall back to the raw (possibly very short) text if no sentences were detected
+        claim_text = text[:200] or "No content"
+        spans, max_claims = [(0, len(claim_text))], 1
 
-    claims = [_analyze_sentence(s) for s in claim_sentences]
+    claims = _top_claims(claim_text, spans, _score_spans(claim_text, spans), max_claims)
 
-    # Guard against an empty claims list (should not happen with the fallback above)
-    if not claims:
-        claims = [_analyze_sentence(text[:200] or "No content")]
+    lexicon = lexicons.current()
+    scan = lexicon.matcher.scan(text)
+    counts = _keyword_counts((m.category, m.keyword) for m in scan.matches)
+    return _build_response(claims, counts, lexicon.version)
 
-    manipulation_score = _compute_manipulation_score(text)
-    emotional_tone = _detect_emotional_tone(text, manipulation_score)
 
-    # Use the same formula as the Gemini prompt for consistency
-    avg_fact_probability = sum(c.fact_check_probability for c in claims) / len(claims)
-    summary_score = round((manipulation_score * 0.6) + ((100 - avg_fact_probability) * 0.4))
-    summary_score = max(0, min(100, summary_score))
+class _SegmentResult(NamedTuple):
+    keywords: FrozenSet[Tuple[str, str]]
+    # (fact_check_probability, confidence, verdict index); None if too short to be a claim
+    score: Optional[Tuple[int, int, int]]
 
-    if summary_score <= 30:
-        overall_risk_level = "Low"
-    elif summary_score <= 70:
-        overall_risk_level = "Medium"
-    else:
-        overall_risk_level = "High"
 
-    confidence_overall = round(sum(c.confidence for c in claims) / len(claims))
+def analyze_text_local_incremental(
+    text: str,
+    cache: BoundedLRU,
+    max_claims: int = MAX_CLAIMS,
+) -> Tuple[AIAnalysisResponse, int, int]:
+    """
+    Same result as ``analyze_text_local``, reusing per-segment work from ``cache``.
 
-    return AIAnalysisResponse(
-        summary_score=summary_score,
-        overall_risk_level=overall_risk_level,
-        claims=claims,
-        emotional_tone=emotional_tone,
-        manipulation_score=manipulation_score,
-        confidence_overall=confidence_overall,
-    )
+    Keyword hits and sentence scores are cached per segment (keyed by a hash
+    of its text and the lexicon); only new or edited segments are scanned and scored, and the
+    document-level scores are rebuilt from the parts. Returns the response,
+    the number of segments and how many of them were reused.
+    """
+    segments = _segment_spans(text)
+    if not any(end - start > 10 for start, end in segments):
+        return analyze_text_local(text, max_claims), len(segments), 0
+
+    # One lexicon for the whole call; keyword hits are only reusable under the same one
+    lexicon = lexicons.current()
+    keys = [
+        hashlib.sha256(f"{lexicon.sha256}\x00{text[start:end]}".encode("utf-8")).hexdigest()
+        for start, end in segments
+    ]
+    parts: List[Optional[_SegmentResult]] = [cache.get(key) for key in keys]
+    missing = [i for i, part in enumerate(parts) if part is None]
+
+    if missing:
+        to_score = [i for i in missing if segments[i][1] - segments[i][0] > 10]
+        scores = _score_spans(text, [segments[i] for i in to_score]).tolist() if to_score else []
+        scored = dict(zip(to_score, scores))
+        for i in missing:
+            start, end = segments[i]
+            scan = lexicon.matcher.scan(text[start:end])
+            score = scored.get(i)
+            parts[i] = _SegmentResult(
+                keywords=frozenset((m.category, m.keyword) for m in scan.matches),
+                score=tuple(score) if score is not None else None,
+            )
+            cache.set(keys[i], parts[i])
+
+    spans = [segment for segment, part in zip(segments, parts) if part.score is not None]
+    scores = np.array([part.score for part in parts if part.score is not None], dtype=np.int64)
+    claims = _top_claims(text, spans, scores, max_claims)
+    counts = _keyword_counts(keyword for part in parts for keyword in part.keywords)
+    return _build_response(claims, counts, lexicon.version), len(segments), len(segments) - len(missing)
@@ -0,0 +1,78 @@
+"""
+Process pool for the local heuristic analyzer.
+
+analyze_text_local is pure-Python regex and keyword work, so threads are
+capped at one core by the GIL. Large batches are split into chunks (one IPC
+round-trip per chunk rather than per text) and spread across worker
+processes; results are yielded in input order.
+"""
+
+import asyncio
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+from typing import AsyncIterator, List, Optional, Tuple
+
+from starlette.concurrency import run_in_threadpool
+
+from app.config import settings
+from app.schemas.ai_analysis import AIAnalysisResponse
+from app.services.local_analyzer import analyze_text_local
+
+_pool: Optional[ProcessPoolExecutor] = None
+
+
+def _analyze_chunk(texts: List[str]) -> List[dict]:
+    # Runs in a worker process; plain dicts are cheaper to pickle than models
+    return [analyze_text_local(text).model_dump() for text in texts]
+
+
+def _worker_count() -> int:
+    return settings.LOCAL_BATCH_WORKERS or os.cpu_count() or 1
+
+
+def get_local_pool() -> ProcessPoolExecutor:
+    global _pool
+    if _pool is None:
+        # spawn rather than fork: the API process has live threads and sockets
+        _pool = ProcessPoolExecutor(
+            max_workers=_worker_count(),
+            mp_context=multiprocessing.get_context("spawn"),
+        )
+    return _pool
+
+
+def shutdown_local_pool() -> None:
+    global _pool
+    if _pool is not None:
+        _pool.shutdown(wait=True, cancel_futures=True)
+        _pool = None
+
+
+async def analyze_batch_local(texts: List[str]) -> AsyncIterator[Tuple[int, List[AIAnalysisResponse]]]:
+    """
+    Yield ``(offset, results)`` per chunk, in input order.
+
+    A batch that fits in one chunk (or a single-worker setup) runs in the
+    threadpool; spinning up processes would cost more than it saves.
+    """
+    size = max(1, settings.LOCAL_BATCH_CHUNK_SIZE)
+    chunks = [texts[i:i + size] for i in range(0, len(texts), size)]
+
+    if len(chunks) == 1 or _worker_count() == 1:
+        for index, chunk in enumerate(chunks):
+            results = await run_in_threadpool(_analyze_chunk, chunk)
+            yield index * size, [AIAnalysisResponse.model_validate(r) for r in results]
+        return
+
+    loop = asyncio.get_running_loop()
+    pool = get_local_pool()
+    futures = [loop.run_in_executor(pool, _analyze_chunk, chunk) for chunk in chunks]
+    try:
+        for index, future in enumerate(futures):
+            results = await future
+            yield index * size, [AIAnalysisResponse.model_validate(r) for r in results]
+    finally:
+        # Client went away mid-stream: drop chunks that haven't started
+        for future in futures:
+            future.cancel()
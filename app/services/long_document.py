@@ -0,0 +1,177 @@
+"""
+Map-reduce analysis for documents longer than a single Gemini request allows.
+
+The text is split on paragraph and sentence boundaries into overlapping
+chunks, the chunks are analyzed concurrently (bounded fan-out) through the
+regular AI pipeline, and the partial results are merged back into a single
+AIAnalysisResponse.
+"""
+
+import asyncio
+import re
+from collections import defaultdict
+from typing import Awaitable, Callable, Dict, List, Tuple
+
+from app.config import settings
+from app.schemas.ai_analysis import AIAnalysisResponse, ClaimResult
+from app.services.scoring import compute_summary_score, risk_level_for
+
+_PARAGRAPH_BREAK = re.compile(r"\n\s*\n")
+_SENTENCE_BREAK = re.compile(r"(?<=[.!?])\s+")
+_NON_WORD = re.compile(r"[^\w\s]")
+
+# Claims whose token sets overlap at least this much are treated as one claim
+_DUPLICATE_JACCARD = 0.85
+
+
+def _split_units(text: str, max_chars: int) -> List[str]:
+    """Sentences (paragraph-aware), with any oversized sentence hard-wrapped on words."""
+    units = []
+    for paragraph in _PARAGRAPH_BREAK.split(text):
+        for sentence in _SENTENCE_BREAK.split(paragraph.strip()):
+            sentence = sentence.strip()
+            if not sentence:
+                continue
+            while len(sentence) > max_chars:
+                cut = sentence.rfind(" ", 0, max_chars)
+                if cut <= 0:
+                    cut = max_chars
+                units.append(sentence[:cut])
+                sentence = sentence[cut:].strip()
+            if sentence:
+                units.append(sentence)
+        # Keep paragraph boundaries visible to the model inside a chunk
+        if units and not units[-1].endswith("\n"):
+            units[-1] += "\n"
+    return units
+
+
+def split_into_chunks(text: str, chunk_chars: int, overlap_chars: int) -> List[str]:
+    """
+    Pack sentences into chunks of at most ``chunk_chars`` characters.
+
+    Each chunk after the first starts with up to ``overlap_chars`` of trailing
+    sentences from the previous chunk, so claims spanning a boundary are
+    seen whole at least once.
+    """
+    # One character of headroom for the newline kept at paragraph ends
+    units = _split_units(text, chunk_chars - 1)
+    chunks: List[str] = []
+    current: List[str] = []
+    size = 0
+
+    for unit in units:
+        if current and size + len(unit) + 1 > chunk_chars:
+            chunks.append(" ".join(current).strip())
+            overlap: List[str] = []
+            overlap_size = 0
+            for previous in reversed(current):
+                if overlap_size + len(previous) > overlap_chars:
+                    break
+                overlap.insert(0, previous)
+                overlap_size += len(previous) + 1
+            # The overlap must not push the next chunk past chunk_chars
+            while overlap and overlap_size + len(unit) + 1 > chunk_chars:
+                overlap_size -= len(overlap.pop(0)) + 1
+            current, size = overlap, overlap_size
+        current.append(unit)
+        size += len(unit) + 1
+
+    if current:
+        chunks.append(" ".join(current).strip())
+    return chunks
+
+
+def _claim_tokens(claim: str) -> frozenset:
+    return frozenset(_NON_WORD.sub(" ", claim.lower()).split())
+
+
+def _dedupe_claims(claims: List[ClaimResult]) -> List[ClaimResult]:
+    """Drop near-identical claims (e.g. from chunk overlap), keeping the most confident one."""
+    kept: List[Tuple[frozenset, ClaimResult]] = []
+    exact: Dict[frozenset, int] = {}
+
+    for claim in claims:
+        tokens = _claim_tokens(claim.claim)
+        match = exact.get(tokens)
+        if match is None:
+            for i, (other, _) in enumerate(kept):
+                # Cheap size bound before computing the Jaccard index
+                smaller, larger = sorted((len(tokens), len(other)))
+                if not larger or smaller / larger < _DUPLICATE_JACCARD:
+                    continue
+                if len(tokens & other) / len(tokens | other) >= _DUPLICATE_JACCARD:
+                    match = i
+                    break
+
+        if match is None:
+            exact[tokens] = len(kept)
+            kept.append((tokens, claim))
+        elif claim.confidence > kept[match][1].confidence:
+            kept[match] = (kept[match][0], claim)
+
+    return [claim for _, claim in kept]
+
+
+def _weighted_mean(values: List[Tuple[float, int]]) -> int:
+    total_weight = sum(weight for _, weight in values)
+    return round(sum(value * weight for value, weight in values) / total_weight)
+
+
+def _aggregate_tone(parts: List[Tuple[AIAnalysisResponse, int]]) -> str:
+    """Most prevalent non-neutral tone by text share, if it covers enough of the document."""
+    weights: Dict[str, int] = defaultdict(int)
+    for result, weight in parts:
+        weights[result.emotional_tone] += weight
+    total = sum(weights.values())
+    loaded = {tone: w for tone, w in weights.items() if tone != "Neutral"}
+    if loaded:
+        tone, weight = max(loaded.items(), key=lambda item: item[1])
+        if weight / total >= settings.LONG_DOCUMENT_TONE_SHARE:
+            return tone
+    return "Neutral"
+
+
+def merge_chunk_results(parts: List[Tuple[AIAnalysisResponse, int]]) -> AIAnalysisResponse:
+    """Reduce per-chunk results (each paired with its chunk length) into one response."""
+    claims = _dedupe_claims([claim for result, _ in parts for claim in result.claims])
+    manipulation_score = _weighted_mean([(r.manipulation_score, w) for r, w in parts])
+
+    if claims:
+        summary_score = compute_summary_score(
+            manipulation_score, (c.fact_check_probability for c in claims)
+        )
+    else:
+        summary_score = _weighted_mean([(r.summary_score, w) for r, w in parts])
+
+    return AIAnalysisResponse(
+        summary_score=summary_score,
+        overall_risk_level=risk_level_for(summary_score),
+        claims=claims,
+        emotional_tone=_aggregate_tone(parts),
+        manipulation_score=manipulation_score,
+        confidence_overall=_weighted_mean([(r.confidence_overall, w) for r, w in parts]),
+        degraded=any(r.degraded for r, _ in parts),
+        lexicon_version=next((r.lexicon_version for r, _ in parts if r.lexicon_version), None),
+    )
+
+
+async def analyze_long_document(
+    text: str,
+    analyze: Callable[[str], Awaitable[AIAnalysisResponse]],
+) -> AIAnalysisResponse:
+    """Split ``text``, run ``analyze`` over the chunks with bounded concurrency and merge."""
+    chunks = split_into_chunks(
+        text, settings.LONG_DOCUMENT_CHUNK_CHARS, settings.LONG_DOCUMENT_OVERLAP_CHARS
+    )
+    if len(chunks) == 1:
+        return await analyze(chunks[0])
+
+    semaphore = asyncio.Semaphore(settings.LONG_DOCUMENT_MAX_CONCURRENCY)
+
+    async def analyze_chunk(chunk: str) -> Tuple[AIAnalysisResponse, int]:
+        async with semaphore:
+            return await analyze(chunk), len(chunk)
+
+    parts = await asyncio.gather(*(analyze_chunk(chunk) for chunk in chunks))
+    return merge_chunk_results(list(parts))
@@ -0,0 +1,107 @@
+"""
+Content-addressed storage of analysis payloads (``analysis_payloads``).
+
+Every distinct (text, result) pair is stored once; ``analyses`` rows point
+at it by hash. ``acquire`` upserts the payloads of new history rows and
+adds to their refcounts in the caller's transaction. ``check`` and
+``repair`` compare refcounts with the actual references and remove
+payloads nothing points at.
+"""
+
+from collections import Counter
+from typing import Any, Dict, Iterable, List, Tuple
+
+from sqlalchemy import delete, func, select, update
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from app.models.analysis import Analysis
+from app.models.analysis_payload import AnalysisPayload
+from app.schemas.analysis import AnalysisCreate
+
+
+def _payload_rows(analyses: Iterable[AnalysisCreate]) -> Tuple[List[str], List[Dict[str, Any]]]:
+    """Hash per analysis, and one upsert row per distinct payload with its reference count."""
+    hashes = []
+    payloads: Dict[str, AnalysisCreate] = {}
+    for analysis in analyses:
+        payload_hash = AnalysisPayload.hash_for(analysis.original_text, analysis.result)
+        hashes.append(payload_hash)
+        payloads.setdefault(payload_hash, analysis)
+    counts = Counter(hashes)
+    # Sorted, so concurrent transactions lock shared payload rows in the same order
+    rows = [
+        {"hash": h, "original_text": payloads[h].original_text, "result": payloads[h].result, "refcount": counts[h]}
+        for h in sorted(payloads)
+    ]
+    return hashes, rows
+
+
+def _upsert(dialect: str):
+    insert = postgresql.insert if dialect == "postgresql" else sqlite.insert
+    stmt = insert(AnalysisPayload)
+    table = AnalysisPayload.__table__
+    return stmt.on_conflict_do_update(
+        index_elements=[table.c.hash],
+        set_={"refcount": table.c.refcount + stmt.excluded.refcount},
+    )
+
+
+def _reference_counts():
+    return select(Analysis.payload_hash, func.count().label("references")).group_by(Analysis.payload_hash)
+
+
+class PayloadService:
+
+    @staticmethod
+    def acquire(db: Session, analyses: List[AnalysisCreate]) -> List[str]:
+        """Store payloads for new history rows; returns their hashes in order. Does not commit."""
+        hashes, rows = _payload_rows(analyses)
+        if rows:
+            db.execute(_upsert(db.get_bind().dialect.name), rows)
+        return hashes
+
+    @staticmethod
+    async def acquire_async(db: AsyncSession, analyses: List[AnalysisCreate]) -> List[str]:
+        hashes, rows = _payload_rows(analyses)
+        if rows:
+            await db.execute(_upsert(db.bind.dialect.name), rows)
+        return hashes
+
+    @staticmethod
+    def check(db: Session) -> List[Dict[str, Any]]:
+        """Payloads whose refcount differs from the number of analyses referencing them."""
+        refs = _reference_counts().subquery()
+        references = func.coalesce(refs.c.references, 0)
+        rows = db.execute(
+            select(AnalysisPayload.hash, AnalysisPayload.refcount, references)
+            .outerjoin(refs, refs.c.payload_hash == AnalysisPayload.hash)
+            .where(AnalysisPayload.refcount != references)
+            .order_by(AnalysisPayload.hash)
+        )
+        return [{"hash": h, "refcount": refcount, "references": actual} for h, refcount, actual in rows]
+
+    @staticmethod
+    def repair(db: Session) -> Tuple[int, int]:
+        """
+        Reset drifted refcounts and delete unreferenced payloads, then commit.
+
+        Returns ``(refcounts_fixed, payloads_deleted)``.
+        """
+        mismatches = PayloadService.check(db)
+        for mismatch in mismatches:
+            # Recounted in the UPDATE itself rather than from the check's snapshot
+            db.execute(
+                update(AnalysisPayload)
+                .where(AnalysisPayload.hash == mismatch["hash"])
+                .values(refcount=select(func.count(Analysis.id)).where(Analysis.payload_hash == AnalysisPayload.hash).scalar_subquery())
+            )
+        # A concurrent insert bumps the refcount first, so it is never deleted here
+        deleted = db.execute(
+            delete(AnalysisPayload)
+            .where(AnalysisPayload.refcount <= 0)
+            .where(~select(Analysis.id).where(Analysis.payload_hash == AnalysisPayload.hash).exists())
+        ).rowcount
+        db.commit()
+        return len(mismatches), deleted
@@ -0,0 +1,197 @@
+"""
+Content-addressed cache for AI analysis results.
+
+Tier 1 is a per-process LRU with a TTL and a size bound. Tier 2 is the shared
+``analysis_cache`` table, so a result computed by one uvicorn worker is
+available to all of them. Keys hash the normalized text together with
+``PROMPT_VERSION``, which means a prompt or model change never serves stale
+results; ``ResultCache.purge_stale`` removes the orphaned rows. When
+``GEMINI_API_BASE`` points at a stand-in (load tests), only the memory tier
+is used, so synthetic results never reach the shared table and the startup
+purge never deletes real ones.
+"""
+
+import hashlib
+import logging
+import re
+import threading
+import time
+import unicodedata
+from collections import OrderedDict
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, Optional, Tuple
+
+from sqlalchemy.exc import SQLAlchemyError
+from starlette.concurrency import run_in_threadpool
+
+from app.config import settings
+from app.database import SessionLocal
+from app.models.analysis_cache import AnalysisCacheEntry
+from app.schemas.ai_analysis import AIAnalysisResponse
+from app.services.gemini_client import PROMPT_VERSION, USING_REAL_GEMINI
+
+logger = logging.getLogger(__name__)
+
+_WHITESPACE = re.compile(r"\s+")
+
+# key -> (expires_at monotonic timestamp, result)
+_memory: "OrderedDict[str, Tuple[float, AIAnalysisResponse]]" = OrderedDict()
+_lock = threading.Lock()
+_stats: Dict[str, int] = {"memory_hits": 0, "db_hits": 0, "misses": 0, "stores": 0}
+
+
+def normalize_text(text: str) -> str:
+    """Canonical form used for content addressing (NFC, collapsed whitespace)."""
+    return _WHITESPACE.sub(" ", unicodedata.normalize("NFC", text)).strip()
+
+
+def cache_key(text: str) -> str:
+    payload = f"{PROMPT_VERSION}\x00{normalize_text(text)}"
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def _memory_get(key: str) -> Optional[AIAnalysisResponse]:
+    with _lock:
+        entry = _memory.get(key)
+        if entry is None:
+            return None
+        expires_at, result = entry
+        if expires_at < time.monotonic():
+            del _memory[key]
+            return None
+        _memory.move_to_end(key)
+        return result
+
+
+def _memory_set(key: str, result: AIAnalysisResponse) -> None:
+    with _lock:
+        _memory[key] = (time.monotonic() + settings.RESULT_CACHE_TTL_SECONDS, result)
+        _memory.move_to_end(key)
+        while len(_memory) > settings.RESULT_CACHE_MAX_ENTRIES:
+            _memory.popitem(last=False)
+
+
+def _incr(counter: str) -> None:
+    with _lock:
+        _stats[counter] += 1
+
+
+def _db_get(key: str) -> Optional[AIAnalysisResponse]:
+    db = SessionLocal()
+    try:
+        entry = db.get(AnalysisCacheEntry, key)
+        if entry is None or entry.prompt_version != PROMPT_VERSION:
+            return None
+        expires_at = entry.expires_at
+        if expires_at.tzinfo is None:
+            expires_at = expires_at.replace(tzinfo=timezone.utc)
+        if expires_at < datetime.now(timezone.utc):
+            return None
+        return AIAnalysisResponse.model_validate(entry.result)
+    finally:
+        db.close()
+
+
+def _db_set(key: str, result: AIAnalysisResponse) -> None:
+    db = SessionLocal()
+    try:
+        db.merge(AnalysisCacheEntry(
+            key=key,
+            prompt_version=PROMPT_VERSION,
+            result=result.model_dump(),
+            expires_at=datetime.now(timezone.utc) + timedelta(seconds=settings.RESULT_CACHE_DB_TTL_SECONDS),
+        ))
+        db.commit()
+    except SQLAlchemyError:
+        # e.g. another worker inserted the same key first
+        db.rollback()
+        raise
+    finally:
+        db.close()
+
+
+def _db_delete(stale_only: bool) -> int:
+    db = SessionLocal()
+    try:
+        query = db.query(AnalysisCacheEntry)
+        if stale_only:
+            query = query.filter(
+                (AnalysisCacheEntry.prompt_version != PROMPT_VERSION)
+                | (AnalysisCacheEntry.expires_at < datetime.now(timezone.utc))
+            )
+        deleted = query.delete(synchronize_session=False)
+        db.commit()
+        return deleted
+    finally:
+        db.close()
+
+
+class ResultCache:
+
+    @staticmethod
+    async def get(text: str) -> Optional[AIAnalysisResponse]:
+        if not settings.RESULT_CACHE_ENABLED:
+            return None
+
+        key = cache_key(text)
+        result = _memory_get(key)
+        if result is not None:
+            _incr("memory_hits")
+            return result.model_copy(deep=True)
+
+        result = None
+        if USING_REAL_GEMINI:
+            try:
+                result = await run_in_threadpool(_db_get, key)
+            except SQLAlchemyError as e:
+                logger.warning(f"Result cache lookup failed: {e}")
+
+        if result is None:
+            _incr("misses")
+            return None
+
+        _incr("db_hits")
+        _memory_set(key, result)
+        return result.model_copy(deep=True)
+
+    @staticmethod
+    async def set(text: str, result: AIAnalysisResponse) -> None:
+        if not settings.RESULT_CACHE_ENABLED:
+            return
+
+        key = cache_key(text)
+        _memory_set(key, result.model_copy(deep=True))
+        _incr("stores")
+        if not USING_REAL_GEMINI:
+            return
+        try:
+            await run_in_threadpool(_db_set, key, result)
+        except SQLAlchemyError as e:
+            logger.warning(f"Result cache store failed: {e}")
+
+    @staticmethod
+    def stats() -> Dict[str, Any]:
+        with _lock:
+            stats = dict(_stats)
+            stats["memory_entries"] = len(_memory)
+        lookups = stats["memory_hits"] + stats["db_hits"] + stats["misses"]
+        stats["hit_rate"] = round((stats["memory_hits"] + stats["db_hits"]) / lookups, 4) if lookups else 0.0
+        stats["prompt_version"] = PROMPT_VERSION
+        stats["shared_tier"] = USING_REAL_GEMINI
+        return stats
+
+    @staticmethod
+    def purge_stale() -> int:
+        """Delete shared-tier rows written by an older prompt/model or past their TTL."""
+        if not USING_REAL_GEMINI:
+            return 0
+        return _db_delete(stale_only=True)
+
+    @staticmethod
+    def invalidate_all() -> int:
+        """Drop every cached result in this process and in the shared tier."""
+        with _lock:
+            _memory.clear()
+        if not USING_REAL_GEMINI:
+            return 0
+        return _db_delete(stale_only=False)
@@ -0,0 +1,24 @@
+"""
+Document-level scoring rules shared by every analyzer.
+
+These mirror the formula and risk mapping given to Gemini, so results
+assembled on our side (local heuristics, merged chunks) stay consistent
+with what the model returns.
+"""
+
+from typing import Iterable
+
+
+def compute_summary_score(manipulation_score: int, fact_check_probabilities: Iterable[int]) -> int:
+    probabilities = list(fact_check_probabilities)
+    avg_fact_probability = sum(probabilities) / len(probabilities) if probabilities else 0
+    summary_score = round((manipulation_score * 0.6) + ((100 - avg_fact_probability) * 0.4))
+    return max(0, min(100, summary_score))
+
+
+def risk_level_for(summary_score: int) -> str:
+    if summary_score <= 30:
+        return "Low"
+    if summary_score <= 70:
+        return "Medium"
+    return "High"
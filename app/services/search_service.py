@@ -0,0 +1,79 @@
+"""
+Full-text search over a user's history (``GET /history/search``).
+
+Queries use Postgres ``websearch_to_tsquery`` syntax (quoted phrases, ``or``,
+``-exclusion``) against ``analyses.search_vector``, which a trigger keeps
+up to date on every insert. Hits are ranked with ``ts_rank_cd`` (matches in
+claim texts weigh more) and paginated on ``(rank, id)``.
+"""
+
+from typing import List, Optional, Tuple
+
+from sqlalchemy import cast, func, select, tuple_
+from sqlalchemy.dialects.postgresql import REGCONFIG
+from sqlalchemy.orm import Session
+
+from app.models.analysis import Analysis
+from app.models.analysis_payload import AnalysisPayload
+
+# Must match the configuration used by the analyses_search_vector() function
+SEARCH_CONFIG = "english"
+_HEADLINE_OPTIONS = 'StartSel=<mark>, StopSel=</mark>, MaxWords=30, MinWords=10, MaxFragments=3, FragmentDelimiter=" ... "'
+# Rank normalization: rank / (rank + 1), so scores fall in [0, 1)
+_RANK_NORMALIZATION = 32
+
+
+class SearchService:
+
+    @staticmethod
+    def search_history(
+        db: Session,
+        user_id: int,
+        q: str,
+        limit: int,
+        after: Optional[Tuple[float, int]] = None,
+    ) -> Tuple[list, Optional[Tuple[float, int]]]:
+        """
+        One page of the user's analyses matching ``q``, best match first.
+
+        Matching rows are found through the (user_id, search_vector) GIN
+        index; only the page's rows get a highlighted excerpt, since
+        ``ts_headline`` re-parses the full text. Returns the rows and the
+        ``(rank, id)`` key for the next page (None on the last page).
+        """
+        config = cast(SEARCH_CONFIG, REGCONFIG)
+        query = func.websearch_to_tsquery(config, q)
+        rank = func.ts_rank_cd(Analysis.search_vector, query, _RANK_NORMALIZATION)
+
+        page = (
+            select(Analysis.id, rank.label("rank"))
+            .where(Analysis.user_id == user_id, Analysis.search_vector.op("@@")(query))
+        )
+        if after is not None:
+            page = page.where(tuple_(rank, Analysis.id) < tuple_(*after))
+        page = page.order_by(rank.desc(), Analysis.id.desc()).limit(limit + 1).subquery()
+
+        stmt = (
+            select(
+                Analysis.id,
+                Analysis.created_at,
+                func.substr(AnalysisPayload.original_text, 1, 101).label("original_text"),
+                Analysis.summary_score,
+                Analysis.overall_risk_level,
+                Analysis.emotional_tone,
+                Analysis.manipulation_score,
+                Analysis.claim_count,
+                page.c.rank,
+                func.ts_headline(config, AnalysisPayload.original_text, query, _HEADLINE_OPTIONS).label("highlight"),
+            )
+            .join(page, Analysis.id == page.c.id)
+            .join(AnalysisPayload, AnalysisPayload.hash == Analysis.payload_hash)
+            .order_by(page.c.rank.desc(), Analysis.id.desc())
+        )
+        rows: List = db.execute(stmt).all()
+
+        next_key = None
+        if len(rows) > limit:
+            rows = rows[:limit]
+            next_key = (rows[-1].rank, rows[-1].id)
+        return rows, next_key
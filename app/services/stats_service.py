@@ -0,0 +1,119 @@
+"""
+Per-user analysis rollups (``user_analysis_stats``).
+
+Every history insert adds its deltas to the user's row with an atomic
+upsert in the same transaction, so the dashboard reads one row instead of
+scanning the user's analyses. ``check`` and ``rebuild`` recompute the
+rollup from ``analyses`` to detect and repair drift.
+"""
+
+from typing import Any, Dict, Iterable, List, Optional
+
+from sqlalchemy import func, case, select
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from app.models.analysis import Analysis
+from app.models.user_analysis_stats import UserAnalysisStats
+
+_COUNTERS = ("total_analyses", "low_count", "medium_count", "high_count", "score_sum", "score_count")
+_RISK_COUNTERS = {"Low": "low_count", "Medium": "medium_count", "High": "high_count"}
+
+
+def _deltas(results: Iterable[Dict[str, Any]]) -> Dict[str, int]:
+    deltas = dict.fromkeys(_COUNTERS, 0)
+    for result in results:
+        deltas["total_analyses"] += 1
+        counter = _RISK_COUNTERS.get(result.get("overall_risk_level"))
+        if counter:
+            deltas[counter] += 1
+        score = result.get("summary_score")
+        if score is not None:
+            deltas["score_sum"] += score
+            deltas["score_count"] += 1
+    return deltas
+
+
+def _upsert(dialect: str, values: Dict[str, int], increment: bool):
+    insert = postgresql.insert if dialect == "postgresql" else sqlite.insert
+    stmt = insert(UserAnalysisStats).values(**values)
+    table = UserAnalysisStats.__table__
+    if increment:
+        updates = {name: table.c[name] + stmt.excluded[name] for name in _COUNTERS}
+    else:
+        updates = {name: stmt.excluded[name] for name in _COUNTERS}
+    updates["updated_at"] = func.now()
+    return stmt.on_conflict_do_update(index_elements=[table.c.user_id], set_=updates)
+
+
+def _actual_query(user_id: Optional[int] = None):
+    """Rollup values recomputed from ``analyses``, one row per user."""
+    risk = Analysis.overall_risk_level
+    score = Analysis.summary_score
+    query = (
+        select(
+            Analysis.user_id,
+            func.count().label("total_analyses"),
+            func.coalesce(func.sum(case((risk == "Low", 1), else_=0)), 0).label("low_count"),
+            func.coalesce(func.sum(case((risk == "Medium", 1), else_=0)), 0).label("medium_count"),
+            func.coalesce(func.sum(case((risk == "High", 1), else_=0)), 0).label("high_count"),
+            func.coalesce(func.sum(score), 0).label("score_sum"),
+            func.count(score).label("score_count"),
+        )
+        .group_by(Analysis.user_id)
+    )
+    if user_id is not None:
+        query = query.where(Analysis.user_id == user_id)
+    return query
+
+
+class StatsService:
+
+    @staticmethod
+    def record(db: Session, user_id: int, results: Iterable[Dict[str, Any]]) -> None:
+        """Add new analyses to the user's rollup. Does not commit; call inside the insert's transaction."""
+        deltas = _deltas(results)
+        if deltas["total_analyses"]:
+            db.execute(_upsert(db.get_bind().dialect.name, {"user_id": user_id, **deltas}, increment=True))
+
+    @staticmethod
+    async def record_async(db: AsyncSession, user_id: int, results: Iterable[Dict[str, Any]]) -> None:
+        deltas = _deltas(results)
+        if deltas["total_analyses"]:
+            await db.execute(_upsert(db.bind.dialect.name, {"user_id": user_id, **deltas}, increment=True))
+
+    @staticmethod
+    def get(db: Session, user_id: int) -> Optional[UserAnalysisStats]:
+        return db.get(UserAnalysisStats, user_id)
+
+    @staticmethod
+    def check(db: Session, user_id: Optional[int] = None) -> List[Dict[str, Any]]:
+        """Users whose rollup differs from their analyses, with stored and actual values."""
+        actual = {row.user_id: row._asdict() for row in db.execute(_actual_query(user_id))}
+        stored_query = db.query(UserAnalysisStats)
+        if user_id is not None:
+            stored_query = stored_query.filter(UserAnalysisStats.user_id == user_id)
+        stored = {s.user_id: {name: getattr(s, name) for name in _COUNTERS} for s in stored_query}
+
+        mismatches = []
+        for uid in sorted(set(actual) | set(stored)):
+            expected = {name: actual.get(uid, {}).get(name, 0) for name in _COUNTERS}
+            current = stored.get(uid, dict.fromkeys(_COUNTERS, 0))
+            if expected != current:
+                mismatches.append({"user_id": uid, "stored": current, "actual": expected})
+        return mismatches
+
+    @staticmethod
+    def rebuild(db: Session, user_id: int) -> None:
+        """
+        Recompute one user's rollup from ``analyses`` and commit.
+
+        The user's rollup row is locked first, so concurrent inserts wait and
+        then add their deltas on top of the rebuilt values.
+        """
+        db.query(UserAnalysisStats).filter(UserAnalysisStats.user_id == user_id).with_for_update().first()
+        row = db.execute(_actual_query(user_id)).first()
+        values = {name: (getattr(row, name) if row else 0) for name in _COUNTERS}
+        db.execute(_upsert(db.get_bind().dialect.name, {"user_id": user_id, **values}, increment=False))
+        db.commit()
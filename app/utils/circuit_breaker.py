@@ -0,0 +1,120 @@
+import time
+from collections import deque
+from typing import Any, Dict
+
+from fastapi import HTTPException, status
+
+
+class CircuitOpenError(HTTPException):
+    def __init__(self):
+        super().__init__(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="AI Verification Service Unavailable. Please try again later.",
+        )
+
+
+class CircuitBreaker:
+    """
+    Closed / open / half-open circuit breaker over a sliding window of calls.
+
+    The circuit opens when, over the last ``window_size`` calls (and at least
+    ``min_calls``), the failure rate or the slow-call rate crosses its
+    threshold. While open, ``before_call`` raises CircuitOpenError without
+    touching the upstream. After ``open_seconds`` the circuit turns half-open
+    and lets ``half_open_probes`` calls through: if they all succeed it
+    closes, and a single failure opens it again.
+    """
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(
+        self,
+        window_size: int,
+        min_calls: int,
+        failure_rate: float,
+        slow_call_seconds: float,
+        slow_call_rate: float,
+        open_seconds: float,
+        half_open_probes: int,
+        enabled: bool = True,
+    ):
+        self.window_size = window_size
+        self.min_calls = min_calls
+        self.failure_rate = failure_rate
+        self.slow_call_seconds = slow_call_seconds
+        self.slow_call_rate = slow_call_rate
+        self.open_seconds = open_seconds
+        self.half_open_probes = half_open_probes
+        self.enabled = enabled
+
+        self.state = self.CLOSED
+        # (failed, slow) per recorded call
+        self._window: deque = deque(maxlen=window_size)
+        self._opened_at = 0.0
+        self._probes_started = 0
+        self._probes_succeeded = 0
+        self.short_circuited = 0
+
+    def before_call(self) -> None:
+        if not self.enabled:
+            return
+
+        if self.state == self.OPEN:
+            if time.monotonic() - self._opened_at < self.open_seconds:
+                self.short_circuited += 1
+                raise CircuitOpenError()
+            self.state = self.HALF_OPEN
+            self._probes_started = 0
+            self._probes_succeeded = 0
+
+        if self.state == self.HALF_OPEN:
+            if self._probes_started >= self.half_open_probes:
+                self.short_circuited += 1
+                raise CircuitOpenError()
+            self._probes_started += 1
+
+    def record(self, success: bool, duration: float) -> None:
+        if not self.enabled:
+            return
+
+        slow = duration >= self.slow_call_seconds
+
+        if self.state == self.HALF_OPEN:
+            if not success or slow:
+                self._open()
+                return
+            self._probes_succeeded += 1
+            if self._probes_succeeded >= self.half_open_probes:
+                self.state = self.CLOSED
+                self._window.clear()
+            return
+
+        self._window.append((not success, slow))
+        if self.state == self.CLOSED and len(self._window) >= self.min_calls:
+            calls = len(self._window)
+            failures = sum(1 for failed, _ in self._window if failed)
+            slow_calls = sum(1 for _, is_slow in self._window if is_slow)
+            if failures / calls >= self.failure_rate or slow_calls / calls >= self.slow_call_rate:
+                self._open()
+
+    def abandon(self) -> None:
+        """Give back a half-open probe slot for a call that never produced an outcome."""
+        if self.state == self.HALF_OPEN and self._probes_started > self._probes_succeeded:
+            self._probes_started -= 1
+
+    def _open(self) -> None:
+        self.state = self.OPEN
+        self._opened_at = time.monotonic()
+        self._window.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        calls = len(self._window)
+        failures = sum(1 for failed, _ in self._window if failed)
+        return {
+            "state": self.state,
+            "window_calls": calls,
+            "window_failure_rate": round(failures / calls, 4) if calls else 0.0,
+            "short_circuited": self.short_circuited,
+        }
@@ -0,0 +1,162 @@
+"""
+Multi-pattern keyword matching.
+
+Keywords are grouped by their first word. A scan locates each group's
+common prefix with ``str.find`` (for large lexicons, only the groups whose
+first word is among the text's tokens) and, where it starts on a word
+boundary, matches the group's keywords there with one compiled
+alternation. Python only runs per candidate position, never per
+character. Matches must start and end on word boundaries: "data" does not
+match inside "update" and "planned" does not match inside "unplanned".
+"""
+
+import os
+import re
+from collections import defaultdict
+from typing import Dict, Iterable, List, NamedTuple, Pattern, Set, Tuple
+
+
+class KeywordMatch(NamedTuple):
+    category: str
+    keyword: str
+    start: int
+    end: int
+
+
+class KeywordScan:
+    """Result of one scan: every match plus per-category summaries."""
+
+    def __init__(self, matches: List[KeywordMatch]):
+        self.matches = matches
+        self._keywords: Dict[str, Set[str]] = defaultdict(set)
+        self._occurrences: Dict[str, int] = defaultdict(int)
+        for match in matches:
+            self._keywords[match.category].add(match.keyword)
+            self._occurrences[match.category] += 1
+
+    def count(self, category: str) -> int:
+        """Number of distinct keywords of ``category`` present in the text."""
+        return len(self._keywords.get(category, ()))
+
+    def occurrences(self, category: str) -> int:
+        """Total number of matches of ``category`` keywords, repeats included."""
+        return self._occurrences.get(category, 0)
+
+    def spans(self, category: str) -> List[Tuple[int, int]]:
+        return [(m.start, m.end) for m in self.matches if m.category == category]
+
+
+_WORD = re.compile(r"\w+")
+
+# Up to this many distinct first words, finding the ones present with a
+# substring check each is cheaper than tokenizing the text
+_SUBSTRING_CHECK_MAX_WORDS = 100
+
+
+def _is_word_char(ch: str) -> bool:
+    return ch.isalnum() or ch == "_"
+
+
+def _add_hits(matches: List[KeywordMatch], hits: List[Tuple[str, str]], start: int) -> None:
+    for category, keyword in hits:
+        matches.append(KeywordMatch(category, keyword, start, start + len(keyword)))
+
+
+class _Group(NamedTuple):
+    pattern: Pattern[str]
+    # matched keyword -> (category, keyword) for it and every shorter keyword
+    # of the group that matches at the same position
+    hits: Dict[str, List[Tuple[str, str]]]
+
+
+class KeywordMatcher:
+
+    def __init__(self, lexicons: Dict[str, Iterable[str]]):
+        # keyword -> categories it belongs to
+        self._categories: Dict[str, List[str]] = defaultdict(list)
+        for category, keywords in lexicons.items():
+            for keyword in keywords:
+                keyword = keyword.lower()
+                if keyword and category not in self._categories[keyword]:
+                    self._categories[keyword].append(category)
+
+        # first word -> keywords starting with it. Keywords starting with a
+        # non-word character have no first word and are searched for always.
+        self._words: Dict[str, List[str]] = defaultdict(list)
+        self._unanchored: List[str] = []
+        for keyword in self._categories:
+            first = _WORD.match(keyword)
+            if first:
+                self._words[first.group()].append(keyword)
+            else:
+                self._unanchored.append(keyword)
+        # first word -> the longest prefix all of its keywords share, which
+        # is what the scan looks for ("the real story", not every "the")
+        self._literals = {word: os.path.commonprefix(keywords) for word, keywords in self._words.items()}
+
+        # Compiled on first use, so loading a large lexicon stays cheap
+        self._groups: Dict[str, _Group] = {}
+
+    def _group(self, word: str) -> _Group:
+        group = self._groups.get(word)
+        if group is None:
+            keywords = self._words[word] if word else self._unanchored
+            group = self._groups[word] = self._compile(keywords)
+        return group
+
+    def _compile(self, keywords: List[str]) -> _Group:
+        # Longest first, so the alternation reports the longest keyword at a
+        # position; the shorter ones that also end on a boundary there are
+        # prefixes of it and listed in hits
+        ordered = sorted(keywords, key=len, reverse=True)
+        pattern = re.compile("|".join(
+            re.escape(keyword) + (r"(?!\w)" if _is_word_char(keyword[-1]) else "") for keyword in ordered
+        ))
+        hits = {}
+        for keyword in ordered:
+            hits[keyword] = [
+                (category, prefix)
+                for prefix in ordered
+                if keyword.startswith(prefix)
+                and (len(prefix) == len(keyword)
+                     or not (_is_word_char(prefix[-1]) and _is_word_char(keyword[len(prefix)])))
+                for category in self._categories[prefix]
+            ]
+        return _Group(pattern, hits)
+
+    def scan(self, text: str) -> KeywordScan:
+        """
+        Find all keyword occurrences, overlapping ones included.
+
+        Matching is case-insensitive; spans index into ``text.lower()``, which
+        has the same length as ``text`` for all but a few non-ASCII characters.
+        """
+        text = text.lower()
+        if len(self._literals) <= _SUBSTRING_CHECK_MAX_WORDS:
+            # str.find below doubles as the presence check
+            words: Iterable[str] = self._literals
+        else:
+            words = self._literals.keys() & set(_WORD.findall(text))
+        matches: List[KeywordMatch] = []
+
+        for word in words:
+            literal = self._literals[word]
+            start = text.find(literal)
+            if start < 0:
+                continue
+            pattern, hits = self._group(word)
+            while start >= 0:
+                if start == 0 or not _is_word_char(text[start - 1]):
+                    match = pattern.match(text, start)
+                    if match:
+                        _add_hits(matches, hits[match.group()], start)
+                start = text.find(literal, start + 1)
+
+        if self._unanchored:
+            pattern, hits = self._group("")
+            match = pattern.search(text)
+            while match:
+                _add_hits(matches, hits[match.group()], match.start())
+                match = pattern.search(text, match.start() + 1)
+
+        return KeywordScan(matches)
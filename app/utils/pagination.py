@@ -0,0 +1,52 @@
+"""
+Opaque keyset-pagination cursors.
+
+A cursor encodes the sort key of the last row on a page; the next page
+starts strictly after it, so page N costs the same index range scan as
+page 1 instead of an ever-growing OFFSET.
+"""
+
+import base64
+import json
+from datetime import datetime
+from typing import Any, List, Tuple
+
+from fastapi import HTTPException
+
+
+def encode_cursor(*key: Any) -> str:
+    values = [v.isoformat() if isinstance(v, datetime) else v for v in key]
+    raw = json.dumps(values, separators=(",", ":")).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor: str) -> List[Any]:
+    """Raw cursor values; raises HTTPException 400 if the cursor is malformed."""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        values = json.loads(raw)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    if not isinstance(values, list):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    return values
+
+
+def decode_time_id_cursor(cursor: str) -> Tuple[datetime, int]:
+    """Cursor for (created_at, id) descending listings."""
+    values = decode_cursor(cursor)
+    try:
+        created_at, row_id = values
+        return datetime.fromisoformat(created_at), int(row_id)
+    except (TypeError, ValueError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+
+def decode_rank_id_cursor(cursor: str) -> Tuple[float, int]:
+    """Cursor for (rank, id) descending listings such as search results."""
+    values = decode_cursor(cursor)
+    try:
+        rank, row_id = values
+        return float(rank), int(row_id)
+    except (TypeError, ValueError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
@@ -12,10 +12,13 @@ _lock = threading.Lock()
 RATE_LIMIT_WINDOW = 60  # seconds
 RATE_LIMIT_MAX_REQUESTS = 5
 
-async def rate_limit_dependency(request: Request):
+async def rate_limit_dependency(request: Request, cost: int = 1):
     """
     Rate limiting dependency for anonymous users.
     Limits requests based on IP address.
+
+    ``cost`` charges several requests' worth of the window at once, for
+    requests that fan out into many units of work (chunks, batch texts).
     """
     if not settings.ENABLE_RATE_LIMIT:
         return
@@ -31,11 +34,11 @@ async def rate_limit_dependency(request: Request):
         ]
 
         # Check limit
-        if len(_request_history[client_ip]) >= RATE_LIMIT_MAX_REQUESTS:
+        if len(_request_history[client_ip]) + cost > RATE_LIMIT_MAX_REQUESTS:
             raise HTTPException(
                 status_code=status.HTTP_429_TOO_MANY_REQUESTS,
                 detail="Too many requests. Please try again later.",
             )
 
         # Record new request
-        _request_history[client_ip].append(current_time)
+        _request_history[client_ip].extend([current_time] * cost)
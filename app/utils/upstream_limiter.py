@@ -0,0 +1,126 @@
+import asyncio
+import time
+from typing import Any, Dict, Optional
+
+from fastapi import HTTPException, status
+
+
+class UpstreamLimiter:
+    """
+    Shared admission control for calls to the Gemini API.
+
+    Combines three mechanisms:
+
+    * an AIMD concurrency limit: +1/limit per successful call, halved when
+      the upstream signals overload (429 or timeout);
+    * a token bucket sized to the configured requests-per-minute quota;
+    * a global back-off window set from ``Retry-After``/``RetryInfo``, so a
+      single 429 pauses every caller in the worker instead of each one
+      sleeping and retrying on its own.
+
+    Callers that cannot be admitted immediately wait in a bounded queue for
+    at most ``max_wait`` seconds.
+    """
+
+    def __init__(
+        self,
+        initial_limit: int,
+        min_limit: int,
+        max_limit: int,
+        rate_per_minute: int,
+        burst: int,
+        max_queue: int,
+        max_wait: float,
+    ):
+        self.limit = float(initial_limit)
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self.rate = rate_per_minute / 60 if rate_per_minute > 0 else 0.0
+        self.burst = max(1, burst)
+        self.tokens = float(self.burst)
+        self.max_queue = max_queue
+        self.max_wait = max_wait
+
+        self.in_flight = 0
+        self.waiting = 0
+        self.rejected = 0
+        self._blocked_until = 0.0
+        self._last_refill = time.monotonic()
+        self._cond = asyncio.Condition()
+
+    def _refill(self, now: float) -> None:
+        if self.rate:
+            self.tokens = min(self.burst, self.tokens + (now - self._last_refill) * self.rate)
+        self._last_refill = now
+
+    def _admission_delay(self, now: float) -> Optional[float]:
+        """Seconds until a new call could be admitted, 0 if now, None if it depends on a release."""
+        if now < self._blocked_until:
+            return self._blocked_until - now
+        if self.in_flight >= int(self.limit):
+            return None
+        if self.rate:
+            self._refill(now)
+            if self.tokens < 1:
+                return (1 - self.tokens) / self.rate
+        return 0.0
+
+    async def acquire(self) -> None:
+        now = time.monotonic()
+        deadline = now + self.max_wait
+
+        async with self._cond:
+            if self._admission_delay(now) != 0.0 and self.waiting >= self.max_queue:
+                self.rejected += 1
+                raise HTTPException(status_code=status.HTTP_503_SERVICE_UNAVAILABLE, detail="AI Verification Service Busy. Please try again later.")
+
+            self.waiting += 1
+            try:
+                while True:
+                    now = time.monotonic()
+                    delay = self._admission_delay(now)
+                    if delay == 0.0:
+                        self.in_flight += 1
+                        if self.rate:
+                            self.tokens -= 1
+                        return
+
+                    remaining = deadline - now
+                    if now < self._blocked_until and self._blocked_until > deadline:
+                        # The upstream asked us to back off longer than we are allowed to wait
+                        self.rejected += 1
+                        raise HTTPException(status_code=status.HTTP_429_TOO_MANY_REQUESTS, detail="AI Usage Limit Exceeded. Please try again later.")
+                    if remaining <= 0:
+                        self.rejected += 1
+                        raise HTTPException(status_code=status.HTTP_503_SERVICE_UNAVAILABLE, detail="AI Verification Service Busy. Please try again later.")
+
+                    timeout = remaining if delay is None else min(delay, remaining)
+                    try:
+                        await asyncio.wait_for(self._cond.wait(), timeout)
+                    except asyncio.TimeoutError:
+                        pass
+            finally:
+                self.waiting -= 1
+
+    async def release(self, overloaded: bool = False, retry_after: Optional[float] = None) -> None:
+        async with self._cond:
+            self.in_flight -= 1
+            if overloaded:
+                self.limit = max(self.min_limit, self.limit / 2)
+            else:
+                self.limit = min(self.max_limit, self.limit + 1 / self.limit)
+            if retry_after:
+                self._blocked_until = max(self._blocked_until, time.monotonic() + retry_after)
+            self._cond.notify_all()
+
+    def stats(self) -> Dict[str, Any]:
+        now = time.monotonic()
+        self._refill(now)
+        return {
+            "concurrency_limit": round(self.limit, 2),
+            "in_flight": self.in_flight,
+            "queue_depth": self.waiting,
+            "rejected": self.rejected,
+            "tokens": round(self.tokens, 2) if self.rate else None,
+            "backoff_remaining": round(max(0.0, self._blocked_until - now), 2),
+        }
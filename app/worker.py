@@ -0,0 +1,115 @@
+"""
+Background worker for queued analysis jobs.
+
+Run alongside the API:
+
+    python -m app.worker --concurrency 8
+"""
+
+import argparse
+import asyncio
+import logging
+import os
+import signal
+import socket
+
+from fastapi import HTTPException
+from starlette.concurrency import run_in_threadpool
+
+from app.config import settings
+from app.database import SessionLocal
+from app.services.analysis_service import AnalysisService
+from app.services.gemini_client import get_http_client, close_http_client
+from app.services.job_service import JobService
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger("app.worker")
+
+
+def _with_session(fn, *args):
+    db = SessionLocal()
+    try:
+        return fn(db, *args)
+    finally:
+        db.close()
+
+
+async def _heartbeat(job_id: str, lease: str) -> None:
+    interval = max(1.0, settings.JOB_VISIBILITY_TIMEOUT_SECONDS / 3)
+    while True:
+        await asyncio.sleep(interval)
+        if not await run_in_threadpool(_with_session, JobService.heartbeat, job_id, lease):
+            logger.warning(f"Lost ownership of job {job_id}")
+            return
+
+
+async def _run_job(job_id: str, text: str, lease: str) -> None:
+    heartbeat = asyncio.create_task(_heartbeat(job_id, lease))
+    try:
+        if len(text) > 5000:
+            result = await AnalysisService.perform_long_ai_analysis(text)
+        else:
+            result = await AnalysisService.perform_ai_analysis(text)
+    except HTTPException as e:
+        # Client errors won't succeed on retry; upstream/server errors might
+        retryable = e.status_code >= 429
+        logger.warning(f"Job {job_id} failed ({e.status_code}): {e.detail}")
+        await run_in_threadpool(_with_session, JobService.mark_failed, job_id, lease, str(e.detail), retryable)
+        return
+    except Exception as e:
+        logger.exception(f"Job {job_id} crashed")
+        await run_in_threadpool(_with_session, JobService.mark_failed, job_id, lease, repr(e), True)
+        return
+    finally:
+        heartbeat.cancel()
+
+    await run_in_threadpool(_with_session, JobService.mark_succeeded, job_id, lease, result.model_dump())
+    logger.info(f"Job {job_id} succeeded")
+
+
+async def _worker_loop(slot: int, worker_id: str, stopping: asyncio.Event) -> None:
+    while not stopping.is_set():
+        try:
+            job = await run_in_threadpool(_with_session, JobService.claim_next, worker_id)
+        except Exception as e:
+            logger.error(f"[{slot}] Could not claim a job: {e}")
+            job = None
+
+        if job is None:
+            try:
+                await asyncio.wait_for(stopping.wait(), settings.JOB_POLL_INTERVAL_SECONDS)
+            except asyncio.TimeoutError:
+                pass
+            continue
+
+        logger.info(f"[{slot}] Running job {job.id} (attempt {job.attempts}/{job.max_attempts})")
+        await _run_job(job.id, job.text, job.locked_by)
+
+
+async def run_worker(concurrency: int) -> None:
+    worker_id = f"{socket.gethostname()}:{os.getpid()}"
+    stopping = asyncio.Event()
+
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        loop.add_signal_handler(sig, stopping.set)
+
+    get_http_client()
+    logger.info(f"Worker {worker_id} started with concurrency {concurrency}")
+    try:
+        # Each loop finishes its current job before exiting on shutdown
+        await asyncio.gather(*(_worker_loop(i, worker_id, stopping) for i in range(concurrency)))
+    finally:
+        await close_http_client()
+        logger.info(f"Worker {worker_id} stopped")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Run queued analysis jobs.")
+    parser.add_argument("--concurrency", type=int, default=settings.JOB_WORKER_CONCURRENCY)
+    args = parser.parse_args()
+    asyncio.run(run_worker(args.concurrency))
+
+
+if __name__ == "__main__":
+    main()
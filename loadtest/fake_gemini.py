@@ -0,0 +1,251 @@
+"""
+Local stand-in for the Gemini generateContent API.
+
+Speaks the ``models/{model}:generateContent`` and
+``models/{model}:streamGenerateContent?alt=sse`` wire format with
+configurable latency and fault injection, so the backend can be load-tested
+without touching the real API. Point the app at it with:
+
+    GEMINI_API_BASE=http://127.0.0.1:8081/v1beta GOOGLE_API_KEY=fake uvicorn app.main:app
+
+Modes:
+
+    synthetic (default)   answers are built with the local heuristic analyzer
+    --record DIR          proxy to the real API and save its successful answers
+                          to DIR (latency and fault injection are off)
+    --replay DIR          serve answers from DIR (synthetic on a miss unless --strict)
+
+Examples:
+
+    python -m loadtest.fake_gemini --latency lognormal:800:0.4 --rate-429 0.05 --rate-5xx 0.01
+    python -m loadtest.fake_gemini --record cassettes/ --upstream https://generativelanguage.googleapis.com/v1beta
+"""
+
+import argparse
+import asyncio
+import hashlib
+import json
+import random
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+import httpx
+import uvicorn
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, Response, StreamingResponse
+
+from app.services.local_analyzer import analyze_text_local
+
+
+class LatencyModel:
+    """
+    Parses ``fixed:MS``, ``uniform:LO:HI``, ``normal:MEAN:SD`` or
+    ``lognormal:MEDIAN:SIGMA`` (all in milliseconds) and samples seconds.
+    """
+
+    def __init__(self, spec: str):
+        kind, *params = spec.split(":")
+        self.kind = kind
+        self.params = [float(p) for p in params]
+        if kind not in ("fixed", "uniform", "normal", "lognormal"):
+            raise ValueError(f"Unknown latency distribution: {spec}")
+
+    def sample(self) -> float:
+        p = self.params
+        if self.kind == "fixed":
+            ms = p[0]
+        elif self.kind == "uniform":
+            ms = random.uniform(p[0], p[1])
+        elif self.kind == "normal":
+            ms = random.gauss(p[0], p[1])
+        else:
+            ms = random.lognormvariate(0, p[1]) * p[0]
+        return max(0.0, ms) / 1000
+
+
+class Cassettes:
+    """One JSON file per request, keyed by a hash of the model, method and body."""
+
+    def __init__(self, directory: str):
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+
+    @staticmethod
+    def key(path: str, body: bytes) -> str:
+        try:
+            canonical = json.dumps(json.loads(body), sort_keys=True, separators=(",", ":"))
+        except ValueError:
+            canonical = body.decode("utf-8", "replace")
+        return hashlib.sha256(f"{path}\x00{canonical}".encode("utf-8")).hexdigest()
+
+    def load(self, key: str) -> Optional[Dict[str, Any]]:
+        path = self.directory / f"{key}.json"
+        if not path.exists():
+            return None
+        return json.loads(path.read_text())
+
+    def save(self, key: str, request_path: str, status_code: int, body: str) -> None:
+        entry = {"path": request_path, "status_code": status_code, "body": body}
+        (self.directory / f"{key}.json").write_text(json.dumps(entry))
+
+
+def _user_text(payload: Dict[str, Any]) -> str:
+    try:
+        return "".join(part.get("text", "") for part in payload["contents"][-1]["parts"])
+    except (KeyError, IndexError, TypeError):
+        return ""
+
+
+def _synthetic_answer(payload: Dict[str, Any]) -> str:
+    text = _user_text(payload)
+    schema = payload.get("generationConfig", {}).get("responseSchema", {})
+    if schema.get("type") == "ARRAY":
+        try:
+            documents = [(d["index"], d["text"]) for d in json.loads(text)]
+        except (ValueError, KeyError, TypeError):
+            documents = [(0, text)]
+        results: Any = [{"index": i, **_analyze(d)} for i, d in documents]
+    else:
+        results = _analyze(text)
+    return json.dumps(results)
+
+
+def _analyze(text: str) -> Dict[str, Any]:
+    return analyze_text_local(text or "No content").model_dump(exclude={"degraded", "lexicon_version"})
+
+
+def _envelope(text: str) -> Dict[str, Any]:
+    return {
+        "candidates": [{
+            "content": {"role": "model", "parts": [{"text": text}]},
+            "finishReason": "STOP",
+        }],
+        "usageMetadata": {},
+    }
+
+
+def _malform(text: str) -> str:
+    # Truncated JSON, the most common real-world failure
+    return text[: max(1, len(text) // 2)]
+
+
+def create_app(args: argparse.Namespace) -> FastAPI:
+    app = FastAPI(title="Fake Gemini")
+    latency = LatencyModel(args.latency)
+    cassettes = Cassettes(args.record or args.replay) if (args.record or args.replay) else None
+    stats = {"requests": 0, "injected_429": 0, "injected_5xx": 0, "malformed": 0, "replayed": 0, "recorded": 0, "upstream_errors": 0}
+    upstream = httpx.AsyncClient(timeout=120) if args.record else None
+
+    @app.get("/stats")
+    def get_stats():
+        return stats
+
+    @app.post("/v1beta/models/{model_method:path}")
+    async def generate(model_method: str, request: Request):
+        stats["requests"] += 1
+        stream = model_method.endswith(":streamGenerateContent")
+        body = await request.body()
+        payload = json.loads(body or b"{}")
+
+        # Recording passes the real API through untouched; injected latency and
+        # faults would otherwise end up in the cassettes
+        inject = not args.record
+        if inject:
+            await asyncio.sleep(latency.sample())
+
+            roll = random.random()
+            if roll < args.rate_429:
+                stats["injected_429"] += 1
+                retry = {"@type": "type.googleapis.com/google.rpc.RetryInfo", "retryDelay": f"{args.retry_after}s"}
+                return JSONResponse(
+                    {"error": {"code": 429, "status": "RESOURCE_EXHAUSTED", "details": [retry]}},
+                    status_code=429,
+                    headers={"Retry-After": str(args.retry_after)},
+                )
+            if roll < args.rate_429 + args.rate_5xx:
+                stats["injected_5xx"] += 1
+                return JSONResponse({"error": {"code": 503, "status": "UNAVAILABLE"}}, status_code=503)
+
+        status_code, text = 200, None
+        key = Cassettes.key(model_method, body) if cassettes else None
+
+        if args.replay:
+            entry = cassettes.load(key)
+            if entry is not None:
+                stats["replayed"] += 1
+                status_code, text = entry["status_code"], entry["body"]
+            elif args.strict:
+                return JSONResponse({"error": {"code": 404, "message": "No cassette for request"}}, status_code=404)
+
+        if args.record:
+            real = await upstream.post(
+                f"{args.upstream}/models/{model_method.replace(':streamGenerateContent', ':generateContent')}",
+                params={"key": request.query_params.get("key", "")},
+                content=body,
+                headers={"Content-Type": "application/json"},
+            )
+            status_code = real.status_code
+            try:
+                text = "".join(p.get("text", "") for p in real.json()["candidates"][0]["content"]["parts"])
+            except (ValueError, KeyError, IndexError):
+                text = real.text
+            # Upstream 429s and 5xxs are passed on but not saved, so a replay
+            # never serves a transient failure as the answer for this request
+            if status_code == 200:
+                cassettes.save(key, model_method, status_code, text)
+                stats["recorded"] += 1
+            else:
+                stats["upstream_errors"] += 1
+
+        if status_code != 200:
+            return Response(text, status_code=status_code, media_type="application/json")
+
+        if text is None:
+            text = _synthetic_answer(payload)
+        if inject and random.random() < args.rate_malformed:
+            stats["malformed"] += 1
+            text = _malform(text)
+
+        if not stream:
+            return JSONResponse(_envelope(text))
+
+        async def events():
+            size = args.stream_chunk
+            for i in range(0, len(text), size):
+                yield f"data: {json.dumps(_envelope(text[i:i + size]))}\r\n\r\n"
+                await asyncio.sleep(args.stream_delay / 1000)
+
+        return StreamingResponse(events(), media_type="text/event-stream")
+
+    return app
+
+
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Fake Gemini server for offline load tests.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8081)
+    parser.add_argument("--latency", default="lognormal:800:0.4", help="fixed:MS | uniform:LO:HI | normal:MEAN:SD | lognormal:MEDIAN:SIGMA")
+    parser.add_argument("--rate-429", type=float, default=0.0, help="fraction of requests answered with 429")
+    parser.add_argument("--rate-5xx", type=float, default=0.0, help="fraction of requests answered with 503")
+    parser.add_argument("--rate-malformed", type=float, default=0.0, help="fraction of answers truncated into invalid JSON")
+    parser.add_argument("--retry-after", type=int, default=2, help="seconds advertised on injected 429s")
+    parser.add_argument("--stream-chunk", type=int, default=64, help="characters per streamed chunk")
+    parser.add_argument("--stream-delay", type=float, default=20, help="ms between streamed chunks")
+    parser.add_argument("--seed", type=int, default=None)
+    mode = parser.add_mutually_exclusive_group()
+    mode.add_argument("--record", metavar="DIR", help="proxy to --upstream and save successful answers as cassettes; disables latency and fault injection")
+    mode.add_argument("--replay", metavar="DIR", help="serve answers from saved cassettes")
+    parser.add_argument("--strict", action="store_true", help="with --replay, 404 on cassette misses")
+    parser.add_argument("--upstream", default="https://generativelanguage.googleapis.com/v1beta")
+    return parser.parse_args(argv)
+
+
+def main() -> None:
+    args = parse_args()
+    if args.seed is not None:
+        random.seed(args.seed)
+    uvicorn.run(create_app(args), host=args.host, port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,159 @@
+"""
+Open-loop load generator for the Claim Hunter API.
+
+Fires requests at a fixed target rate (Poisson arrivals), independent of
+how fast responses come back, and reports latency percentiles, throughput
+and an error breakdown per endpoint. Latency is measured from each
+request's scheduled arrival, so queueing behind --max-in-flight shows up
+in it instead of being hidden (coordinated omission).
+
+    python -m loadtest.loadgen --rps 50 --duration 60 \\
+        --endpoint /analyze/=3 --endpoint /analyze/direct=1 --texts samples.txt
+
+Anonymous calls to /analyze/ are rate-limited per IP; run the API with
+ENABLE_RATE_LIMIT=False or pass --email/--password to load-test as a user.
+"""
+
+import argparse
+import asyncio
+import random
+import statistics
+import time
+from collections import Counter, defaultdict
+from typing import Dict, List, Optional, Tuple
+
+import httpx
+
+DEFAULT_TEXTS = [
+    "Scientists say the new vaccine is 95% effective according to a peer-reviewed study.",
+    "Everyone knows the mainstream media is hiding the real story from you. Wake up!",
+    "The city council approved the budget on Tuesday after a lengthy debate.",
+    "This shocking discovery will change everything you thought you knew about water.",
+    "The deep state orchestrated the crisis to push their globalist agenda.",
+]
+
+
+class EndpointStats:
+
+    def __init__(self):
+        self.latencies: List[float] = []
+        self.outcomes: Counter = Counter()
+
+    def record(self, latency: float, outcome: str) -> None:
+        self.latencies.append(latency)
+        self.outcomes[outcome] += 1
+
+
+def _percentile(sorted_values: List[float], pct: float) -> float:
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, max(0, round(pct / 100 * len(sorted_values)) - 1))
+    return sorted_values[index]
+
+
+def _parse_endpoints(specs: List[str]) -> List[Tuple[str, int]]:
+    endpoints = []
+    for spec in specs:
+        path, _, weight = spec.partition("=")
+        endpoints.append((path, int(weight or 1)))
+    return endpoints
+
+
+async def _fire(
+    client: httpx.AsyncClient,
+    path: str,
+    text: str,
+    stats: EndpointStats,
+    semaphore: asyncio.Semaphore,
+    scheduled_at: float,
+) -> None:
+    # Latency counts from the scheduled arrival, so time spent waiting for
+    # --max-in-flight (or behind a late scheduler) is part of it
+    async with semaphore:
+        try:
+            if path.endswith("/stream"):
+                async with client.stream("POST", path, json={"text": text}) as response:
+                    async for _ in response.aiter_bytes():
+                        pass
+                    outcome = str(response.status_code)
+            else:
+                response = await client.post(path, json={"text": text})
+                outcome = str(response.status_code)
+        except httpx.HTTPError as e:
+            outcome = type(e).__name__
+        stats.record(time.perf_counter() - scheduled_at, outcome)
+
+
+async def run(args: argparse.Namespace) -> Dict[str, EndpointStats]:
+    endpoints = _parse_endpoints(args.endpoint)
+    paths = [path for path, _ in endpoints]
+    weights = [weight for _, weight in endpoints]
+    texts = DEFAULT_TEXTS
+    if args.texts:
+        with open(args.texts) as f:
+            texts = [line.strip() for line in f if line.strip()]
+
+    stats: Dict[str, EndpointStats] = defaultdict(EndpointStats)
+    semaphore = asyncio.Semaphore(args.max_in_flight)
+    limits = httpx.Limits(max_connections=args.max_in_flight, max_keepalive_connections=args.max_in_flight)
+
+    async with httpx.AsyncClient(base_url=args.base_url, timeout=args.timeout, limits=limits) as client:
+        if args.email:
+            response = await client.post("/auth/login", json={"email": args.email, "password": args.password})
+            response.raise_for_status()
+
+        tasks = []
+        deadline = time.perf_counter() + args.duration
+        next_at = time.perf_counter()
+        while next_at < deadline:
+            delay = next_at - time.perf_counter()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            path = random.choices(paths, weights)[0]
+            tasks.append(asyncio.create_task(_fire(client, path, random.choice(texts), stats[path], semaphore, next_at)))
+            next_at += random.expovariate(args.rps)
+
+        await asyncio.gather(*tasks)
+
+    return stats
+
+
+def report(stats: Dict[str, EndpointStats], duration: float) -> None:
+    header = f"{'endpoint':<24}{'reqs':>7}{'rps':>8}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}{'mean ms':>9}  outcomes"
+    print(header)
+    print("-" * len(header))
+    for path, s in sorted(stats.items()):
+        latencies = sorted(s.latencies)
+        outcomes = ", ".join(f"{k}:{v}" for k, v in s.outcomes.most_common())
+        print(
+            f"{path:<24}{len(latencies):>7}{len(latencies) / duration:>8.1f}"
+            f"{_percentile(latencies, 50) * 1000:>9.0f}{_percentile(latencies, 95) * 1000:>9.0f}"
+            f"{_percentile(latencies, 99) * 1000:>9.0f}{statistics.fmean(latencies) * 1000 if latencies else 0:>9.0f}"
+            f"  {outcomes}"
+        )
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="Drive the API at a target request rate.")
+    parser.add_argument("--base-url", default="http://127.0.0.1:8000")
+    parser.add_argument("--rps", type=float, default=10.0, help="target arrival rate")
+    parser.add_argument("--duration", type=float, default=30.0, help="seconds to generate load")
+    parser.add_argument("--endpoint", action="append", default=None, help="PATH[=WEIGHT], repeatable (default /analyze/direct)")
+    parser.add_argument("--texts", help="file with one input text per line")
+    parser.add_argument("--max-in-flight", type=int, default=500)
+    parser.add_argument("--timeout", type=float, default=120.0)
+    parser.add_argument("--email")
+    parser.add_argument("--password")
+    parser.add_argument("--seed", type=int, default=None)
+    args = parser.parse_args(argv)
+    args.endpoint = args.endpoint or ["/analyze/direct"]
+    if args.seed is not None:
+        random.seed(args.seed)
+
+    started = time.perf_counter()
+    stats = asyncio.run(run(args))
+    report(stats, time.perf_counter() - started)
+
+
+if __name__ == "__main__":
+    main()